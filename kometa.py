@@ -64,6 +64,7 @@ arguments = {
     "ignore-ghost": {"args": "ig", "type": "bool", "help": "Run ignoring ghost logging"},
     "delete-collections": {"args": ["dc", "delete", "delete-collection"], "type": "bool", "help": "Deletes all Collections in the Plex Library before running"},
     "delete-labels": {"args": ["dl", "delete-label"], "type": "bool", "help": "Deletes all Labels in the Plex Library before running"},
+    "build-id-index": {"args": ["bi", "build-index"], "type": "bool", "help": "Build the offline ID crosswalk index from the cache and anime mapping before running"},
     "resume": {"args": "re", "type": "str", "help": "Resume collection run from a specific collection"},
     "no-countdown": {"args": "nc", "type": "bool", "help": "Run without displaying the countdown"},
     "no-missing": {"args": "nm", "type": "bool", "help": "Run without running the missing section"},
@@ -374,6 +375,12 @@ def start(attrs):
             logger.stacktrace()
             logger.critical(e)
         else:
+            if run_args["build-id-index"]:
+                try:
+                    config.Convert.build_id_index()
+                except Exception as e:
+                    logger.stacktrace()
+                    logger.error(f"Crosswalk Error: {e}")
             try:
                 stats = run_config(config, stats)
             except Exception as e:
@@ -701,7 +708,7 @@ def run_libraries(config):
                 else:
                     library_types = ["movie"]
                 for library_type in library_types:
-                    for item in library.get_all(builder_level=library_type):
+                    for item in library.iter_all(builder_level=library_type):
                         try:
                             sync = ["Overlay"] if "Overlay" in [lbl.tag for lbl in item.labels] else []
                             library.edit_tags("label", item, sync_tags=sync)
@@ -754,6 +761,7 @@ def run_libraries(config):
                             # logger.remove_library_handler(library.mapping_name)
                             run_collection(config, library, metadata, collections_to_run)
                             # logger.re_add_library_handler(library.mapping_name)
+                    library.Uploads.flush()
                     library_status[library.name]["Library Collection Files"] = str(datetime.now() - time_start).split('.')[0]
                 elif run_type == "metadata" and runs[run_type]:
                     time_start = datetime.now()
@@ -797,6 +805,9 @@ def run_libraries(config):
             library.notify(e)
             logger.stacktrace()
             logger.critical(e)
+        library.release_levels()
+        config.AssetIndex.save()
+    config.AssetIndex.save(prune=True)
     return library_status
 
 def run_collection(config, library, metadata, requested_collections):
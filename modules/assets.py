@@ -0,0 +1,100 @@
+import os
+from modules import util
+
+logger = util.logger
+
+class AssetIndex:
+    def __init__(self, cache=None):
+        self.cache = cache
+        self.listings = {}
+        self.folders = {}
+        self.stems = {}
+        self.changed = {}
+        self.persisted = self.cache.query_asset_index() if self.cache else {}
+        self.stored = set(self.persisted)
+        if self.persisted:
+            logger.debug(f"Loaded Asset Index for {len(self.persisted)} Directories")
+
+    def _listing(self, directory):
+        if directory not in self.listings:
+            entries = []
+            try:
+                modified = os.stat(directory).st_mtime_ns
+            except OSError:
+                modified = None
+            if modified is not None:
+                if directory in self.persisted and self.persisted[directory][0] == modified:
+                    entries = self.persisted[directory][1]
+                else:
+                    try:
+                        with os.scandir(directory) as it:
+                            for entry in it:
+                                try:
+                                    is_dir = entry.is_dir()
+                                except OSError:
+                                    is_dir = False
+                                entries.append([entry.name, is_dir])
+                    except OSError:
+                        pass
+                    if self.cache:
+                        self.changed[directory] = (modified, entries)
+            self.listings[directory] = entries
+        return self.listings[directory]
+
+    def find_folder(self, asset_directory, folder_name, depth):
+        if asset_directory not in self.folders:
+            self.folders[asset_directory] = []
+        levels = self.folders[asset_directory]
+        folder_key = os.path.normcase(folder_name)
+        for n in range(depth + 1):
+            if n == len(levels):
+                parents = [asset_directory] if n == 0 else [p for p in levels[n - 1][0] if not os.path.basename(p).startswith(".")]
+                paths = []
+                names = {}
+                for parent in parents:
+                    for name, is_dir in self._listing(parent):
+                        if is_dir:
+                            path = os.path.join(parent, name)
+                            paths.append(path)
+                            if os.path.normcase(name) not in names:
+                                names[os.path.normcase(name)] = path
+                levels.append((paths, names))
+            if folder_key in levels[n][1]:
+                path = levels[n][1][folder_key]
+                return path if n == 0 else os.path.abspath(path)
+        return None
+
+    def find_files(self, directory, prefix):
+        if directory not in self.stems:
+            stems = {}
+            for name, is_dir in self._listing(directory):
+                if not is_dir:
+                    index = name.find(".")
+                    while index >= 0:
+                        stem = os.path.normcase(name[:index])
+                        if stem not in stems:
+                            stems[stem] = []
+                        stems[stem].append(os.path.join(directory, name))
+                        index = name.find(".", index + 1)
+            self.stems[directory] = stems
+        return self.stems[directory].get(os.path.normcase(prefix), [])
+
+    def files(self, directory):
+        return [os.path.join(directory, n) for n, is_dir in self._listing(directory) if not is_dir and "." in n and not n.startswith(".")]
+
+    def invalidate(self, directory):
+        for index in [self.listings, self.folders, self.stems, self.persisted]:
+            if directory in index:
+                del index[directory]
+
+    def save(self, prune=False):
+        if not self.cache:
+            return
+        removed = [d for d in self.stored if d not in self.listings or not os.path.isdir(d)] if prune else []
+        if self.changed or removed:
+            self.cache.update_asset_index(self.changed, removed=removed)
+            self.stored.update(self.changed)
+            self.stored.difference_update(removed)
+            self.changed = {}
+            if removed:
+                logger.debug(f"Removed {len(removed)} Directories from the Asset Index")
@@ -1169,7 +1169,7 @@ class CollectionBuilder:
                     if check_url != self.library.smart_filter(self.obj):
                         self.library.update_smart_collection(self.obj, check_url)
                         logger.info(f"Metadata: Smart Collection updated to {check_url}")
-                self.beginning_count = len(self.library.fetchItems(check_url)) if check_url else 0
+                self.beginning_count = self.library.count_items(check_url) if check_url else 0
             if self.obj:
                 self.exists = True
                 if self.sync or self.playlist:
@@ -2295,6 +2295,24 @@ class CollectionBuilder:
             logger.debug(f"{total_ids} IDs Found")
             logger.trace(f"IDs: {ids}")
             logger.debug("")
+            prefetch = []
+            for input_id, id_type in [d for d in ids if isinstance(d, tuple) and len(d) == 2]:
+                if id_type == "ratingKey":
+                    prefetch.append(input_id)
+                elif id_type == "imdb" and input_id in self.library.imdb_map:
+                    prefetch.extend(self.library.imdb_map[input_id])
+                elif id_type == "tmdb" and str(input_id).isdigit() and int(input_id) in self.library.movie_map:
+                    prefetch.extend(self.library.movie_map[int(input_id)])
+                elif id_type == "tvdb" and not self.parts_collection and str(input_id).isdigit() and int(input_id) in self.library.show_map:
+                    prefetch.extend(self.library.show_map[int(input_id)])
+            self.library.batch_load(prefetch)
+            pairs = [d for d in ids if isinstance(d, tuple) and len(d) == 2]
+            imdb_tmdb = self.config.Convert.imdb_to_tmdb_batch([
+                i for i, t in pairs if t == "imdb" and i not in self.ignore_imdb_ids and not any(i in pl_library.imdb_map for pl_library in self.libraries)
+            ], workers=self.library.mapping_workers)
+            show_tmdb_ids = [int(str(_id).split("_")[0]) for _id, tmdb_type in imdb_tmdb.values() if _id and tmdb_type in ["show", "episode"]]
+            show_tmdb_ids.extend([int(i) for i, t in pairs if t == "tmdb_show" and str(i).isdigit()])
+            tmdb_tvdb = self.config.Convert.tmdb_to_tvdb_batch(show_tmdb_ids, workers=self.library.mapping_workers)
             for i, input_data in enumerate(ids, 1):
                 try:
                     input_id, id_type = input_data
@@ -2312,11 +2330,11 @@ class CollectionBuilder:
                                     break
                             if not found:
                                 try:
-                                    _id, tmdb_type = self.config.Convert.imdb_to_tmdb(input_id, fail=True)
+                                    _id, tmdb_type = self.config.Convert.imdb_to_tmdb(input_id, fail=True, batch=imdb_tmdb)
                                     if tmdb_type == "episode" and (self.builder_level == "episode" or self.playlist):
                                         try:
                                             tmdb_id, season_num, episode_num = _id.split("_")
-                                            tvdb_id = self.config.Convert.tmdb_to_tvdb(tmdb_id, fail=True)
+                                            tvdb_id = self.config.Convert.tmdb_to_tvdb(int(tmdb_id), fail=True, batch=tmdb_tvdb)
                                             tvdb_id = int(tvdb_id)
                                         except Failed as e:
                                             try:
@@ -2351,7 +2369,7 @@ class CollectionBuilder:
                                             tmdb_id, _, _ = _id.split("_")
                                         else:
                                             tmdb_id = _id
-                                        tvdb_id = self.config.Convert.tmdb_to_tvdb(tmdb_id, fail=True)
+                                        tvdb_id = self.config.Convert.tmdb_to_tvdb(int(tmdb_id), fail=True, batch=tmdb_tvdb)
                                         if tvdb_id not in self.ignore_ids:
                                             found_keys = None
                                             for pl_library in self.libraries:
@@ -2416,7 +2434,7 @@ class CollectionBuilder:
                         tvdb_season = None
                         if id_type == "tmdb_show":
                             try:
-                                tvdb_id = self.config.Convert.tmdb_to_tvdb(input_id, fail=True)
+                                tvdb_id = self.config.Convert.tmdb_to_tvdb(int(input_id) if str(input_id).isdigit() else input_id, fail=True, batch=tmdb_tvdb)
                             except Failed as e:
                                 logger.warning(e)
                                 continue
@@ -2494,6 +2512,9 @@ class CollectionBuilder:
             logger.info("")
             logger.info("Filtering Builders:")
         filtered_items = []
+        snapshot_results = {}
+        if self.filters and not self.details["only_filter_missing"] and not self.playlist:
+            snapshot_results = self.library.check_snapshot_filters(self.builder_level, items, self.filters, self.current_time)
         for i, item in enumerate(items, 1):
             if not isinstance(item, (Movie, Show, Season, Episode, Artist, Album, Track)):
                 logger.error(f"{self.Type} Error: Item: {item} is an invalid type")
@@ -2504,7 +2525,11 @@ class CollectionBuilder:
                         logger.info(f"{name} {self.Type} | X | {self.filtered_keys[item.ratingKey]}")
                 else:
                     current_title = util.item_title(item)
-                    if self.check_filters(item, f"{(' ' * (max_length - len(str(i))))}{i}/{total}"):
+                    if item.ratingKey in snapshot_results:
+                        passed = snapshot_results[item.ratingKey]
+                    else:
+                        passed = self.check_filters(item, f"{(' ' * (max_length - len(str(i))))}{i}/{total}")
+                    if passed:
                         self.found_items.append(item)
                         if self.details["show_unfiltered"] is True:
                             logger.info(f"{name} {self.Type} | = | {current_title}")
@@ -3585,22 +3610,22 @@ class CollectionBuilder:
                 else:
                     raise Failed(str(e))
             items = self.library.fetchItems(search_data[2])
-        total_items = len(items)
-        previous = None
-        sort_edit = False
-        for i, item in enumerate(items, 0):
+        target_positions = {item.ratingKey: i for i, item in enumerate(items)}
+        current_positions = [target_positions[item.ratingKey] for item in self.items if item.ratingKey in target_positions]
+        in_place = {current_positions[i] for i in util.longest_increasing_subsequence(current_positions)}
+        moves = [(item, items[i - 1] if i > 0 else None) for i, item in enumerate(items) if i not in in_place]
+        if not moves:
+            logger.info("No Sorting Required")
+            return
+        total_moves = len(moves)
+        logger.info(f"{total_moves} Move{'s' if total_moves > 1 else ''} Required to Sort {len(items)} Items")
+        for i, (item, previous) in enumerate(moves, 1):
             try:
-                if len(self.items) <= i or item.ratingKey != self.items[i].ratingKey:
-                    text = f"after {util.item_title(previous)}" if previous else "to the beginning"
-                    self.library.moveItem(self.obj, item, previous)
-                    logger.info(f"({i + 1}/{total_items}) Moving {util.item_title(item)} {text}")
-                    sort_edit = True
-                previous = item
+                text = f"after {util.item_title(previous)}" if previous else "to the beginning"
+                self.library.moveItem(self.obj, item, previous)
+                logger.info(f"({i}/{total_moves}) Moving {util.item_title(item)} {text}")
             except Failed:
                 logger.error(f"Failed to Move {util.item_title(item)}")
-                sort_edit = True
-        if not sort_edit:
-            logger.info("No Sorting Required")
 
     def sync_trakt_list(self):
         logger.info("")
@@ -3642,16 +3667,17 @@ class CollectionBuilder:
             output = ""
 
         if self.playlist:
-            for user in self.valid_users:
+            def delete_user(user):
                 try:
                     if user == self.library.account.username:
                         _ = self.library.get_playlist(title)  # Verify if this playlist exists in Admin to avoid log confusion
                         self.library.delete(self.obj)
                     else:
                         self.library.delete_user_playlist(title, user)
-                    output += f"\nPlaylist deleted on User {user}"
+                    return f"\nPlaylist deleted on User {user}"
                 except Failed:
-                    output += f"\nPlaylist not found on User {user}"
+                    return f"\nPlaylist not found on User {user}"
+            output += "".join(self.library.for_each_user(delete_user, users=self.valid_users))
         elif self.obj:
             self.library.delete(self.obj)
         return output
@@ -3661,13 +3687,19 @@ class CollectionBuilder:
             logger.info("")
             logger.separator(f"Syncing Playlist to Users", space=False, border=False)
             logger.info("")
-            for user in self.valid_users:
+            items = self.obj.items()
+            def sync_user(user):
                 try:
                     self.library.delete_user_playlist(self.obj.title, user)
                 except Failed:
                     pass
                 if user != self.library.account.username:
-                    self.obj.copyToUser(user).editSummary(summary=self.obj.summary).reload()
+                    playlist = self.library.copy_playlist_to_user(self.obj, user, items=items)
+                    if playlist:
+                        playlist.editSummary(summary=self.obj.summary).reload()
+                    return user
+            for user in self.library.for_each_user(sync_user, users=self.valid_users):
+                if user:
                     logger.info(f"Playlist: {self.name} synced to {user}")
 
     def exclude_admin_from_playlist(self):
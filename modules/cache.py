@@ -321,6 +321,35 @@ class Cache:
                     value2 TEXT,
                     success TEXT)"""
                 )
+                cursor.execute(
+                    """CREATE TABLE IF NOT EXISTS image_dimensions (
+                    key INTEGER PRIMARY KEY,
+                    path TEXT UNIQUE,
+                    size INTEGER,
+                    modified INTEGER,
+                    width INTEGER,
+                    height INTEGER)"""
+                )
+                cursor.execute(
+                    """CREATE TABLE IF NOT EXISTS asset_index (
+                    key INTEGER PRIMARY KEY,
+                    directory TEXT UNIQUE,
+                    modified INTEGER,
+                    entries TEXT)"""
+                )
+                cursor.execute(
+                    """CREATE TABLE IF NOT EXISTS library_id_map (
+                    key INTEGER PRIMARY KEY,
+                    library TEXT,
+                    rating_key INTEGER,
+                    guid TEXT,
+                    id_type TEXT,
+                    main_ids TEXT,
+                    imdb_ids TEXT,
+                    chosen_id INTEGER,
+                    expiration_date TEXT,
+                    UNIQUE(library, rating_key))"""
+                )
                 cursor.execute("SELECT count(name) FROM sqlite_master WHERE type='table' AND name='image_map'")
                 if cursor.fetchone()[0] > 0:
                     cursor.execute(f"SELECT DISTINCT library FROM image_map")
@@ -364,6 +393,17 @@ class Cache:
                     sql = f"UPDATE guids_map SET t_id = ?, imdb_id = ?, expiration_date = ?, media_type = ? WHERE plex_guid = ?"
                     cursor.execute(sql, (t_id, imdb_id, expiration_date.strftime("%Y-%m-%d"), media_type, plex_guid))
 
+    def update_guid_maps(self, rows):
+        values = []
+        for plex_guid, t_id, imdb_id, expired, media_type in rows:
+            expiration_date = datetime.now() if expired is True else (datetime.now() - timedelta(days=random.randint(1, self.expiration)))
+            values.append((t_id, imdb_id, expiration_date.strftime("%Y-%m-%d"), media_type, plex_guid))
+        with sqlite3.connect(self.cache_path) as connection:
+            connection.row_factory = sqlite3.Row
+            with closing(connection.cursor()) as cursor:
+                cursor.executemany(f"INSERT OR IGNORE INTO guids_map(plex_guid) VALUES(?)", [(v[4],) for v in values])
+                cursor.executemany(f"UPDATE guids_map SET t_id = ?, imdb_id = ?, expiration_date = ?, media_type = COALESCE(?, media_type) WHERE plex_guid = ?", values)
+
     def query_imdb_to_tmdb_map(self, _id, imdb=True, media_type=None, return_type=False):
         from_id = "imdb_id" if imdb else "tmdb_id"
         to_id = "tmdb_id" if imdb else "imdb_id"
@@ -372,6 +412,14 @@ class Cache:
     def update_imdb_to_tmdb_map(self, media_type, expired, imdb_id, tmdb_id):
         self._update_map("imdb_to_tmdb_map", "imdb_id", imdb_id, "tmdb_id", tmdb_id, expired, media_type=media_type)
 
+    def query_imdb_to_tmdb_maps(self, ids, imdb=True):
+        from_id = "imdb_id" if imdb else "tmdb_id"
+        to_id = "tmdb_id" if imdb else "imdb_id"
+        return self._query_maps("imdb_to_tmdb_map", ids, from_id, to_id, return_type=True)
+
+    def update_imdb_to_tmdb_maps(self, rows):
+        self._update_maps("imdb_to_tmdb_map", "imdb_id", "tmdb_id", [(imdb_id, tmdb_id, expired, media_type) for media_type, expired, imdb_id, tmdb_id in rows], media_type=True)
+
     def query_imdb_to_tvdb_map(self, _id, imdb=True):
         from_id = "imdb_id" if imdb else "tvdb_id"
         to_id = "tvdb_id" if imdb else "imdb_id"
@@ -388,6 +436,30 @@ class Cache:
     def update_tmdb_to_tvdb_map(self, expired, tmdb_id, tvdb_id):
         self._update_map("tmdb_to_tvdb_map2", "tmdb_id", tmdb_id, "tvdb_id", tvdb_id, expired)
 
+    def query_tmdb_to_tvdb_maps(self, ids, tmdb=True):
+        from_id = "tmdb_id" if tmdb else "tvdb_id"
+        to_id = "tvdb_id" if tmdb else "tmdb_id"
+        return self._query_maps("tmdb_to_tvdb_map2", ids, from_id, to_id)
+
+    def update_tmdb_to_tvdb_maps(self, rows):
+        self._update_maps("tmdb_to_tvdb_map2", "tmdb_id", "tvdb_id", [(tmdb_id, tvdb_id, expired, None) for expired, tmdb_id, tvdb_id in rows])
+
+    def query_crosswalk_rows(self):
+        rows = {}
+        with sqlite3.connect(self.cache_path) as connection:
+            connection.row_factory = sqlite3.Row
+            with closing(connection.cursor()) as cursor:
+                for name, sql in [
+                    ("imdb_to_tmdb", "SELECT imdb_id, tmdb_id, media_type FROM imdb_to_tmdb_map WHERE tmdb_id IS NOT NULL"),
+                    ("imdb_to_tvdb", "SELECT imdb_id, tvdb_id FROM imdb_to_tvdb_map2 WHERE tvdb_id IS NOT NULL"),
+                    ("tmdb_to_tvdb", "SELECT tmdb_id, tvdb_id FROM tmdb_to_tvdb_map2 WHERE tvdb_id IS NOT NULL"),
+                    ("tmdb_movie", "SELECT tmdb_id, imdb_id FROM tmdb_movie_data WHERE imdb_id IS NOT NULL"),
+                    ("tmdb_show", "SELECT tmdb_id, imdb_id, tvdb_id FROM tmdb_show_data3")
+                ]:
+                    cursor.execute(sql)
+                    rows[name] = [tuple(row) for row in cursor.fetchall()]
+        return rows
+
     def query_letterboxd_map(self, letterboxd_id):
         return self._query_map("letterboxd_map", letterboxd_id, "letterboxd_id", "tmdb_id")
 
@@ -442,6 +514,49 @@ class Cache:
                     sql = f"UPDATE {map_name} SET {val2_name} = ?, expiration_date = ?, media_type = ? WHERE {val1_name} = ?"
                     cursor.execute(sql, (val2, expiration_date.strftime("%Y-%m-%d"), media_type, val1))
 
+    def _query_maps(self, map_name, ids, from_id, to_id, return_type=False):
+        results = {}
+        lookup = {str(_id): _id for _id in ids}
+        keys = list(lookup)
+        with sqlite3.connect(self.cache_path) as connection:
+            connection.row_factory = sqlite3.Row
+            with closing(connection.cursor()) as cursor:
+                for i in range(0, len(keys), 500):
+                    chunk = keys[i:i + 500]
+                    cursor.execute(f"SELECT * FROM {map_name} WHERE {from_id} IN ({', '.join('?' * len(chunk))})", chunk)
+                    for row in cursor.fetchall():
+                        if str(row[from_id]) not in lookup:
+                            continue
+                        id_to_return = None
+                        expired = None
+                        if row[to_id]:
+                            datetime_object = datetime.strptime(row["expiration_date"], "%Y-%m-%d")
+                            if "_" in str(row[to_id]):
+                                id_to_return = row[to_id]
+                            else:
+                                try:
+                                    id_to_return = int(row[to_id])
+                                except ValueError:
+                                    id_to_return = row[to_id]
+                            expired = (datetime.now() - datetime_object).days > self.expiration
+                        _id = lookup[str(row[from_id])]
+                        results[_id] = (id_to_return, row["media_type"], expired) if return_type else (id_to_return, expired)
+        return results
+
+    def _update_maps(self, map_name, val1_name, val2_name, rows, media_type=False):
+        values = []
+        for val1, val2, expired, row_type in rows:
+            expiration_date = datetime.now() if expired is True else (datetime.now() - timedelta(days=random.randint(1, self.expiration)))
+            values.append((val2, expiration_date.strftime("%Y-%m-%d"), row_type, val1) if media_type else (val2, expiration_date.strftime("%Y-%m-%d"), val1))
+        with sqlite3.connect(self.cache_path) as connection:
+            connection.row_factory = sqlite3.Row
+            with closing(connection.cursor()) as cursor:
+                cursor.executemany(f"INSERT OR IGNORE INTO {map_name}({val1_name}) VALUES(?)", [(v[-1],) for v in values])
+                if media_type:
+                    cursor.executemany(f"UPDATE {map_name} SET {val2_name} = ?, expiration_date = ?, media_type = ? WHERE {val1_name} = ?", values)
+                else:
+                    cursor.executemany(f"UPDATE {map_name} SET {val2_name} = ?, expiration_date = ? WHERE {val1_name} = ?", values)
+
     def query_omdb(self, imdb_id, expiration):
         omdb_dict = {}
         expired = None
@@ -1137,3 +1252,68 @@ class Cache:
                 cursor.execute(f"INSERT OR IGNORE INTO testing(name) VALUES(?)", (name,))
                 sql = f"UPDATE testing SET value1 = ?, value2 = ?, success = ? WHERE name = ?"
                 cursor.execute(sql, (value1, value2, success, name))
+
+    def query_asset_index(self):
+        listings = {}
+        with sqlite3.connect(self.cache_path) as connection:
+            connection.row_factory = sqlite3.Row
+            with closing(connection.cursor()) as cursor:
+                cursor.execute("SELECT * FROM asset_index")
+                for row in cursor:
+                    listings[row["directory"]] = (row["modified"], json.loads(row["entries"]))
+        return listings
+
+    def update_asset_index(self, listings, removed=None):
+        with sqlite3.connect(self.cache_path) as connection:
+            connection.row_factory = sqlite3.Row
+            with closing(connection.cursor()) as cursor:
+                if removed:
+                    cursor.executemany("DELETE FROM asset_index WHERE directory = ?", [(d,) for d in removed])
+                cursor.executemany("INSERT OR REPLACE INTO asset_index(directory, modified, entries) VALUES(?, ?, ?)",
+                                   [(d, m, json.dumps(e)) for d, (m, e) in listings.items()])
+
+    def query_image_dimensions(self, paths):
+        dimensions = {}
+        with sqlite3.connect(self.cache_path) as connection:
+            connection.row_factory = sqlite3.Row
+            with closing(connection.cursor()) as cursor:
+                for i in range(0, len(paths), 500):
+                    chunk = paths[i:i + 500]
+                    cursor.execute(f"SELECT * FROM image_dimensions WHERE path IN ({', '.join(['?'] * len(chunk))})", chunk)
+                    for row in cursor:
+                        dimensions[row["path"]] = (row["size"], row["modified"], row["width"], row["height"])
+        return dimensions
+
+    def update_image_dimensions(self, dimensions):
+        with sqlite3.connect(self.cache_path) as connection:
+            connection.row_factory = sqlite3.Row
+            with closing(connection.cursor()) as cursor:
+                cursor.executemany("INSERT OR REPLACE INTO image_dimensions(path, size, modified, width, height) VALUES(?, ?, ?, ?, ?)", dimensions)
+
+    def query_library_id_map(self, library):
+        id_map = {}
+        with sqlite3.connect(self.cache_path) as connection:
+            connection.row_factory = sqlite3.Row
+            with closing(connection.cursor()) as cursor:
+                cursor.execute("SELECT * FROM library_id_map WHERE library = ?", (library,))
+                for row in cursor:
+                    time_between_insertion = datetime.now() - datetime.strptime(row["expiration_date"], "%Y-%m-%d")
+                    id_map[row["rating_key"]] = (
+                        row["guid"], row["id_type"], util.get_list(row["main_ids"], int_list=True) if row["main_ids"] else None,
+                        util.get_list(row["imdb_ids"]) if row["imdb_ids"] else None, row["chosen_id"], time_between_insertion.days > self.expiration
+                    )
+        return id_map
+
+    def update_library_id_map(self, library, rows, removed=None):
+        values = []
+        for rating_key, guid, id_type, main_ids, imdb_ids, chosen_id in rows:
+            expiration_date = datetime.now() - timedelta(days=random.randint(1, self.expiration))
+            values.append((library, rating_key, guid, id_type, ",".join([str(m) for m in main_ids]) if main_ids else None,
+                           ",".join(imdb_ids) if imdb_ids else None, chosen_id, expiration_date.strftime("%Y-%m-%d")))
+        with sqlite3.connect(self.cache_path) as connection:
+            connection.row_factory = sqlite3.Row
+            with closing(connection.cursor()) as cursor:
+                if removed:
+                    cursor.executemany("DELETE FROM library_id_map WHERE library = ? AND rating_key = ?", [(library, k) for k in removed])
+                cursor.executemany("INSERT OR REPLACE INTO library_id_map(library, rating_key, guid, id_type, main_ids, imdb_ids, chosen_id, expiration_date) "
+                                   "VALUES(?, ?, ?, ?, ?, ?, ?, ?)", values)
@@ -3,6 +3,7 @@ from datetime import datetime
 from modules import util, radarr, sonarr, operations
 from modules.anidb import AniDB
 from modules.anilist import AniList
+from modules.assets import AssetIndex
 from modules.cache import Cache
 from modules.convert import Convert
 from modules.ergast import Ergast
@@ -482,6 +483,13 @@ class ConfigFile:
             "prioritize_assets": check_for_attribute(self.data, "prioritize_assets", parent="settings", var_type="bool", default=False),
             "dimensional_asset_rename": check_for_attribute(self.data, "dimensional_asset_rename", parent="settings", var_type="bool", default=False),
             "download_url_assets": check_for_attribute(self.data, "download_url_assets", parent="settings", var_type="bool", default=False),
+            "persist_asset_index": check_for_attribute(self.data, "persist_asset_index", parent="settings", var_type="bool", default=False, save=False, do_print=False),
+            "imdb_dataset_background": check_for_attribute(self.data, "imdb_dataset_background", parent="settings", var_type="bool", default=False, save=False, do_print=False),
+            "imdb_dataset_refresh": check_for_attribute(self.data, "imdb_dataset_refresh", parent="settings", var_type="int", default=24, int_min=0, save=False, do_print=False),
+            "image_upload_workers": check_for_attribute(self.data, "image_upload_workers", parent="settings", var_type="int", default=1, int_min=1, save=False, do_print=False),
+            "level_cache_size": check_for_attribute(self.data, "level_cache_size", parent="settings", var_type="int", default=250000, int_min=0, save=False, do_print=False),
+            "compact_id_maps": check_for_attribute(self.data, "compact_id_maps", parent="settings", var_type="bool", default=False, save=False, do_print=False),
+            "mapping_workers": check_for_attribute(self.data, "mapping_workers", parent="settings", var_type="int", default=1, int_min=1, save=False, do_print=False),
             "show_missing_assets": check_for_attribute(self.data, "show_missing_assets", parent="settings", var_type="bool", default=True),
             "show_missing_season_assets": check_for_attribute(self.data, "show_missing_season_assets", parent="settings", var_type="bool", default=False),
             "show_missing_episode_assets": check_for_attribute(self.data, "show_missing_episode_assets", parent="settings", var_type="bool", default=False),
@@ -560,6 +568,7 @@ class ConfigFile:
             self.Cache = Cache(self.config_path, self.general["cache_expiration"])
         else:
             self.Cache = None
+        self.AssetIndex = AssetIndex(self.Cache if self.general["persist_asset_index"] else None)
 
         self.GitHub = GitHub(self.Requests, {
             "token": check_for_attribute(self.data, "token", parent="github", default_is_none=True)
@@ -799,8 +808,8 @@ class ConfigFile:
                         logger.separator(f"Skipping {e} Playlist File")
 
             self.TVDb = TVDb(self.Requests, self.Cache, self.general["tvdb_language"], self.general["cache_expiration"])
-            self.IMDb = IMDb(self.Requests, self.Cache, self.default_dir)
-            self.Convert = Convert(self.Requests, self.Cache, self.TMDb)
+            self.IMDb = IMDb(self.Requests, self.Cache, self.default_dir, dataset_refresh=self.general["imdb_dataset_refresh"], dataset_background=self.general["imdb_dataset_background"])
+            self.Convert = Convert(self.Requests, self.Cache, self.TMDb, self.default_dir)
             self.AniList = AniList(self.Requests)
             self.ICheckMovies = ICheckMovies(self.Requests)
             self.Letterboxd = Letterboxd(self.Requests, self.Cache)
@@ -817,7 +826,9 @@ class ConfigFile:
                 "token": check_for_attribute(self.data, "token", parent="plex", default_is_none=True),
                 "timeout": check_for_attribute(self.data, "timeout", parent="plex", var_type="int", default=60),
                 "verify_ssl": check_for_attribute(self.data, "verify_ssl", parent="plex", var_type="bool", default_is_none=True),
-                "db_cache": check_for_attribute(self.data, "db_cache", parent="plex", var_type="int", default_is_none=True)
+                "db_cache": check_for_attribute(self.data, "db_cache", parent="plex", var_type="int", default_is_none=True),
+                "max_uploads": check_for_attribute(self.data, "max_uploads", parent="plex", var_type="int", default=4, int_min=1, save=False, do_print=False),
+                "user_workers": check_for_attribute(self.data, "user_workers", parent="plex", var_type="int", default=4, int_min=1, save=False, do_print=False)
             }
             for attr in ["clean_bundles", "empty_trash", "optimize"]:
                 try:
@@ -870,6 +881,7 @@ class ConfigFile:
                 "apikey": check_for_attribute(self.data, "apikey", parent="tautulli", default_is_none=True)
             }
 
+            self.plex_servers = {}
             self.libraries = []
             libs = check_for_attribute(self.data, "libraries", throw=True)
 
@@ -889,6 +901,10 @@ class ConfigFile:
                 params["asset_directory"] = check_for_attribute(lib, "asset_directory", parent="settings", var_type="list_path", default=self.general["asset_directory"], default_is_none=True, do_print=False, save=False)
                 params["asset_folders"] = check_for_attribute(lib, "asset_folders", parent="settings", var_type="bool", default=self.general["asset_folders"], do_print=False, save=False)
                 params["asset_depth"] = check_for_attribute(lib, "asset_depth", parent="settings", var_type="int", default=self.general["asset_depth"], do_print=False, save=False)
+                params["image_upload_workers"] = check_for_attribute(lib, "image_upload_workers", parent="settings", var_type="int", default=self.general["image_upload_workers"], int_min=1, do_print=False, save=False)
+                params["level_cache_size"] = check_for_attribute(lib, "level_cache_size", parent="settings", var_type="int", default=self.general["level_cache_size"], int_min=0, do_print=False, save=False)
+                params["compact_id_maps"] = check_for_attribute(lib, "compact_id_maps", parent="settings", var_type="bool", default=self.general["compact_id_maps"], do_print=False, save=False)
+                params["mapping_workers"] = check_for_attribute(lib, "mapping_workers", parent="settings", var_type="int", default=self.general["mapping_workers"], int_min=1, do_print=False, save=False)
                 params["sync_mode"] = check_for_attribute(lib, "sync_mode", parent="settings", test_list=sync_modes, default=self.general["sync_mode"], do_print=False, save=False)
                 params["default_collection_order"] = check_for_attribute(lib, "default_collection_order", parent="settings", default=self.general["default_collection_order"], default_is_none=True, do_print=False, save=False)
                 params["show_unmanaged"] = check_for_attribute(lib, "show_unmanaged", parent="settings", var_type="bool", default=self.general["show_unmanaged"], do_print=False, save=False)
@@ -1217,7 +1233,9 @@ class ConfigFile:
                         "token": check_for_attribute(lib, "token", parent="plex", default=self.general["plex"]["token"], req_default=True, save=False),
                         "timeout": check_for_attribute(lib, "timeout", parent="plex", var_type="int", default=self.general["plex"]["timeout"], save=False),
                         "verify_ssl": check_for_attribute(lib, "verify_ssl", parent="plex", var_type="bool", default=self.general["plex"]["verify_ssl"], default_is_none=True, save=False),
-                        "db_cache": check_for_attribute(lib, "db_cache", parent="plex", var_type="int", default=self.general["plex"]["db_cache"], default_is_none=True, save=False)
+                        "db_cache": check_for_attribute(lib, "db_cache", parent="plex", var_type="int", default=self.general["plex"]["db_cache"], default_is_none=True, save=False),
+                        "max_uploads": check_for_attribute(lib, "max_uploads", parent="plex", var_type="int", default=self.general["plex"]["max_uploads"], int_min=1, save=False, do_print=False),
+                        "user_workers": check_for_attribute(lib, "user_workers", parent="plex", var_type="int", default=self.general["plex"]["user_workers"], int_min=1, save=False, do_print=False)
                     }
                     for attr in ["clean_bundles", "empty_trash", "optimize"]:
                         try:
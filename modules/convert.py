@@ -1,5 +1,7 @@
-import re
+import os, pickle, re, threading, time
+from concurrent.futures import ThreadPoolExecutor
 from modules import util
+from modules.crosswalk import Crosswalk
 from modules.util import Failed, NonExisting
 from modules.request import urlparse
 from plexapi.exceptions import BadRequest
@@ -8,51 +10,103 @@ from requests.exceptions import ConnectionError
 logger = util.logger
 
 anime_lists_url = "https://raw.githubusercontent.com/Kometa-Team/Anime-IDs/master/anime_ids.json"
+anime_indexes = [
+    "_anidb_ids", "_mal_to_anidb", "_anidb_to_mal", "_anilist_to_anidb", "_anidb_to_imdb", "_anidb_to_tvdb",
+    "_anidb_to_tmdb_movie", "_anidb_to_tmdb_show", "_tmdb_movie_to_anidb", "_tmdb_show_to_anidb", "_imdb_to_anidb", "_tvdb_to_anidb"
+]
+lookup_limit = 8
+lookup_rate = 20
 
 class Convert:
-    def __init__(self, requests, cache, tmdb):
+    def __init__(self, requests, cache, tmdb, default_dir):
         self.requests = requests
         self.cache = cache
         self.tmdb = tmdb
-        self._anidb_ids = {}
-        self._mal_to_anidb = {}
-        self._anidb_to_mal = {}
-        self._anilist_to_anidb = {}
-        self._anidb_to_imdb = {}
-        self._anidb_to_tvdb = {}
-        self._anidb_to_tmdb_movie = {}
-        self._anidb_to_tmdb_show = {}
-        self._tmdb_movie_to_anidb = {}
-        self._tmdb_show_to_anidb = {}
-        self._imdb_to_anidb = {}
-        self._tvdb_to_anidb = {}
-        self._anidb_ids = self.requests.get_json(anime_lists_url)
-        for anidb_id, ids in self._anidb_ids.items():
+        self.anime_path = os.path.join(default_dir, "anime_ids.pickle")
+        self._anime_lock = threading.Lock()
+        self.crosswalk = Crosswalk(os.path.join(default_dir, "id_index.bin"), cache.expiration if cache else None)
+        self._lookup_slots = threading.BoundedSemaphore(lookup_limit)
+        self._lookup_lock = threading.Lock()
+        self._next_lookup = 0.0
+
+    def __getattr__(self, attr):
+        if attr in anime_indexes:
+            self._load_anime()
+            return self.__dict__[attr]
+        raise AttributeError(f"'Convert' object has no attribute '{attr}'")
+
+    def _load_anime(self):
+        with self._anime_lock:
+            if "_anidb_ids" in self.__dict__:
+                return
+            saved = {}
+            if os.path.exists(self.anime_path):
+                try:
+                    with open(self.anime_path, "rb") as handle:
+                        saved = pickle.load(handle)
+                except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError) as e:
+                    logger.debug(f"Convert Error: Unable to read {self.anime_path}: {e}")
+            indexes = None
+            headers = {}
+            if saved.get("etag"):
+                headers["If-None-Match"] = saved["etag"]
+            if saved.get("modified"):
+                headers["If-Modified-Since"] = saved["modified"]
+            try:
+                response = self.requests.get(anime_lists_url, headers=headers)
+                if response.status_code == 304 and "indexes" in saved:
+                    logger.debug("Anime ID Mapping Unchanged Since Last Download")
+                    indexes = saved["indexes"]
+                elif response.status_code >= 400:
+                    raise Failed(f"Convert Error: {response.status_code} on {anime_lists_url}")
+                else:
+                    indexes = self._build_anime(response.json())
+                    try:
+                        with open(self.anime_path, "wb") as handle:
+                            pickle.dump({"etag": response.headers.get("ETag"), "modified": response.headers.get("Last-Modified"), "indexes": indexes}, handle, protocol=pickle.HIGHEST_PROTOCOL)
+                    except OSError as e:
+                        logger.debug(f"Convert Error: Unable to save {self.anime_path}: {e}")
+            except Exception as e:
+                if "indexes" in saved:
+                    logger.warning(f"Convert Warning: Using saved Anime ID Mapping: {e}")
+                    indexes = saved["indexes"]
+                else:
+                    logger.error(f"Convert Error: Anime ID Mapping failed to load: {e}")
+                    indexes = {attr: {} for attr in anime_indexes}
+            for attr in anime_indexes:
+                self.__dict__[attr] = indexes[attr]
+
+    def _build_anime(self, anime_ids):
+        indexes = {attr: {} for attr in anime_indexes}
+        indexes["_anidb_ids"] = set(anime_ids)
+        for anidb_id, ids in anime_ids.items():
             anidb_id = int(anidb_id)
             if "mal_id" in ids:
                 for mal_id in util.get_list(ids["mal_id"], int_list=True):
-                    self._mal_to_anidb[mal_id] = anidb_id
-                    if anidb_id not in self._anidb_to_mal:
-                        self._anidb_to_mal[anidb_id] = mal_id
+                    indexes["_mal_to_anidb"][mal_id] = anidb_id
+                    if anidb_id not in indexes["_anidb_to_mal"]:
+                        indexes["_anidb_to_mal"][anidb_id] = mal_id
             if "anilist_id" in ids:
                 for anilist_id in util.get_list(ids["anilist_id"], int_list=True):
-                    self._anilist_to_anidb[anilist_id] = anidb_id
+                    indexes["_anilist_to_anidb"][anilist_id] = anidb_id
             if "imdb_id" in ids and str(ids["imdb_id"]).startswith("tt"):
-                self._anidb_to_imdb[anidb_id] = util.get_list(ids["imdb_id"])
-                for im_id in self._anidb_to_imdb[anidb_id]:
-                    self._imdb_to_anidb[im_id] = anidb_id
+                indexes["_anidb_to_imdb"][anidb_id] = util.get_list(ids["imdb_id"])
+                for im_id in indexes["_anidb_to_imdb"][anidb_id]:
+                    indexes["_imdb_to_anidb"][im_id] = anidb_id
             if "tvdb_id" in ids:
-                self._anidb_to_tvdb[anidb_id] = int(ids["tvdb_id"])
+                indexes["_anidb_to_tvdb"][anidb_id] = int(ids["tvdb_id"])
                 if "tvdb_season" in ids and ids["tvdb_season"] in [1, -1] and ids["tvdb_epoffset"] == 0:
-                    self._tvdb_to_anidb[int(ids["tvdb_id"])] = anidb_id
+                    indexes["_tvdb_to_anidb"][int(ids["tvdb_id"])] = anidb_id
             if "tmdb_movie_id" in ids:
-                self._anidb_to_tmdb_movie[anidb_id] = util.get_list(ids["tmdb_movie_id"], int_list=True)
-                for tm_id in self._anidb_to_tmdb_movie[anidb_id]:
-                    self._tmdb_movie_to_anidb[tm_id] = anidb_id
+                indexes["_anidb_to_tmdb_movie"][anidb_id] = util.get_list(ids["tmdb_movie_id"], int_list=True)
+                for tm_id in indexes["_anidb_to_tmdb_movie"][anidb_id]:
+                    indexes["_tmdb_movie_to_anidb"][tm_id] = anidb_id
             if "tmdb_show_id" in ids:
-                self._anidb_to_tmdb_show[anidb_id] = util.get_list(ids["tmdb_show_id"], int_list=True)
-                for tm_id in self._anidb_to_tmdb_show[anidb_id]:
-                    self._tmdb_show_to_anidb[tm_id] = anidb_id
+                indexes["_anidb_to_tmdb_show"][anidb_id] = util.get_list(ids["tmdb_show_id"], int_list=True)
+                for tm_id in indexes["_anidb_to_tmdb_show"][anidb_id]:
+                    indexes["_tmdb_show_to_anidb"][tm_id] = anidb_id
+        logger.debug(f"Built Anime ID Mapping for {len(anime_ids)} AniDB IDs")
+        return indexes
 
     def imdb_to_anidb(self, imdb_id):
         if imdb_id in self._imdb_to_anidb:
@@ -151,7 +205,7 @@ class Convert:
             if cache_id and not expired:
                 return cache_id
         try:
-            imdb_id = self.tmdb.convert_from(tmdb_id, "imdb_id", is_movie)
+            imdb_id = self.throttled(lambda i: self.tmdb.convert_from(i, "imdb_id", is_movie), tmdb_id)
             if imdb_id:
                 if self.cache:
                     self.cache.update_imdb_to_tmdb_map(media_type, expired, imdb_id, tmdb_id)
@@ -163,39 +217,47 @@ class Convert:
         else:
             return None
 
-    def imdb_to_tmdb(self, imdb_id, fail=False):
-        expired = False
-        if self.cache:
-            cache_id, cache_type, expired = self.cache.query_imdb_to_tmdb_map(imdb_id, imdb=True, return_type=True)
-            if cache_id and not expired:
-                return cache_id, cache_type
-        try:
-            tmdb_id, tmdb_type = self.tmdb.convert_imdb_to(imdb_id)
+    def imdb_to_tmdb(self, imdb_id, fail=False, batch=None):
+        if batch is not None and imdb_id in batch:
+            if batch[imdb_id][0]:
+                return batch[imdb_id]
+        else:
+            expired = False
+            if self.cache:
+                cache_id, cache_type, expired = self.cache.query_imdb_to_tmdb_map(imdb_id, imdb=True, return_type=True)
+                if cache_id and not expired:
+                    return cache_id, cache_type
+            found = self.crosswalk.imdb_to_tmdb(imdb_id)
+            if found:
+                return found
+            tmdb_id, tmdb_type = self.throttled(self._imdb_to_tmdb_lookup, imdb_id)
             if tmdb_id:
                 if self.cache:
                     self.cache.update_imdb_to_tmdb_map(tmdb_type, expired, imdb_id, tmdb_id)
                 return tmdb_id, tmdb_type
-        except Failed:
-            pass
         if fail:
             raise Failed(f"Convert Warning: No TMDb ID Found for IMDb ID: {imdb_id}")
         else:
             return None, None
 
-    def tmdb_to_tvdb(self, tmdb_id, fail=False):
-        expired = False
-        if self.cache:
-            cache_id, expired = self.cache.query_tmdb_to_tvdb_map(tmdb_id, tmdb=True)
-            if cache_id and not expired:
-                return cache_id
-        try:
-            tvdb_id = self.tmdb.convert_from(tmdb_id, "tvdb_id", False)
+    def tmdb_to_tvdb(self, tmdb_id, fail=False, batch=None):
+        if batch is not None and tmdb_id in batch:
+            if batch[tmdb_id]:
+                return batch[tmdb_id]
+        else:
+            expired = False
+            if self.cache:
+                cache_id, expired = self.cache.query_tmdb_to_tvdb_map(tmdb_id, tmdb=True)
+                if cache_id and not expired:
+                    return cache_id
+            found = self.crosswalk.get("tmdb_tvdb", tmdb_id)
+            if found:
+                return found
+            tvdb_id = self.throttled(self._tmdb_to_tvdb_lookup, tmdb_id)
             if tvdb_id:
                 if self.cache:
                     self.cache.update_tmdb_to_tvdb_map(expired, tmdb_id, tvdb_id)
                 return tvdb_id
-        except Failed:
-            pass
         if fail:
             raise Failed(f"Convert Warning: No TVDb ID Found for TMDb ID: {tmdb_id}")
         else:
@@ -207,19 +269,105 @@ class Convert:
             cache_id, expired = self.cache.query_tmdb_to_tvdb_map(tvdb_id, tmdb=False)
             if cache_id and not expired:
                 return cache_id
-        try:
-            tmdb_id = self.tmdb.convert_tvdb_to(tvdb_id)
-            if tmdb_id:
-                if self.cache:
-                    self.cache.update_tmdb_to_tvdb_map(expired, tmdb_id, tvdb_id)
-                return tmdb_id
-        except Failed:
-            pass
+        found = self.crosswalk.get("tvdb_tmdb", tvdb_id)
+        if found:
+            return found
+        tmdb_id = self.throttled(self._tvdb_to_tmdb_lookup, tvdb_id)
+        if tmdb_id:
+            if self.cache:
+                self.cache.update_tmdb_to_tvdb_map(expired, tmdb_id, tvdb_id)
+            return tmdb_id
         if fail:
             raise Failed(f"Convert Warning: No TMDb ID Found for TVDb ID: {tvdb_id}")
         else:
             return None
 
+    def build_id_index(self):
+        self.crosswalk.build(self.cache, self)
+
+    def _imdb_to_tmdb_lookup(self, imdb_id):
+        try:
+            return self.tmdb.convert_imdb_to(imdb_id)
+        except Failed:
+            return None, None
+
+    def _tmdb_to_tvdb_lookup(self, tmdb_id):
+        try:
+            return self.tmdb.convert_from(tmdb_id, "tvdb_id", False)
+        except Failed:
+            return None
+
+    def _tvdb_to_tmdb_lookup(self, tvdb_id):
+        try:
+            return self.tmdb.convert_tvdb_to(tvdb_id)
+        except Failed:
+            return None
+
+    def throttled(self, function, _id):
+        with self._lookup_slots:
+            with self._lookup_lock:
+                now = time.monotonic()
+                wait = self._next_lookup - now
+                self._next_lookup = max(now, self._next_lookup) + 1 / lookup_rate
+            if wait > 0:
+                time.sleep(wait)
+            return function(_id)
+
+    def _lookup_batch(self, ids, function, workers):
+        workers = min(workers, lookup_limit)
+        if workers > 1 and len(ids) > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return dict(zip(ids, executor.map(lambda i: self.throttled(function, i), ids)))
+        return {_id: self.throttled(function, _id) for _id in ids}
+
+    def imdb_to_tmdb_batch(self, imdb_ids, workers=1):
+        results = {}
+        expired = {}
+        imdb_ids = list(dict.fromkeys(imdb_ids))
+        if self.cache:
+            for imdb_id, (cache_id, cache_type, cache_expired) in self.cache.query_imdb_to_tmdb_maps(imdb_ids, imdb=True).items():
+                if cache_id and not cache_expired:
+                    results[imdb_id] = (cache_id, cache_type)
+                else:
+                    expired[imdb_id] = cache_expired
+        for imdb_id in imdb_ids:
+            if imdb_id not in results:
+                found = self.crosswalk.imdb_to_tmdb(imdb_id)
+                if found:
+                    results[imdb_id] = found
+        updates = []
+        for imdb_id, (tmdb_id, tmdb_type) in self._lookup_batch([i for i in imdb_ids if i not in results], self._imdb_to_tmdb_lookup, workers).items():
+            results[imdb_id] = (tmdb_id, tmdb_type)
+            if tmdb_id:
+                updates.append((tmdb_type, expired.get(imdb_id, False), imdb_id, tmdb_id))
+        if self.cache and updates:
+            self.cache.update_imdb_to_tmdb_maps(updates)
+        return results
+
+    def tmdb_to_tvdb_batch(self, tmdb_ids, workers=1):
+        results = {}
+        expired = {}
+        tmdb_ids = list(dict.fromkeys(tmdb_ids))
+        if self.cache:
+            for tmdb_id, (cache_id, cache_expired) in self.cache.query_tmdb_to_tvdb_maps(tmdb_ids, tmdb=True).items():
+                if cache_id and not cache_expired:
+                    results[tmdb_id] = cache_id
+                else:
+                    expired[tmdb_id] = cache_expired
+        for tmdb_id in tmdb_ids:
+            if tmdb_id not in results:
+                found = self.crosswalk.get("tmdb_tvdb", tmdb_id)
+                if found:
+                    results[tmdb_id] = found
+        updates = []
+        for tmdb_id, tvdb_id in self._lookup_batch([i for i in tmdb_ids if i not in results], self._tmdb_to_tvdb_lookup, workers).items():
+            results[tmdb_id] = tvdb_id
+            if tvdb_id:
+                updates.append((expired.get(tmdb_id, False), tmdb_id, tvdb_id))
+        if self.cache and updates:
+            self.cache.update_tmdb_to_tvdb_maps(updates)
+        return results
+
     def tvdb_to_imdb(self, tvdb_id, fail=False):
         expired = False
         if self.cache:
@@ -245,6 +393,9 @@ class Convert:
             cache_id, expired = self.cache.query_imdb_to_tvdb_map(imdb_id, imdb=True)
             if cache_id and not expired:
                 return cache_id
+        found = self.crosswalk.get("imdb_tvdb", imdb_id)
+        if found:
+            return found
         try:
             tmdb_id, tmdb_type = self.imdb_to_tmdb(imdb_id, fail=True)
             if tmdb_type == "show":
@@ -269,18 +420,21 @@ class Convert:
             cache_id, imdb_check, media_type, expired = self.cache.query_guid_map(guid)
             if (cache_id or imdb_check) and not expired:
                 media_id_type = "movie" if "movie" in media_type else "show"
-                if item_type == "hama" and check_id.startswith("anidb"):
-                    anidb_id = int(re.search("-(.*)", check_id).group(1))
-                    library.anidb_map[anidb_id] = rating_key
-                elif item_type == "myanimelist":
-                    library.mal_map[int(check_id)] = rating_key
+                self.map_anime_guid(rating_key, item_type, check_id, library)
         return media_id_type, cache_id, imdb_check, expired
 
+    def map_anime_guid(self, rating_key, item_type, check_id, library):
+        if item_type == "hama" and check_id.startswith("anidb"):
+            anidb_id = int(re.search("-(.*)", check_id).group(1))
+            library.anidb_map[anidb_id] = rating_key
+        elif item_type == "myanimelist":
+            library.mal_map[int(check_id)] = rating_key
+
     def scan_guid(self, guid_str):
         guid = urlparse(guid_str)
         return guid.scheme.split(".")[-1], guid.netloc
 
-    def get_id(self, item, library):
+    def get_id(self, item, library, cache_updates=None):
         expired = None
         tmdb_id = []
         tvdb_id = []
@@ -387,7 +541,10 @@ class Convert:
                     imdb_in = ",".join([str(i) for i in imdb_in]) if imdb_in else None
                     ids = f"{item.guid:<46} | {id_type} ID: {cache_ids:<7} | IMDb ID: {str(imdb_in):<10}"
                     logger.info(f" Cache  |  {'^' if expired else '+'}  | {ids} | {item.title}")
-                    self.cache.update_guid_map(item.guid, cache_ids, imdb_in, expired, guid_type)
+                    if cache_updates is None:
+                        self.cache.update_guid_map(item.guid, cache_ids, imdb_in, expired, guid_type)
+                    else:
+                        cache_updates.append((item.guid, cache_ids, imdb_in, expired, guid_type))
 
             if (tmdb_id or imdb_id) and library.is_movie:
                 update_cache(tmdb_id, "TMDb", imdb_id, "movie")
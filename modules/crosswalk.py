@@ -0,0 +1,158 @@
+import bisect, mmap, os, struct, threading, time
+from array import array
+from modules import idmap, util
+
+logger = util.logger
+
+magic = b"KMTXW02\n"
+sections = ["imdb_tmdb_movie", "imdb_tmdb_show", "imdb_tvdb", "tmdb_tvdb", "tvdb_tmdb"]
+imdb_sections = ["imdb_tmdb_movie", "imdb_tmdb_show", "imdb_tvdb"]
+
+def _encode(section, key):
+    if section in imdb_sections:
+        return idmap.encode_imdb(key)
+    if isinstance(key, str) and key.isdigit():
+        return int(key)
+    return idmap.encode_int(key)
+
+
+class Crosswalk:
+    def __init__(self, path, expiration=None):
+        self.path = path
+        self.expiration = expiration
+        self.created = None
+        self.handle = None
+        self.map = None
+        self.view = None
+        self.sections = None
+        self.lock = threading.Lock()
+
+    def _open(self):
+        with self.lock:
+            return self._load()
+
+    def _load(self):
+        if self.sections is None:
+            self.sections = {}
+            try:
+                if os.path.getsize(self.path) > len(magic):
+                    self.handle = open(self.path, "rb")
+                    self.map = mmap.mmap(self.handle.fileno(), 0, access=mmap.ACCESS_READ)
+                    if self.map[:len(magic)] != magic:
+                        raise ValueError("unknown format, rebuild it with --build-id-index")
+                    self.created = struct.unpack_from("=d", self.map, len(magic))[0]
+                    offset = len(magic) + 8
+                    age = (time.time() - self.created) / 86400
+                    if self.expiration and age > self.expiration:
+                        logger.warning(f"Crosswalk Warning: {os.path.basename(self.path)} is {int(age)} days old and past the {self.expiration} day cache expiration, "
+                                       f"rebuild it with --build-id-index to use it again")
+                        self.close()
+                        self.sections = {}
+                        return self.sections
+                    self.view = memoryview(self.map)
+                    for section in sections:
+                        count = struct.unpack_from("=q", self.map, offset)[0]
+                        offset += 8
+                        if count < 0 or offset + count * 16 > len(self.map):
+                            raise ValueError("truncated file")
+                        keys = self.view[offset:offset + count * 8].cast("q")
+                        offset += count * 8
+                        values = self.view[offset:offset + count * 8].cast("q")
+                        offset += count * 8
+                        self.sections[section] = (keys, values)
+                    logger.debug(f"Loaded ID Crosswalk Index: {', '.join(f'{k}: {len(v[0])}' for k, v in self.sections.items())}")
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError, TypeError, struct.error) as e:
+                logger.error(f"Crosswalk Error: Unable to read {self.path}: {e}")
+                self.close()
+                self.sections = {}
+        return self.sections
+
+    def get(self, section, key):
+        found = self._open().get(section)
+        encoded = _encode(section, key) if found else None
+        if encoded is None:
+            return None
+        keys, values = found
+        index = bisect.bisect_left(keys, encoded)
+        if index < len(keys) and keys[index] == encoded:
+            return values[index]
+        return None
+
+    def imdb_to_tmdb(self, imdb_id):
+        for section, media_type in [("imdb_tmdb_movie", "movie"), ("imdb_tmdb_show", "show")]:
+            tmdb_id = self.get(section, imdb_id)
+            if tmdb_id:
+                return tmdb_id, media_type
+        return None
+
+    def close(self):
+        if self.sections is not None:
+            for keys, values in self.sections.values():
+                keys.release()
+                values.release()
+        if self.view is not None:
+            self.view.release()
+        if self.map is not None:
+            self.map.close()
+        if self.handle is not None:
+            self.handle.close()
+        self.handle = None
+        self.map = None
+        self.view = None
+        self.sections = None
+
+    def build(self, cache, convert):
+        pairs = {section: {} for section in sections}
+
+        def add(section, key, value):
+            encoded = _encode(section, key)
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                return
+            if encoded is not None and value and encoded not in pairs[section]:
+                pairs[section][encoded] = value
+
+        if cache:
+            rows = cache.query_crosswalk_rows()
+            for imdb_id, tmdb_id, media_type in rows["imdb_to_tmdb"]:
+                if media_type in ["movie", "show"]:
+                    add(f"imdb_tmdb_{media_type}", imdb_id, tmdb_id)
+            for imdb_id, tvdb_id in rows["imdb_to_tvdb"]:
+                add("imdb_tvdb", imdb_id, tvdb_id)
+            for tmdb_id, tvdb_id in rows["tmdb_to_tvdb"]:
+                add("tmdb_tvdb", tmdb_id, tvdb_id)
+                add("tvdb_tmdb", tvdb_id, tmdb_id)
+            for tmdb_id, imdb_id in rows["tmdb_movie"]:
+                add("imdb_tmdb_movie", imdb_id, tmdb_id)
+            for tmdb_id, imdb_id, tvdb_id in rows["tmdb_show"]:
+                add("imdb_tmdb_show", imdb_id, tmdb_id)
+                add("tmdb_tvdb", tmdb_id, tvdb_id)
+                add("tvdb_tmdb", tvdb_id, tmdb_id)
+        if convert:
+            for anidb_id, imdb_ids in convert._anidb_to_imdb.items():
+                tmdb_ids = convert._anidb_to_tmdb_movie.get(anidb_id, [])
+                if len(imdb_ids) == 1 and len(tmdb_ids) == 1:
+                    add("imdb_tmdb_movie", imdb_ids[0], tmdb_ids[0])
+            for anidb_id, tvdb_id in convert._anidb_to_tvdb.items():
+                tmdb_ids = convert._anidb_to_tmdb_show.get(anidb_id, [])
+                if len(tmdb_ids) == 1:
+                    add("tmdb_tvdb", tmdb_ids[0], tvdb_id)
+                    add("tvdb_tmdb", tvdb_id, tmdb_ids[0])
+        with self.lock:
+            self.close()
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "wb") as handle:
+            handle.write(magic)
+            handle.write(struct.pack("=d", time.time()))
+            for section in sections:
+                keys = sorted(pairs[section])
+                handle.write(struct.pack("=q", len(keys)))
+                array("q", keys).tofile(handle)
+                array("q", [pairs[section][k] for k in keys]).tofile(handle)
+        os.replace(temp_path, self.path)
+        logger.info(f"ID Crosswalk Index saved to {self.path}")
+        for section in sections:
+            logger.info(f"    {section}: {len(pairs[section])} IDs")
@@ -0,0 +1,306 @@
+import bisect, mmap, os, struct, threading, time
+from array import array
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from modules import idmap, util
+
+logger = util.logger
+
+magic = b"KMTDS03\n"
+header = struct.Struct("=ddqq")
+
+def episode_key(parent_id, season_num, episode_num):
+    parent = idmap.encode_imdb(parent_id)
+    if parent is None or parent >= 1 << 34 or not str(season_num).isdigit() or not str(episode_num).isdigit():
+        return None
+    season = int(season_num)
+    episode = int(episode_num)
+    if season >= 1 << 12 or episode >= 1 << 17:
+        return None
+    return parent << 29 | season << 17 | episode
+
+def _padding(size):
+    return -size % 8
+
+
+class DatasetIndex:
+    def __init__(self, path, typecodes):
+        self.path = path
+        self.typecodes = typecodes
+        self.created = None
+        self.checked = None
+        self.source = None
+        self.vocab = []
+        self.keys = array("q")
+        self.columns = [array(t) for t in typecodes]
+        self.handle = None
+        self.map = None
+        self.view = None
+        self.readers = 0
+        self.retired = False
+
+    def __len__(self):
+        return len(self.keys)
+
+    def age(self):
+        if self.created is None:
+            return None
+        return time.time() - max(self.created, self.checked or 0)
+
+    def load(self):
+        self.close()
+        try:
+            self.handle = open(self.path, "rb")
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            logger.debug(f"Dataset Error: Unable to open {self.path}: {e}")
+            return False
+        try:
+            self.map = mmap.mmap(self.handle.fileno(), 0, access=mmap.ACCESS_READ)
+            if self.map[:len(magic)] != magic:
+                raise ValueError("bad header")
+            created, source, count, vocab_length = header.unpack_from(self.map, len(magic))
+            offset = len(magic) + header.size
+            vocab = self.map[offset:offset + vocab_length].decode("utf-8")
+            offset += vocab_length + _padding(vocab_length)
+            self.view = memoryview(self.map)
+            self.keys = self.view[offset:offset + count * 8].cast("q")
+            offset += count * 8
+            self.columns = []
+            for typecode in self.typecodes:
+                size = count * array(typecode).itemsize
+                self.columns.append(self.view[offset:offset + size].cast(typecode))
+                offset += size + _padding(size)
+            if len(self.keys) != count or any(len(c) != count for c in self.columns):
+                raise ValueError("truncated file")
+        except (OSError, ValueError, TypeError, struct.error) as e:
+            logger.debug(f"Dataset Error: Unable to read {self.path}: {e}")
+            self.close()
+            return False
+        self.created = created
+        self.source = source if source else None
+        self.vocab = vocab.split("\t") if vocab else []
+        try:
+            with open(f"{self.path}.checked", "r") as handle:
+                self.checked = float(handle.read())
+        except (OSError, ValueError):
+            self.checked = None
+        return True
+
+    def touch(self):
+        self.checked = time.time()
+        temp_path = f"{self.path}.checked.tmp"
+        try:
+            with open(temp_path, "w") as handle:
+                handle.write(str(self.checked))
+            os.replace(temp_path, f"{self.path}.checked")
+        except OSError as e:
+            logger.debug(f"Dataset Error: Unable to update {self.path}.checked: {e}")
+
+    def set(self, keys, columns, vocab=None, created=None, source=None):
+        self.close()
+        if any(keys[i] > keys[i + 1] for i in range(len(keys) - 1)):
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+            keys = array("q", [keys[i] for i in order])
+            columns = [array(c.typecode, [c[i] for i in order]) for c in columns]
+        self.keys = keys
+        self.columns = columns
+        self.vocab = vocab if vocab else []
+        self.created = created if created is not None else time.time()
+        self.checked = None
+        self.source = source
+
+    def save(self, reload=True):
+        keys, columns = self.keys, self.columns
+        temp_path = f"{self.path}.tmp"
+        vocab = "\t".join(self.vocab).encode("utf-8")
+        try:
+            with open(temp_path, "wb") as handle:
+                handle.write(magic)
+                handle.write(header.pack(self.created, self.source or 0.0, len(self.keys), len(vocab)))
+                handle.write(vocab + b"\0" * _padding(len(vocab)))
+                self.keys.tofile(handle)
+                for column in self.columns:
+                    column.tofile(handle)
+                    handle.write(b"\0" * _padding(len(column) * column.itemsize))
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Dataset Warning: Unable to save {self.path}: {e}")
+            return False
+        if not reload:
+            return True
+        if not self.load():
+            self.keys, self.columns = keys, columns
+            return False
+        return True
+
+    def find(self, key):
+        if key is None:
+            return None
+        index = bisect.bisect_left(self.keys, key)
+        return index if index < len(self.keys) and self.keys[index] == key else None
+
+    def close(self):
+        if self.view is not None:
+            for column in [self.keys] + self.columns:
+                if isinstance(column, memoryview):
+                    column.release()
+            self.view.release()
+        if self.map is not None:
+            self.map.close()
+        if self.handle is not None:
+            self.handle.close()
+        self.keys = array("q")
+        self.columns = [array(t) for t in self.typecodes]
+        self.handle = None
+        self.map = None
+        self.view = None
+
+
+class DatasetStore:
+    def __init__(self, requests, directory, refresh, background=False):
+        self.requests = requests
+        self.directory = directory
+        self.refresh = refresh * 3600
+        self.background = background
+        self.indexes = {}
+        self.building = {}
+        self.lock = threading.Lock()
+
+    def path(self, name):
+        return os.path.join(self.directory, f"{name}.bin")
+
+    def source_time(self, url):
+        try:
+            response = self.requests.session.head(url, allow_redirects=True)
+            modified = response.headers.get("Last-Modified")
+            return parsedate_to_datetime(modified).timestamp() if modified else None
+        except Exception as e:
+            logger.debug(f"Dataset Error: Unable to check {url}: {e}")
+            return None
+
+    def is_current(self, index, url):
+        if index.created is None or not self.refresh:
+            return False
+        if index.age() < self.refresh:
+            return True
+        source = self.source_time(url)
+        if source is not None and index.source is not None and source <= index.source:
+            logger.debug(f"{os.path.basename(index.path)} is Unchanged Since {time.ctime(index.source)}")
+            index.touch()
+            return True
+        return False
+
+    @contextmanager
+    def locked(self, path):
+        lock_path = f"{path}.lock"
+        owned = False
+        started = time.time()
+        while not owned:
+            try:
+                os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                owned = True
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(lock_path) > 3600:
+                        os.remove(lock_path)
+                        continue
+                except OSError:
+                    pass
+                if time.time() - started > 3600:
+                    break
+                logger.ghost(f"Waiting for another process to finish {os.path.basename(path)}")
+                time.sleep(5)
+            except OSError:
+                break
+        try:
+            yield
+        finally:
+            if owned:
+                try:
+                    os.remove(lock_path)
+                except OSError:
+                    pass
+
+    def _swap(self, name, index):
+        with self.lock:
+            old = self.indexes.get(name)
+            self.indexes[name] = index
+            close = old is not None and old is not index and old.map is not None
+            if close:
+                old.retired = True
+                close = old.readers == 0
+        if close:
+            old.close()
+
+    def rebuild(self, index, url, build):
+        with self.locked(index.path):
+            if index.load() and index.age() < self.refresh:
+                return index
+            source = self.source_time(url)
+            index.set(*build(), source=source)
+            index.save()
+        logger.debug(f"Built {os.path.basename(index.path)} with {len(index)} Rows")
+        return index
+
+    def _refresh(self, name, typecodes, url, build):
+        try:
+            index = DatasetIndex(self.path(name), typecodes)
+            with self.locked(index.path):
+                if not index.load() or index.age() >= self.refresh:
+                    index.set(*build(), source=self.source_time(url))
+                    self._swap(name, index)
+                    if not index.save(reload=False):
+                        return
+                    logger.debug(f"Built {os.path.basename(index.path)} with {len(index)} Rows")
+                    index = DatasetIndex(self.path(name), typecodes)
+                    if not index.load():
+                        return
+            self._swap(name, index)
+        except Exception as e:
+            logger.stacktrace()
+            logger.error(f"Dataset Error: Background refresh of {name} failed: {e}")
+
+    def get(self, name, typecodes, url, build):
+        with self.lock:
+            if name in self.indexes:
+                return self.indexes[name]
+            if name not in self.building:
+                self.building[name] = threading.Lock()
+            building = self.building[name]
+        with building:
+            with self.lock:
+                if name in self.indexes:
+                    return self.indexes[name]
+            index = DatasetIndex(self.path(name), typecodes)
+            background = False
+            if index.load() and self.is_current(index, url):
+                logger.debug(f"Using {os.path.basename(index.path)} with {len(index)} Rows")
+            elif index.created is not None and self.background:
+                background = True
+            else:
+                index = self.rebuild(index, url, build)
+            with self.lock:
+                self.indexes[name] = index
+            if background:
+                logger.info(f"Refreshing {os.path.basename(index.path)} in the Background")
+                threading.Thread(target=self._refresh, args=(name, typecodes, url, build), daemon=True).start()
+            return index
+
+    @contextmanager
+    def reading(self, name, typecodes, url, build):
+        while True:
+            index = self.get(name, typecodes, url, build)
+            with self.lock:
+                if self.indexes.get(name) is index:
+                    index.readers += 1
+                    break
+        try:
+            yield index
+        finally:
+            with self.lock:
+                index.readers -= 1
+                close = index.retired and index.readers == 0
+            if close:
+                index.close()
@@ -0,0 +1,165 @@
+import bisect, re
+from array import array
+
+imdb_pattern = re.compile(r"^tt(\d{1,15})$")
+merge_size = 1024
+
+def encode_int(key):
+    return key if isinstance(key, int) and not isinstance(key, bool) else None
+
+def decode_int(value):
+    return value
+
+def encode_imdb(key):
+    match = imdb_pattern.match(key) if isinstance(key, str) else None
+    return (int(match.group(1)) << 4) | len(match.group(1)) if match else None
+
+def decode_imdb(value):
+    return f"tt{value >> 4:0{value & 15}d}"
+
+
+class CompactMultiMap:
+    def __init__(self, encode=encode_int, decode=decode_int):
+        self.encode = encode
+        self.decode = decode
+        self.keys = array("q")
+        self.values = array("q")
+        self.pending = {}
+        self.other = {}
+
+    def add(self, keys, value):
+        for key in keys:
+            encoded = self.encode(key)
+            if encoded is None:
+                if key not in self.other:
+                    self.other[key] = []
+                self.other[key].append(int(value))
+            else:
+                if encoded not in self.pending:
+                    self.pending[encoded] = []
+                self.pending[encoded].append(int(value))
+        if len(self.pending) > max(merge_size, len(self.keys)):
+            self._merge()
+
+    def _merge(self):
+        if self.pending:
+            keys = list(self.keys)
+            values = list(self.values)
+            for encoded, pending_values in self.pending.items():
+                keys.extend([encoded] * len(pending_values))
+                values.extend(pending_values)
+            self.pending = {}
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+            self.keys = array("q", [keys[i] for i in order])
+            self.values = array("q", [values[i] for i in order])
+
+    def compact(self):
+        self._merge()
+
+    def _find(self, key):
+        encoded = self.encode(key)
+        if encoded is None:
+            return None
+        start = bisect.bisect_left(self.keys, encoded)
+        end = bisect.bisect_right(self.keys, encoded, lo=start)
+        found = list(self.values[start:end])
+        if encoded in self.pending:
+            found.extend(self.pending[encoded])
+        return found if found else None
+
+    def __contains__(self, key):
+        return key in self.other or self._find(key) is not None
+
+    def __getitem__(self, key):
+        if key in self.other:
+            return self.other[key]
+        found = self._find(key)
+        if found is None:
+            raise KeyError(key)
+        return found
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def __len__(self):
+        self._merge()
+        return len(self.other) + sum(1 for i in range(len(self.keys)) if i == 0 or self.keys[i] != self.keys[i - 1])
+
+    def items(self):
+        self._merge()
+        start = 0
+        for i in range(1, len(self.keys) + 1):
+            if i == len(self.keys) or self.keys[i] != self.keys[start]:
+                yield self.decode(self.keys[start]), list(self.values[start:i])
+                start = i
+        yield from self.other.items()
+
+
+class CompactMap:
+    def __init__(self, encode=encode_int, decode=decode_int):
+        self.encode = encode
+        self.decode = decode
+        self.keys = array("q")
+        self.values = array("q")
+        self.pending = {}
+        self.other = {}
+
+    def __setitem__(self, key, value):
+        encoded = self.encode(value)
+        if isinstance(key, int) and encoded is not None:
+            self.other.pop(key, None)
+            self.pending[key] = encoded
+        else:
+            if isinstance(key, int):
+                self.pending[key] = None
+            self.other[key] = value
+        if len(self.pending) > max(merge_size, len(self.keys)):
+            self._merge()
+
+    def _merge(self):
+        if self.pending:
+            merged = dict(zip(self.keys, self.values))
+            for key, encoded in self.pending.items():
+                if encoded is None:
+                    merged.pop(key, None)
+                else:
+                    merged[key] = encoded
+            self.pending = {}
+            ordered = sorted(merged)
+            self.keys = array("q", ordered)
+            self.values = array("q", [merged[k] for k in ordered])
+
+    def compact(self):
+        self._merge()
+
+    def _index(self, key):
+        if not isinstance(key, int):
+            return None
+        index = bisect.bisect_left(self.keys, key)
+        return index if index < len(self.keys) and self.keys[index] == key else None
+
+    def __contains__(self, key):
+        return key in self.other or key in self.pending or self._index(key) is not None
+
+    def __getitem__(self, key):
+        if key in self.other:
+            return self.other[key]
+        if key in self.pending:
+            return self.decode(self.pending[key])
+        index = self._index(key)
+        if index is None:
+            raise KeyError(key)
+        return self.decode(self.values[index])
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def __len__(self):
+        self._merge()
+        return len(self.keys) + len(self.other)
+
+    def items(self):
+        self._merge()
+        for key, value in zip(self.keys, self.values):
+            yield key, self.decode(value)
+        yield from self.other.items()
@@ -1,5 +1,8 @@
-import csv, gzip, json, math, os, re, shutil
-from modules import util
+import copy, csv, gzip, json, math, os, re
+from concurrent.futures import ThreadPoolExecutor
+from array import array
+from modules import idmap, util
+from modules.datasets import DatasetIndex, DatasetStore, episode_key
 from modules.util import Failed
 
 logger = util.logger
@@ -365,15 +368,19 @@ list_hash_url = "https://raw.githubusercontent.com/Kometa-Team/IMDb-Hash/master/
 watchlist_hash_url = "https://raw.githubusercontent.com/Kometa-Team/IMDb-Hash/master/WATCHLIST_HASH"
 graphql_url = "https://api.graphql.imdb.com/"
 list_url = f"{base_url}/list/ls"
+dataset_url = "https://datasets.imdbws.com/title.{}.tsv.gz"
+page_workers = 4
 
 class IMDb:
-    def __init__(self, requests, cache, default_dir):
+    def __init__(self, requests, cache, default_dir, dataset_refresh=24, dataset_background=False):
         self.requests = requests
         self.cache = cache
         self.default_dir = default_dir
-        self._ratings = None
-        self._genres = None
+        self.datasets = DatasetStore(requests, default_dir, dataset_refresh, background=dataset_background)
         self._episode_ratings = None
+        self._episode_fresh = False
+        self._episode_parents = set()
+        self._episode_scopes = {}
         self._git_events = {}
         self._git_events_validation = None
         self._web_events = {}
@@ -593,6 +600,45 @@ class IMDb:
         op, sha = self._json_operation(list_type)
         return {"operationName": op, "variables": out, "extensions": {"persistedQuery": {"version": 1, "sha256Hash": sha}}}
 
+    def _jump_pages(self, json_obj, end_cursor, step, item_count, num_of_pages, remainder, first_ids):
+        def fetch(page):
+            page_json = copy.deepcopy(json_obj)
+            if page is None:
+                page_json["variables"]["after"] = end_cursor
+            else:
+                page_json["variables"]["jumpToPosition"] = (page - 1) * item_count + 1
+            try:
+                response_json = self._graph_request(page_json)
+                if "errors" in response_json:
+                    return None
+                search_data = response_json["data"][step]["titleListItemSearch"]
+                return [n["listItem"]["id"] for n in search_data["edges"]], search_data["pageInfo"]["endCursor"]
+            except Exception as e:
+                logger.trace(f"IMDb Error: Page {page or 2} failed: {e}")
+                return None
+
+        logger.ghost(f"Parsing Pages 2-{num_of_pages}")
+        with ThreadPoolExecutor(max_workers=page_workers) as executor:
+            cursor_page = executor.submit(fetch, None)
+            jump_page = executor.submit(fetch, 2)
+            cursor_result = cursor_page.result()
+            jump_result = jump_page.result()
+            if cursor_result and jump_result and jump_result[0] == cursor_result[0]:
+                results = [cursor_result] + list(executor.map(fetch, range(3, num_of_pages + 1)))
+                if all(results):
+                    pages = [ids for ids, _ in results]
+                    seen = set(first_ids)
+                    valid = all(len(ids) == item_count for ids in pages[:-1]) and remainder <= len(pages[-1]) <= item_count
+                    for ids in pages:
+                        if not valid or seen.intersection(ids) or len(set(ids)) != len(ids):
+                            valid = False
+                            break
+                        seen.update(ids)
+                    if valid:
+                        return pages, None
+        logger.trace("IMDb Error: jumpToPosition results could not be validated, falling back to cursors")
+        return None, cursor_result
+
     def _pagination(self, data, list_type):
         is_list = list_type != "search"
         json_obj = self._graphql_json(data, list_type)
@@ -626,18 +672,29 @@ class IMDb:
         num_of_pages = math.ceil(int(limit) / item_count)
         end_cursor = search_data["pageInfo"]["endCursor"]
         imdb_ids.extend([n["listItem"]["id"] if is_list else n["node"]["title"]["id"] for n in search_data["edges"]])
-        if num_of_pages > 1:
-            for i in range(2, num_of_pages + 1):
-                start_num = (i - 1) * item_count + 1
-                logger.ghost(f"Parsing Page {i}/{num_of_pages} {start_num}-{limit if i == num_of_pages else i * item_count}")
-                json_obj["variables"]["after"] = end_cursor
-                response_json = self._graph_request(json_obj)
-                search_data = response_json["data"][step]["titleListItemSearch"] if is_list else response_json["data"]["advancedTitleSearch"]
-                end_cursor = search_data["pageInfo"]["endCursor"]
-                ids_found = [n["listItem"]["id"] if is_list else n["node"]["title"]["id"] for n in search_data["edges"]]
-                if i == num_of_pages:
-                    ids_found = ids_found[:remainder]
+        start_page = 2
+        if is_list and num_of_pages > 2:
+            pages, cursor_page = self._jump_pages(json_obj, end_cursor, step, item_count, num_of_pages, remainder, imdb_ids)
+            if pages:
+                pages[-1] = pages[-1][:remainder]
+                for ids_found in pages:
+                    imdb_ids.extend(ids_found)
+                start_page = num_of_pages + 1
+            elif cursor_page:
+                ids_found, end_cursor = cursor_page
                 imdb_ids.extend(ids_found)
+                start_page = 3
+        for i in range(start_page, num_of_pages + 1):
+            start_num = (i - 1) * item_count + 1
+            logger.ghost(f"Parsing Page {i}/{num_of_pages} {start_num}-{limit if i == num_of_pages else i * item_count}")
+            json_obj["variables"]["after"] = end_cursor
+            response_json = self._graph_request(json_obj)
+            search_data = response_json["data"][step]["titleListItemSearch"] if is_list else response_json["data"]["advancedTitleSearch"]
+            end_cursor = search_data["pageInfo"]["endCursor"]
+            ids_found = [n["listItem"]["id"] if is_list else n["node"]["title"]["id"] for n in search_data["edges"]]
+            if i == num_of_pages:
+                ids_found = ids_found[:remainder]
+            imdb_ids.extend(ids_found)
         logger.exorcise()
         if not imdb_ids:
             raise Failed("IMDb Error: No IMDb IDs Found")
@@ -722,78 +779,116 @@ class IMDb:
         else:
             raise Failed(f"IMDb Error: Method {method} not supported")
 
-    def _interface(self, interface):
-        gz = os.path.join(self.default_dir, f"title.{interface}.tsv.gz")
-        tsv = os.path.join(self.default_dir, f"title.{interface}.tsv")
-
-        if os.path.exists(gz):
-            os.remove(gz)
-        if os.path.exists(tsv):
-            os.remove(tsv)
-
-        self.requests.get_stream(f"https://datasets.imdbws.com/title.{interface}.tsv.gz", gz, "IMDb Interface")
-
-        with open(tsv, "wb") as f_out:
-            with gzip.open(gz, "rb") as f_in:
-                shutil.copyfileobj(f_in, f_out)
-
-        with open(tsv, "r", encoding="utf-8") as t:
-            if interface == "ratings":
-                data = {line[0]: line[1] for line in csv.reader(t, delimiter="\t")}
-            elif interface == "basics":
-                data = {line[0]: str(line[-1]).split(",") for line in csv.reader(t, delimiter="\t") if str(line[-1]) != "\\N"}
-            else:
-                data = [line for line in csv.reader(t, delimiter="\t")]
-
-        if os.path.exists(gz):
-            os.remove(gz)
-        if os.path.exists(tsv):
-            os.remove(tsv)
+    def _interface_rows(self, interface):
+        with self.requests.session.get(dataset_url.format(interface), stream=True) as response:
+            response.raise_for_status()
+            total_length = response.headers.get("content-length")
+            total_length = int(total_length) if total_length else None
+            with gzip.open(response.raw, "rt", encoding="utf-8") as t:
+                for i, line in enumerate(csv.reader(t, delimiter="\t")):
+                    if total_length and i % 100000 == 0:
+                        logger.ghost(f"Processing IMDb Interface: {response.raw.tell() / total_length * 100:6.2f}%")
+                    yield line
+            logger.exorcise()
 
-        return data
+    def _build_ratings(self):
+        keys = array("q")
+        ratings = array("f")
+        for line in self._interface_rows("ratings"):
+            key = idmap.encode_imdb(line[0])
+            if key is not None:
+                keys.append(key)
+                ratings.append(float(line[1]))
+        return keys, [ratings]
+
+    def _build_genres(self):
+        keys = array("q")
+        masks = array("Q")
+        vocab = []
+        for line in self._interface_rows("basics"):
+            key = idmap.encode_imdb(line[0])
+            if key is None or str(line[-1]) == "\\N":
+                continue
+            mask = 0
+            for genre in str(line[-1]).split(","):
+                if genre not in vocab and len(vocab) < 64:
+                    vocab.append(genre)
+                if genre in vocab:
+                    mask |= 1 << vocab.index(genre)
+            keys.append(key)
+            masks.append(mask)
+        return keys, [masks], vocab
 
-    @property
     def ratings(self):
-        if self._ratings is None:
-            self._ratings = self._interface("ratings")
-        return self._ratings
+        return self.datasets.reading("imdb_ratings", ["f"], dataset_url.format("ratings"), self._build_ratings)
 
-    @property
     def genres(self):
-        if self._genres is None:
-            self._genres = self._interface("basics")
-        return self._genres
+        return self.datasets.reading("imdb_genres", ["Q"], dataset_url.format("basics"), self._build_genres)
 
-    @property
-    def episode_ratings(self):
+    def _episode_missing(self, parents, fresh):
+        if not fresh:
+            return parents | self._episode_parents
+        return parents - self._episode_parents
+
+    def _episode_wanted(self, imdb_id):
+        parents = {imdb_id}
+        for library in self._episode_scopes.values():
+            parents.update(k for k, _ in library.imdb_map.items())
+        return parents
+
+    def _episode_index(self, imdb_id):
+        url = dataset_url.format("episode")
         if self._episode_ratings is None:
-            self._episode_ratings = {}
-            logger.info("Processing IMDb rating for episodes. This may take a while...")
-            all_eps = self._interface("episode")
-            for i, (imdb_id, parent_id, season_num, episode_num) in enumerate(all_eps):
-                if imdb_id not in self.ratings:
-                    continue
-                if parent_id not in self._episode_ratings:
-                    self._episode_ratings[parent_id] = {}
-                if season_num not in self._episode_ratings[parent_id]:
-                    self._episode_ratings[parent_id][season_num] = {}
-                self._episode_ratings[parent_id][season_num][episode_num] = self.ratings[imdb_id]
-                logger.ghost(f"Processing IMDb rating for episodes: {i / len(all_eps) * 100:6.2f}%")
-            logger.exorcise()
-        return self._episode_ratings
+            self._episode_ratings = DatasetIndex(self.datasets.path("imdb_episodes"), ["f"])
+            if self._episode_ratings.load():
+                self._episode_parents = set(self._episode_ratings.vocab)
+        index = self._episode_ratings
+        if not self._episode_fresh:
+            self._episode_fresh = self.datasets.is_current(index, url)
+        if self._episode_missing({imdb_id}, self._episode_fresh):
+            with self.datasets.locked(index.path):
+                if index.load():
+                    self._episode_parents = set(index.vocab)
+                fresh = self._episode_fresh or self.datasets.is_current(index, url)
+                missing = self._episode_missing(self._episode_wanted(imdb_id), fresh)
+                if missing:
+                    covered = self._episode_parents if fresh else set()
+                    source = index.source if fresh else self.datasets.source_time(url)
+                    keys = array("q", index.keys) if fresh else array("q")
+                    ratings = array("f", index.columns[0]) if fresh else array("f")
+                    logger.info(f"Processing IMDb rating for episodes of {len(missing)} Shows. This may take a while...")
+                    for line in self._interface_rows("episode"):
+                        if line[1] in missing:
+                            key = episode_key(line[1], line[2], line[3])
+                            rating = self.get_rating(line[0]) if key is not None else None
+                            if rating is not None:
+                                keys.append(key)
+                                ratings.append(float(rating))
+                    self._episode_parents = covered | missing
+                    index.set(keys, [ratings], vocab=sorted(self._episode_parents), created=index.created if fresh else None, source=source)
+                    index.save()
+                self._episode_fresh = True
+        return index
 
     def get_rating(self, imdb_id):
-        return self.ratings[imdb_id] if imdb_id in self.ratings else None
+        with self.ratings() as ratings:
+            index = ratings.find(idmap.encode_imdb(imdb_id))
+            return None if index is None else f"{ratings.columns[0][index]:.1f}"
 
     def get_genres(self, imdb_id):
-        return self.genres[imdb_id] if imdb_id in self.genres else []
-
-    def get_episode_rating(self, imdb_id, season_num, episode_num):
-        season_num = str(season_num)
-        episode_num = str(episode_num)
-        if imdb_id not in self.episode_ratings or season_num not in self.episode_ratings[imdb_id] or episode_num not in self.episode_ratings[imdb_id][season_num]:
-            return None
-        return self.episode_ratings[imdb_id][season_num][episode_num]
+        with self.genres() as genres:
+            index = genres.find(idmap.encode_imdb(imdb_id))
+            if index is None:
+                return []
+            mask = genres.columns[0][index]
+            return sorted([genre for i, genre in enumerate(genres.vocab) if mask & (1 << i)])
+
+    def get_episode_rating(self, imdb_id, season_num, episode_num, library=None):
+        if library is not None:
+            self._episode_scopes[library.mapping_name] = library
+        index = self._episode_index(imdb_id)
+        found = index.find(episode_key(imdb_id, season_num, episode_num))
+        return None if found is None else f"{index.columns[0][found]:.1f}"
 
     def item_filter(self, imdb_info, filter_attr, modifier, filter_final, filter_data):
         if filter_attr == "imdb_keyword":
@@ -1,6 +1,7 @@
-import os, time
+import os, time, traceback
 from abc import ABC, abstractmethod
-from modules import util
+from concurrent.futures import ThreadPoolExecutor
+from modules import idmap, snapshot, util
 from modules.meta import MetadataFile, OverlayFile
 from modules.operations import Operations
 from modules.poster import ImageData
@@ -29,17 +30,19 @@ class Library(ABC):
         self.metadata_files = []
         self.overlay_files = []
         self.images_files = []
-        self.movie_map = {}
-        self.show_map = {}
-        self.imdb_map = {}
+        self.compact_id_maps = params["compact_id_maps"]
+        self.movie_map = idmap.CompactMultiMap() if self.compact_id_maps else {}
+        self.show_map = idmap.CompactMultiMap() if self.compact_id_maps else {}
+        self.imdb_map = idmap.CompactMultiMap(idmap.encode_imdb, idmap.decode_imdb) if self.compact_id_maps else {}
         self.anidb_map = {}
         self.reverse_anidb = {}
         self.mal_map = {}
         self.reverse_mal = {}
-        self.movie_rating_key_map = {}
-        self.show_rating_key_map = {}
-        self.imdb_rating_key_map = {}
+        self.movie_rating_key_map = idmap.CompactMap() if self.compact_id_maps else {}
+        self.show_rating_key_map = idmap.CompactMap() if self.compact_id_maps else {}
+        self.imdb_rating_key_map = idmap.CompactMap(idmap.encode_imdb, idmap.decode_imdb) if self.compact_id_maps else {}
         self.cached_items = {}
+        self.snapshots = {}
         self.run_again = []
         self.type = ""
         self.config = config
@@ -72,6 +75,7 @@ class Library(ABC):
         self.default_collection_order = params["default_collection_order"]
         self.minimum_items = params["minimum_items"]
         self.item_refresh_delay = params["item_refresh_delay"]
+        self.mapping_workers = params["mapping_workers"]
         self.delete_below_minimum = params["delete_below_minimum"]
         self.delete_not_scheduled = params["delete_not_scheduled"]
         self.missing_only_released = params["missing_only_released"]
@@ -198,7 +202,24 @@ class Library(ABC):
                     logger.info("")
                     logger.separator(f"Skipping {e} Image File")
 
-    def upload_images(self, item, poster=None, background=None, logo=None, overlay=False):
+    def upload_images(self, item, poster=None, background=None, logo=None, overlay=False, queue=False, messages=None):
+        if queue and self.Uploads.active:
+            self.Uploads.submit(item, self.upload_images, item, poster=poster, background=background, logo=logo, overlay=overlay)
+            return None, None, None
+
+        def report(level, text):
+            if messages is None:
+                getattr(logger, level)(text)
+            else:
+                messages.append((level, text))
+
+        def failed(image):
+            if messages is None:
+                logger.stacktrace()
+            else:
+                messages.append(("debug", traceback.format_exc()))
+            report("error", f"Metadata: {image.attribute} failed to update {image.message}")
+
         poster_uploaded = False
         if poster is not None:
             try:
@@ -210,13 +231,13 @@ class Library(ABC):
                         self.reload(item, force=True)
                         if overlay and "Overlay" in [la.tag for la in self.item_labels(item)]:
                             item.removeLabel("Overlay")
-                    poster_uploaded = self._upload_image(item, poster)
-                    logger.info(f"Metadata: {poster.attribute} updated {poster.message}")
+                            self.tags_changed("label")
+                    poster_uploaded = self._upload_image(item, poster, reload=messages is None)
+                    report("info", f"Metadata: {poster.attribute} updated {poster.message}")
                 elif self.show_asset_not_needed:
-                    logger.info(f"Metadata: {poster.prefix}poster update not needed")
+                    report("info", f"Metadata: {poster.prefix}poster update not needed")
             except Failed:
-                logger.stacktrace()
-                logger.error(f"Metadata: {poster.attribute} failed to update {poster.message}")
+                failed(poster)
 
         background_uploaded = False
         if background is not None:
@@ -225,13 +246,12 @@ class Library(ABC):
                 if self.config.Cache:
                     _, image_compare, _ = self.config.Cache.query_image_map(item.ratingKey, f"{self.image_table_name}_backgrounds")
                 if not image_compare or str(background.compare) != str(image_compare):
-                    background_uploaded = self._upload_image(item, background)
-                    logger.info(f"Metadata: {background.attribute} updated {background.message}")
+                    background_uploaded = self._upload_image(item, background, reload=messages is None)
+                    report("info", f"Metadata: {background.attribute} updated {background.message}")
                 elif self.show_asset_not_needed:
-                    logger.info(f"Metadata: {background.prefix}background update not needed")
+                    report("info", f"Metadata: {background.prefix}background update not needed")
             except Failed:
-                logger.stacktrace()
-                logger.error(f"Metadata: {background.attribute} failed to update {background.message}")
+                failed(background)
 
         logo_uploaded = False
         if logo is not None:
@@ -240,13 +260,12 @@ class Library(ABC):
                 if self.config.Cache:
                     _, image_compare, _ = self.config.Cache.query_image_map(item.ratingKey, f"{self.image_table_name}_logos")
                 if not image_compare or str(logo.compare) != str(image_compare):
-                    logo_uploaded = self._upload_image(item, logo)
-                    logger.info(f"Metadata: {logo.attribute} updated {logo.message}")
+                    logo_uploaded = self._upload_image(item, logo, reload=messages is None)
+                    report("info", f"Metadata: {logo.attribute} updated {logo.message}")
                 elif self.show_asset_not_needed:
-                    logger.info(f"Metadata: {logo.prefix}logo update not needed")
+                    report("info", f"Metadata: {logo.prefix}logo update not needed")
             except Failed:
-                logger.stacktrace()
-                logger.error(f"Metadata: {logo.attribute} failed to update {logo.message}")
+                failed(logo)
 
         if self.config.Cache:
             if poster_uploaded:
@@ -274,7 +293,7 @@ class Library(ABC):
         pass
 
     @abstractmethod
-    def _upload_image(self, item, image):
+    def _upload_image(self, item, image, reload=True):
         pass
 
     @abstractmethod
@@ -313,7 +332,9 @@ class Library(ABC):
                             return images["asset_directory"]
                         else:
                             try:
-                                return self.config.Requests.download_image(title, images[attr], item_dir, session=self.session, image_type=image_type, filename=image_name)
+                                downloaded = self.config.Requests.download_image(title, images[attr], item_dir, session=self.session, image_type=image_type, filename=image_name)
+                                self.config.AssetIndex.invalidate(item_dir)
+                                return downloaded
                             except Failed as e:
                                 logger.error(e)
                     if attr in ["asset_directory", f"pmm_{image_type}"]:
@@ -332,6 +353,10 @@ class Library(ABC):
     def item_labels(self, item):
         pass
 
+    @abstractmethod
+    def tags_changed(self, attr, tags=None):
+        pass
+
     @abstractmethod
     def find_poster_url(self, item):
         pass
@@ -404,54 +429,114 @@ class Library(ABC):
         logger.info("")
         logger.separator(f"Caching {self.name} Library Items", space=False, border=False)
         logger.info("")
+        self.snapshots = {}
         items = self.get_all()
         for item in items:
             self.cached_items[item.ratingKey] = (item, False)
         return items
 
+    def check_snapshot_filters(self, builder_level, items, filters, current_time):
+        if not snapshot.available() or not self.cached_items:
+            return {}
+        if builder_level not in self.snapshots:
+            self.snapshots[builder_level] = snapshot.LibrarySnapshot(builder_level, [i for i, _ in self.cached_items.values()])
+        return self.snapshots[builder_level].check_filters(items, filters, current_time)
+
+    def _resolve_guid(self, item):
+        cache_updates = []
+        if isinstance(item, tuple):
+            key, guid = item
+            item_type, check_id = self.config.Convert.scan_guid(guid)
+            id_type, main_id, imdb_id, _ = self.config.Convert.ids_from_cache(key, guid, item_type, check_id, self)
+        else:
+            id_type, main_id, imdb_id = self.config.Convert.get_id(item, self, cache_updates=cache_updates)
+        chosen_id = None
+        if main_id:
+            if len(main_id) > 1:
+                for _id in main_id:
+                    try:
+                        if id_type == "movie":
+                            self.config.Convert.throttled(self.config.TMDb.get_movie, _id)
+                        elif id_type == "show":
+                            self.config.Convert.tvdb_to_tmdb(_id, fail=True)
+                        chosen_id = _id
+                        break
+                    except Failed:
+                        pass
+            else:
+                chosen_id = main_id[0]
+        return id_type, main_id, imdb_id, chosen_id, cache_updates
+
+    def _add_guid_ids(self, key, id_type, main_id, imdb_id, chosen_id):
+        if main_id:
+            if id_type == "movie":
+                if chosen_id is not None:
+                    self.movie_rating_key_map[key] = chosen_id
+                util.add_dict_list(main_id, key, self.movie_map)
+            elif id_type == "show":
+                if chosen_id is not None:
+                    self.show_rating_key_map[key] = chosen_id
+                util.add_dict_list(main_id, key, self.show_map)
+        if imdb_id:
+            self.imdb_rating_key_map[key] = imdb_id[0]
+            util.add_dict_list(imdb_id, key, self.imdb_map)
+
     def map_guids(self, items):
-        for i, item in enumerate(items, 1):
-            if isinstance(item, tuple):
-                logger.ghost(f"Processing: {i}/{len(items)}")
-                key, guid = item
+        persisted = self.config.Cache.query_library_id_map(self.mapping_name) if self.config.Cache else {}
+        pending = []
+        current = set()
+        reused = 0
+        for item in items:
+            key, guid = item if isinstance(item, tuple) else (item.ratingKey, item.guid)
+            current.add(key)
+            if key in self.movie_rating_key_map or key in self.show_rating_key_map:
+                continue
+            if key in persisted and persisted[key][0] == guid and not persisted[key][5] and (not persisted[key][2] or persisted[key][4] is not None):
+                _, id_type, main_id, imdb_id, chosen_id, _ = persisted[key]
+                item_type, check_id = self.config.Convert.scan_guid(guid)
+                try:
+                    self.config.Convert.map_anime_guid(key, item_type, check_id, self)
+                except (AttributeError, ValueError):
+                    pass
+                self._add_guid_ids(key, id_type, main_id, imdb_id, chosen_id)
+                reused += 1
             else:
-                logger.ghost(f"Processing: {i}/{len(items)} {item.title}")
-                key = item.ratingKey
-                guid = item.guid
-            if key not in self.movie_rating_key_map and key not in self.show_rating_key_map:
+                pending.append(item)
+        if reused:
+            logger.info(f"Loaded {reused} Mapped {self.type}s from the Cache")
+        persist_rows = []
+        if self.mapping_workers > 1 and len(pending) > 1:
+            executor = ThreadPoolExecutor(max_workers=self.mapping_workers)
+            results = executor.map(self._resolve_guid, pending)
+        else:
+            executor = None
+            results = (self._resolve_guid(p) for p in pending)
+        cache_updates = []
+        try:
+            for i, (item, (id_type, main_id, imdb_id, chosen_id, updates)) in enumerate(zip(pending, results), 1):
                 if isinstance(item, tuple):
-                    item_type, check_id = self.config.Convert.scan_guid(guid)
-                    id_type, main_id, imdb_id, _ = self.config.Convert.ids_from_cache(key, guid, item_type, check_id, self)
+                    logger.ghost(f"Processing: {i}/{len(pending)}")
+                    key = item[0]
                 else:
-                    id_type, main_id, imdb_id = self.config.Convert.get_id(item, self)
-                if main_id:
-                    if id_type == "movie":
-                        if len(main_id) > 1:
-                            for _id in main_id:
-                                try:
-                                    self.config.TMDb.get_movie(_id)
-                                    self.movie_rating_key_map[key] = _id
-                                    break
-                                except Failed:
-                                    pass
-                        else:
-                            self.movie_rating_key_map[key] = main_id[0]
-                        util.add_dict_list(main_id, key, self.movie_map)
-                    elif id_type == "show":
-                        if len(main_id) > 1:
-                            for _id in main_id:
-                                try:
-                                    self.config.Convert.tvdb_to_tmdb(_id, fail=True)
-                                    self.show_rating_key_map[key] = _id
-                                    break
-                                except Failed:
-                                    pass
-                        else:
-                            self.show_rating_key_map[key] = main_id[0]
-                        util.add_dict_list(main_id, key, self.show_map)
-                if imdb_id:
-                    self.imdb_rating_key_map[key] = imdb_id[0]
-                    util.add_dict_list(imdb_id, key, self.imdb_map)
+                    logger.ghost(f"Processing: {i}/{len(pending)} {item.title}")
+                    key = item.ratingKey
+                self._add_guid_ids(key, id_type, main_id, imdb_id, chosen_id)
+                if (main_id and chosen_id is not None) or (imdb_id and not main_id):
+                    persist_rows.append((key, item[1] if isinstance(item, tuple) else item.guid, id_type, main_id, imdb_id, chosen_id))
+                cache_updates.extend(updates)
+                if len(cache_updates) >= 500:
+                    self.config.Cache.update_guid_maps(cache_updates)
+                    cache_updates = []
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+            if cache_updates:
+                self.config.Cache.update_guid_maps(cache_updates)
+            if self.config.Cache and (persist_rows or any(k not in current for k in persisted)):
+                self.config.Cache.update_library_id_map(self.mapping_name, persist_rows, removed=[k for k in persisted if k not in current])
+        if self.compact_id_maps:
+            for id_map in [self.movie_map, self.show_map, self.imdb_map, self.movie_rating_key_map, self.show_rating_key_map, self.imdb_rating_key_map]:
+                id_map.compact()
         self.reverse_anidb = {}
         for k, v in self.anidb_map.items():
             self.reverse_anidb[v] = k
@@ -100,22 +100,22 @@ class Operations:
                 logger.info(f"{item.title[:25]:<25} | Splitting")
 
         if self.library.update_blank_track_titles:
-            tracks = self.library.get_all(builder_level="track")
+            num_tracks = 0
             num_edited = 0
-            for i, track in enumerate(tracks, 1):
-                logger.ghost(f"Processing Track: {i}/{len(tracks)} {track.title}")
+            for track in self.library.iter_all(builder_level="track"):
+                num_tracks += 1
+                logger.ghost(f"Processing Track: {num_tracks}/{self.library.item_totals['track']} {track.title}")
                 if not track.title and track.titleSort:
                     track.editTitle(track.titleSort)
                     num_edited += 1
                     logger.info(f"Track: {track.titleSort} was updated with sort title")
-            logger.info(f"{len(tracks)} Tracks Processed; {num_edited} Blank Track Titles Updated")
+            logger.info(f"{num_tracks} Tracks Processed; {num_edited} Blank Track Titles Updated")
 
         if self.library.items_library_operation:
             if self.library.assets_for_all and not self.library.asset_directory:
                 logger.error("Asset Error: No Asset Directory for Assets For All")
 
-            items = self.library.get_all()
-            total_items = len(items)
+            items = self.library.iter_all()
 
 
             radarr_adds = []
@@ -138,7 +138,7 @@ class Operations:
 
             for i, item in enumerate(items, 1):
                 logger.info("")
-                logger.info(f"({i}/{total_items}) {item.title}")
+                logger.info(f"({i}/{self.library.item_totals[self.library.Plex.TYPE]}) {item.title}")
                 try:
                     item = self.library.reload(item)
                 except Failed as e:
@@ -933,7 +933,7 @@ class Operations:
                                                 except Failed as er:
                                                     logger.error(er)
                                             elif imdb_id and option == "imdb":
-                                                found_rating = self.config.IMDb.get_episode_rating(imdb_id, ep.seasonNumber, ep.episodeNumber)
+                                                found_rating = self.config.IMDb.get_episode_rating(imdb_id, ep.seasonNumber, ep.episodeNumber, library=self.library)
                                             elif imdb_id and option == "trakt":
                                                 found_rating = self.config.Trakt.get_episode_rating(imdb_id, ep.seasonNumber, ep.episodeNumber)
                                             else:
@@ -996,6 +996,7 @@ class Operations:
                                 self.library.Plex._edit(**{f"{update_value}.locked": 1 if out_type == "lock" else 0})
                         elif tag_type is not None:
                             self.library.Plex.editTags(display_attr, update_value, remove=tag_type == "remove")
+                            self.library.tags_changed(display_attr, None if tag_type == "remove" else [update_value])
                         else:
                             self.library.Plex.editField(display_attr, update_value)
                         self.library.Plex.saveMultiEdits()
@@ -1119,7 +1120,7 @@ class Operations:
                     try:
                         poster, background, _, item_dir, name = self.library.find_item_assets(col)
                         if poster or background:
-                            self.library.upload_images(col, poster=poster, background=background)
+                            self.library.upload_images(col, poster=poster, background=background, queue=True)
                         elif self.library.show_missing_assets:
                             logger.warning(f"Asset Warning: No poster or background found in an assets folder for '{name}'")
                     except Failed as e:
@@ -1194,6 +1195,7 @@ class Operations:
             yaml.save()
             logger.info(f"{len(yaml.data['metadata'])} {self.library.type}{'s' if len(yaml.data['metadata']) > 1 else ''} Backed Up")
 
+        self.library.Uploads.flush()
         operation_run_time = str(datetime.now() - operation_start).split('.')[0]
         logger.info("")
         logger.separator(f"Finished {self.library.name} Library Operations\nOperations Run Time: {operation_run_time}")
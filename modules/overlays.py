@@ -30,7 +30,7 @@ class Overlays:
             key_to_overlays, properties = self.compile_overlays()
         ignore_list = [rk for rk in key_to_overlays]
 
-        old_overlays = [la for la in self.library.Plex.listFilterChoices("label") if str(la.title).lower().endswith(" overlay")]
+        old_overlays = [la for la in self.library.get_tags("label") if str(la.title).lower().endswith(" overlay")]
         if old_overlays:
             logger.separator(f"Removing Old Overlays for the {self.library.name} Library")
             logger.info("")
@@ -163,7 +163,7 @@ class Overlays:
                                 else:
                                     logger.warning(f"Asset Warning: No poster '{name}' found in the assets folders")
                         if background:
-                            self.library.upload_images(item, background=background)
+                            self.library.upload_images(item, background=background, queue=True)
                     except Failed as e:
                         if self.library.assets_for_all and self.library.show_missing_assets:
                             logger.warning(e)
@@ -280,7 +280,7 @@ class Overlays:
                                                         raise Failed(f"No TMDb ID for Guid: {item.guid}")
                                                 elif format_var == "imdb_rating":
                                                     if isinstance(item, Episode):
-                                                        found_rating = self.config.IMDb.get_episode_rating(imdb_id, item.seasonNumber, item.episodeNumber)
+                                                        found_rating = self.config.IMDb.get_episode_rating(imdb_id, item.seasonNumber, item.episodeNumber, library=self.library)
                                                     else:
                                                         found_rating = self.config.IMDb.get_rating(imdb_id)
                                                 elif format_var == "trakt_user_rating":
@@ -563,6 +563,7 @@ class Overlays:
         for _, over in properties.items():
             if over.image:
                 over.image.close()
+        self.library.Uploads.flush()
         overlay_run_time = str(datetime.now() - overlay_start).split('.')[0]
         logger.info("")
         logger.separator(f"Finished {self.library.name} Library Overlays\nOverlays Run Time: {overlay_run_time}")
@@ -1,12 +1,14 @@
-import os, plexapi, re, time
+import os, plexapi, re, struct, threading, time, traceback
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from modules import builder, util
+from lxml import etree
+from modules import builder, snapshot, util
 from modules.library import Library
+from modules.uploads import UploadQueue
 from modules.write_guard import WriteGuard
 from modules.poster import ImageData
 from modules.request import parse_qs, quote_plus, urlparse
 from modules.util import Failed
-from PIL import Image
 from plexapi import utils
 from plexapi.audio import Artist, Track, Album
 from plexapi.exceptions import BadRequest, NotFound, Unauthorized
@@ -446,6 +448,8 @@ watchlist_sorts = {
 }
 
 MAX_IMAGE_SIZE = 10480000  # a little less than 10MB
+tpdb_lock = threading.Lock()
+top_levels = ["movie", "show", "artist"]
 
 class Plex(Library):
     def __init__(self, config, params):
@@ -464,55 +468,59 @@ class Plex(Library):
             self.session = self.config.Requests.create_session()
         self.token = self.plex["token"]
         self.timeout = self.plex["timeout"]
+        self.Uploads = UploadQueue(self, params["image_upload_workers"], self.plex["max_uploads"])
         logger.secret(self.url)
         logger.secret(self.token)
-        try:
-            self.PlexServer = PlexServer(baseurl=self.url, token=self.token, session=self.session, timeout=self.timeout)
-            plexapi.server.TIMEOUT = self.timeout
-            os.environ["PLEXAPI_PLEXAPI_TIMEOUT"] = str(self.timeout)
-            logger.info(f"Connected to server {self.PlexServer.friendlyName} version {self.PlexServer.version}")
-            logger.info(f"Running on {self.PlexServer.platform} version {self.PlexServer.platformVersion}")
-            srv_settings = self.PlexServer.settings
-            try:
-                db_cache = srv_settings.get("DatabaseCacheSize")
-                logger.info(f"Plex DB cache setting: {db_cache.value} MB")
-                if self.plex["db_cache"] and self.plex["db_cache"] != db_cache.value:
-                    db_cache.set(self.plex["db_cache"])
-                    self.PlexServer.settings.save()
-                    logger.info(f"Plex DB Cache updated to {self.plex['db_cache']} MB")
-            except NotFound:
-                logger.info(f"Plex DB cache setting: Unknown")
-            try:
-                chl_num = srv_settings.get("butlerUpdateChannel").value
-                if chl_num == "16":
-                    uc_str = f"Public update channel."
-                elif chl_num == "8":
-                    uc_str = f"PlexPass update channel."
-                else:
-                    uc_str = f"Unknown update channel: {chl_num}."
-            except NotFound:
-                uc_str = f"Unknown update channel."
-            logger.info(f"PlexPass: {self.PlexServer.myPlexSubscription} on {uc_str}")
+        plexapi.server.TIMEOUT = self.timeout
+        os.environ["PLEXAPI_PLEXAPI_TIMEOUT"] = str(self.timeout)
+        connection_key = (self.url, self.token, self.plex["verify_ssl"], self.timeout)
+        if connection_key in self.config.plex_servers:
+            self.connection = self.config.plex_servers[connection_key]
+            self.PlexServer = self.connection["server"]
+            logger.info(f"Reusing connection to server {self.PlexServer.friendlyName} version {self.PlexServer.version}")
+            self.update_db_cache()
+        else:
             try:
-                logger.info(f"Scheduled maintenance running between {srv_settings.get('butlerStartHour').value}:00 and {srv_settings.get('butlerEndHour').value}:00")
-            except NotFound:
-                logger.info("Scheduled maintenance times could not be found")
-        except Unauthorized:
-            logger.info(f"Plex Error: Plex connection attempt returned 'Unauthorized'")
-            raise Failed("Plex Error: Plex token is invalid")
-        except ConnectTimeout:
-            raise Failed(f"Plex Error: Plex did not respond within the {self.timeout}-second timeout.")
-        except ValueError as e:
-            logger.info(f"Plex Error: Plex connection attempt returned 'ValueError'")
-            logger.stacktrace()
-            raise Failed(f"Plex Error: {e}")
-        except (ConnectionError, ParseError):
-            logger.info(f"Plex Error: Plex connection attempt returned 'ConnectionError' or 'ParseError'")
-            logger.stacktrace()
-            raise Failed("Plex Error: Plex URL is probably invalid")
+                self.PlexServer = PlexServer(baseurl=self.url, token=self.token, session=self.session, timeout=self.timeout)
+                logger.info(f"Connected to server {self.PlexServer.friendlyName} version {self.PlexServer.version}")
+                logger.info(f"Running on {self.PlexServer.platform} version {self.PlexServer.platformVersion}")
+                srv_settings = self.PlexServer.settings
+                self.update_db_cache()
+                try:
+                    chl_num = srv_settings.get("butlerUpdateChannel").value
+                    if chl_num == "16":
+                        uc_str = f"Public update channel."
+                    elif chl_num == "8":
+                        uc_str = f"PlexPass update channel."
+                    else:
+                        uc_str = f"Unknown update channel: {chl_num}."
+                except NotFound:
+                    uc_str = f"Unknown update channel."
+                logger.info(f"PlexPass: {self.PlexServer.myPlexSubscription} on {uc_str}")
+                try:
+                    logger.info(f"Scheduled maintenance running between {srv_settings.get('butlerStartHour').value}:00 and {srv_settings.get('butlerEndHour').value}:00")
+                except NotFound:
+                    logger.info("Scheduled maintenance times could not be found")
+            except Unauthorized:
+                logger.info(f"Plex Error: Plex connection attempt returned 'Unauthorized'")
+                raise Failed("Plex Error: Plex token is invalid")
+            except ConnectTimeout:
+                raise Failed(f"Plex Error: Plex did not respond within the {self.timeout}-second timeout.")
+            except ValueError as e:
+                logger.info(f"Plex Error: Plex connection attempt returned 'ValueError'")
+                logger.stacktrace()
+                raise Failed(f"Plex Error: {e}")
+            except (ConnectionError, ParseError):
+                logger.info(f"Plex Error: Plex connection attempt returned 'ConnectionError' or 'ParseError'")
+                logger.stacktrace()
+                raise Failed("Plex Error: Plex URL is probably invalid")
+            self.connection = {"server": self.PlexServer, "sections": None, "plex_pass": None, "account": None, "users": None, "user_objects": {}, "user_servers": {}}
+            self.config.plex_servers[connection_key] = self.connection
         self.Plex = None
         library_names = []
-        for s in self.PlexServer.library.sections():
+        if self.connection["sections"] is None:
+            self.connection["sections"] = self.PlexServer.library.sections()
+        for s in self.connection["sections"]:
             library_names.append(s.title)
             if s.title == params["name"]:
                 self.Plex = s
@@ -525,9 +533,15 @@ class Plex(Library):
             raise Failed("Plex Error: Plex Token is read only. Please get a new token")
 
         self.type = self.Plex.type.capitalize()
-        self.plex_pass = self.PlexServer.myPlexSubscription
+        if self.connection["plex_pass"] is None:
+            self.connection["plex_pass"] = self.PlexServer.myPlexSubscription
+        self.plex_pass = self.connection["plex_pass"]
         self._users = []
-        self._all_items = []
+        self._level_items = {}
+        self.level_cache_size = params["level_cache_size"]
+        self.item_totals = {}
+        self._memo = {}
+        self._memo_lock = threading.Lock()
         self._account = None
         self.agent = self.Plex.agent
         self.scanner = self.Plex.scanner
@@ -554,19 +568,60 @@ class Plex(Library):
     def notify_delete(self, message):
         self.config.notify_delete(message, server=self.PlexServer.friendlyName, library=self.name)
 
+    def update_db_cache(self):
+        try:
+            db_cache = self.PlexServer.settings.get("DatabaseCacheSize")
+            logger.info(f"Plex DB cache setting: {db_cache.value} MB")
+            if self.plex["db_cache"] and self.plex["db_cache"] != db_cache.value:
+                db_cache.set(self.plex["db_cache"])
+                self.PlexServer.settings.save()
+                logger.info(f"Plex DB Cache updated to {self.plex['db_cache']} MB")
+        except NotFound:
+            logger.info(f"Plex DB cache setting: Unknown")
+
     def set_server_preroll(self, preroll):
         self.PlexServer.settings.get('cinemaTrailersPrerollID').set(preroll)
         self.PlexServer.settings.save()
 
+    def _memoized(self, memo_key, loader):
+        with self._memo_lock:
+            future = self._memo.get(memo_key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._memo[memo_key] = future
+        if owner:
+            try:
+                future.set_result(loader())
+            except BaseException as e:
+                with self._memo_lock:
+                    if self._memo.get(memo_key) is future:
+                        del self._memo[memo_key]
+                future.set_exception(e)
+        return list(future.result())
+
+    def tags_changed(self, attr, tags=None):
+        with self._memo_lock:
+            for memo_key in list(self._memo):
+                if memo_key[0] == "collections" and attr in ["collection", "label"] and (attr == "collection" or memo_key[1]):
+                    del self._memo[memo_key]
+                elif memo_key[0] == "tags" and urlparse(memo_key[1]).path.rsplit("/", 1)[-1] == attr:
+                    future = self._memo[memo_key]
+                    if tags and future.done() and future.exception() is None and all(t in [c.title for c in future.result()] for t in tags):
+                        continue
+                    del self._memo[memo_key]
+
     def get_all_collections(self, label=None):
-        args = "?type=18"
-        if label:
-            label_id = next((c.key for c in self.get_tags("label") if c.title == label), None) # noqa
-            if label_id:
-                args = f"{args}&label={label_id}"
-            else:
-                return []
-        return self.fetchItems(args)
+        def load():
+            args = "?type=18"
+            if label:
+                label_id = next((c.key for c in self.get_tags("label") if c.title == label), None) # noqa
+                if label_id:
+                    args = f"{args}&label={label_id}"
+                else:
+                    return []
+            return self.fetchItems(args)
+        return self._memoized(("collections", label), load)
 
     @retry(stop=stop_after_attempt(6), wait=wait_fixed(10), retry=retry_if_not_exception_type((BadRequest, NotFound, Unauthorized)))
     def search(self, title=None, sort=None, maxresults=None, libtype=None, **kwargs):
@@ -601,38 +656,166 @@ class Plex(Library):
     def fetchItems(self, uri_args):
         return self.Plex.fetchItems(f"/library/sections/{self.Plex.key}/all{'' if uri_args is None else uri_args}")
 
-    def get_all(self, builder_level=None, load=False):
-        if load and builder_level in [None, "show", "artist", "movie"]:
-            self._all_items = []
-        if self._all_items and builder_level in [None, "show", "artist", "movie"]:
-            return self._all_items
+    def count_items(self, uri_args):
+        key = f"/library/sections/{self.Plex.key}/all{'' if uri_args is None else uri_args}"
+        container, _ = self._load_page(key, 0, 0, lambda elem: None)
+        total_size = utils.cast(int, container.get("totalSize"))
+        if total_size is None:
+            return len(self.fetchItems(uri_args))
+        limit = parse_qs(urlparse(key).query).get("limit")
+        return min(total_size, int(limit[0])) if limit else total_size
+
+    @retry(stop=stop_after_attempt(6), wait=wait_fixed(10), retry=retry_if_not_exception_type((BadRequest, NotFound, Unauthorized)))
+    def _load_page(self, key, container_start, container_size, build):
+        server = self.Plex._server
+        headers = server._headers(**{"X-Plex-Container-Start": str(container_start), "X-Plex-Container-Size": str(container_size)})
+        response = server._session.get(server.url(key), headers=headers, timeout=self.timeout, stream=True)
+        try:
+            if response.status_code not in (200, 201, 204):
+                message = f"({response.status_code}) {response.url} {response.text}"
+                if response.status_code == 401:
+                    raise Unauthorized(message)
+                elif response.status_code == 404:
+                    raise NotFound(message)
+                raise BadRequest(message)
+            response.raw.decode_content = True
+            container = {}
+            results = []
+            root = None
+            depth = 0
+            for event, elem in etree.iterparse(response.raw, events=("start", "end")):
+                if event == "start":
+                    if root is None:
+                        root = elem
+                        container = dict(elem.attrib)
+                    depth += 1
+                    continue
+                depth -= 1
+                if depth == 1:
+                    result = build(elem)
+                    if result is not None:
+                        results.append(result)
+                    root.remove(elem)
+            return container, results
+        finally:
+            response.close()
+
+    def iter_records(self, fields, builder_level=None, uri_args=None, tags=None):
+        if uri_args is None:
+            uri_args = f"?type={utils.searchType(builder_level if builder_level else self.Plex.TYPE)}"
+        key = f"/library/sections/{self.Plex.key}/all{uri_args}"
+        if tags and "Guid" in tags:
+            key += "&includeGuids=1"
+
+        def build(elem):
+            record = {f: elem.get(f) for f in fields}
+            if tags:
+                for child in elem:
+                    if child.tag in tags:
+                        if child.tag not in record:
+                            record[child.tag] = []
+                        record[child.tag].append(child.get(tags[child.tag]))
+            elem.clear()
+            return record
+
+        container_start = 0
+        container_size = plexapi.X_PLEX_CONTAINER_SIZE
+        loaded = 0
+        total_size = 1
+        while total_size > loaded and container_start <= total_size:
+            container, records = self._load_page(key, container_start, container_size, build)
+            total_size = utils.cast(int, container.get("totalSize") or container.get("size")) or len(records)
+            if not records:
+                break
+            loaded += len(records)
+            container_start += container_size
+            yield from records
+
+    def get_rating_key_list(self, builder_level=None, uri_args=None):
+        return [int(r["ratingKey"]) for r in self.iter_records(["ratingKey"], builder_level=builder_level, uri_args=uri_args) if r["ratingKey"]]
+
+    def cached_level(self, builder_level=None):
+        builder_type = builder_level if builder_level else self.Plex.TYPE
+        if builder_type in self._level_items:
+            self._level_items[builder_type] = self._level_items.pop(builder_type)
+            return self._level_items[builder_type]
+        return None
+
+    def _cache_level(self, builder_type, items):
+        if builder_type not in top_levels:
+            if len(items) > self.level_cache_size:
+                logger.debug(f"{builder_type.capitalize()} Level of {len(items)} Items is over the Level Cache Size of {self.level_cache_size}")
+                return
+            cached = [k for k in self._level_items if k not in top_levels]
+            while cached and sum(len(self._level_items[k]) for k in cached) + len(items) > self.level_cache_size:
+                self._release_level(cached.pop(0))
+            for item in items:
+                if item.ratingKey not in self.cached_items:
+                    self.cached_items[item.ratingKey] = (item, False)
+        self._level_items[builder_type] = items
+
+    def _release_level(self, builder_type):
+        for item in self._level_items.pop(builder_type, []):
+            if item.ratingKey in self.cached_items and self.cached_items[item.ratingKey][0] is item:
+                del self.cached_items[item.ratingKey]
+        if builder_type in self.snapshots:
+            del self.snapshots[builder_type]
+
+    def release_levels(self):
+        for builder_type in [k for k in self._level_items if k not in top_levels]:
+            self._release_level(builder_type)
+
+    def iter_all(self, builder_level=None, load=False):
         builder_type = builder_level if builder_level else self.Plex.TYPE
+        top_level = builder_type in top_levels
+        if load and builder_type in self._level_items:
+            del self._level_items[builder_type]
+        cached = self.cached_level(builder_type)
+        if cached:
+            self.item_totals[builder_type] = len(cached)
+            yield from cached
+            return
+        keep = top_level or self.level_cache_size > 0
         if not builder_level:
             builder_level = self.type
         logger.info(f"Loading All {builder_level.capitalize()}s from Library: {self.name}")
         key = f"/library/sections/{self.Plex.key}/all?includeGuids=1&type={utils.searchType(builder_type)}"
+        building = snapshot.LibrarySnapshot(builder_type) if snapshot.available() and builder_type not in self.snapshots else None
         container_start = 0
         container_size = plexapi.X_PLEX_CONTAINER_SIZE
         results = []
+        loaded = 0
         total_size = 1
-        while total_size > len(results) and container_start <= total_size:
-            data = self.Plex._server.query(key, headers={"X-Plex-Container-Start": str(container_start), "X-Plex-Container-Size": str(container_size)})
-            subresults = self.Plex.findItems(data, initpath=key)
-            total_size = utils.cast(int, data.attrib.get('totalSize') or data.attrib.get('size')) or len(subresults)
-
-            librarySectionID = utils.cast(int, data.attrib.get('librarySectionID'))
-            if librarySectionID:
-                for item in subresults:
+        while total_size > loaded and container_start <= total_size:
+            container, subresults = self._load_page(key, container_start, container_size, lambda elem: self.Plex._buildItemOrNone(elem, None, key))
+            total_size = utils.cast(int, container.get('totalSize') or container.get('size')) or len(subresults)
+            self.item_totals[builder_type] = total_size
+
+            librarySectionID = utils.cast(int, container.get('librarySectionID'))
+            for item in subresults:
+                if librarySectionID:
                     item.librarySectionID = librarySectionID
+                if building:
+                    building.add(item)
 
-            results.extend(subresults)
+            loaded += len(subresults)
             container_start += container_size
             logger.ghost(f"Loaded: {total_size if container_start > total_size else container_start}/{total_size}")
+            if keep:
+                results.extend(subresults)
+                if not top_level and len(results) > self.level_cache_size:
+                    keep = False
+                    results = []
+            yield from subresults
 
         logger.info(f"Loaded {total_size} {builder_level.capitalize()}s")
-        if builder_level in [None, "show", "artist", "movie"]:
-            self._all_items = results
-        return results
+        if building:
+            self.snapshots[builder_type] = building.finish()
+        if keep:
+            self._cache_level(builder_type, results)
+
+    def get_all(self, builder_level=None, load=False):
+        return list(self.iter_all(builder_level=builder_level, load=load))
 
     def upload_theme(self, collection, url=None, filepath=None):
         key = f"/library/metadata/{collection.ratingKey}/themes"
@@ -668,7 +851,10 @@ class Plex(Library):
             WriteGuard.log_blocked("delete", f"object={obj.title if hasattr(obj, 'title') else obj}")
             return None
         try:
-            return self.query(obj.delete)
+            result = self.query(obj.delete)
+            if isinstance(obj, Collection):
+                self.tags_changed("collection")
+            return result
         except Exception:
             logger.stacktrace()
             raise Failed(f"Plex Error: Failed to delete {obj.title}")
@@ -683,7 +869,9 @@ class Plex(Library):
             action = "remove" if remove else "add"
             WriteGuard.log_blocked(f"tag_edit_{action}", f"attribute={attribute}, data={data}", item)
             return None
-        return item.editTags(attribute, data, locked=locked, remove=remove)
+        result = item.editTags(attribute, data, locked=locked, remove=remove)
+        self.tags_changed(attribute, None if remove else data)
+        return result
 
     @retry(stop=stop_after_attempt(6), wait=wait_fixed(10), retry=retry_if_not_exception_type(Failed))
     def query_collection(self, item, collection, locked=True, add=True):
@@ -695,6 +883,7 @@ class Plex(Library):
             item.addCollection(collection, locked=locked)
         else:
             item.removeCollection(collection, locked=locked)
+        self.tags_changed("collection", [collection] if add else None)
 
     @retry(stop=stop_after_attempt(6), wait=wait_fixed(10), retry=retry_if_not_exception_type((BadRequest, NotFound, Unauthorized)))
     def collection_mode_query(self, collection, data):
@@ -790,6 +979,7 @@ class Plex(Library):
             return item
 
     def load_list_from_cache(self, rating_keys):
+        self.batch_load(rating_keys, full=False)
         item_list = []
         for rating_key in rating_keys:
             item = self.load_from_cache(rating_key)
@@ -813,6 +1003,8 @@ class Plex(Library):
             if not is_full or force:
                 self.item_reload(item)
                 self.cached_items[item.ratingKey] = (item, True)
+                if item.TYPE in self.snapshots:
+                    self.snapshots[item.TYPE].update(item)
         except (BadRequest, NotFound) as e:
             logger.stacktrace()
             raise Failed(f"Item Failed to Load: {e}")
@@ -829,7 +1021,7 @@ class Plex(Library):
             item.edit(**edits)
 
     @retry(stop=stop_after_attempt(6), wait=wait_fixed(10), retry=retry_if_not_exception_type((BadRequest, NotFound, Unauthorized)))
-    def _upload_image(self, item, image):
+    def _upload_image(self, item, image, reload=True):
         if not WriteGuard.can_write():
             img_type = "poster" if image.is_poster else "background" if image.is_background else "logo"
             WriteGuard.log_blocked(f"upload_{img_type}", f"location={image.location}", item)
@@ -837,12 +1029,13 @@ class Plex(Library):
         upload_success = True
         try:
             if image.is_url and "theposterdb.com" in image.location:
-                now = datetime.now()
-                if self.config.tpdb_timer is not None:
-                    while self.config.tpdb_timer + timedelta(seconds=6) > now:
-                        time.sleep(1)
-                        now = datetime.now()
-                self.config.tpdb_timer = now
+                with tpdb_lock:
+                    now = datetime.now()
+                    if self.config.tpdb_timer is not None:
+                        while self.config.tpdb_timer + timedelta(seconds=6) > now:
+                            time.sleep(1)
+                            now = datetime.now()
+                    self.config.tpdb_timer = now
             if image.is_poster and image.is_url:
                 item.uploadPoster(url=image.location)
             elif image.is_poster:
@@ -859,12 +1052,49 @@ class Plex(Library):
                 item.uploadLogo(url=image.location)
             else:
                 item.uploadLogo(filepath=image.location)
-            self.reload(item, force=True)
+            if reload:
+                self.reload(item, force=True)
             return upload_success
         except BadRequest as e:
             item.refresh()
             raise Failed(e)
 
+    def _load_metadata(self, keys, items=None):
+        for i in range(0, len(keys), 100):
+            try:
+                data = self._query(f"/library/metadata/{','.join([str(k) for k in keys[i:i + 100]])}")
+            except (BadRequest, NotFound) as e:
+                logger.error(f"Plex Error: Failed to Load Items: {e}")
+                continue
+            for elem in data:
+                rating_key = utils.cast(int, elem.attrib.get("ratingKey"))
+                if items is not None or rating_key in self.cached_items:
+                    item = items.get(rating_key) if items is not None else self.cached_items[rating_key][0]
+                    if item is None:
+                        continue
+                    item._invalidateCacheAndLoadData(elem)
+                else:
+                    item = self.Plex._buildItemOrNone(elem, None, f"/library/metadata/{rating_key}")
+                    if not isinstance(item, (Movie, Show, Season, Episode, Artist, Album, Track)):
+                        continue
+                item._autoReload = False
+                self.cached_items[rating_key] = (item, True)
+                if item.TYPE in self.snapshots:
+                    self.snapshots[item.TYPE].update(item)
+
+    def batch_reload(self, items):
+        items = {item.ratingKey: item for item in items}
+        self._load_metadata(list(items), items=items)
+
+    def batch_load(self, rating_keys, full=True):
+        keys = []
+        for rating_key in dict.fromkeys(int(k) for k in rating_keys if str(k).isdigit()):
+            if rating_key not in self.cached_items or (full and not self.cached_items[rating_key][1]):
+                keys.append(rating_key)
+        if keys:
+            logger.debug(f"Loading {len(keys)} Items in Batches")
+            self._load_metadata(keys)
+
     @retry(stop=stop_after_attempt(6), wait=wait_fixed(10), retry=retry_if_not_exception_type((BadRequest, NotFound, Unauthorized)))
     def upload_poster(self, item, image, url=False):
         if not WriteGuard.can_write():
@@ -922,7 +1152,6 @@ class Plex(Library):
             logger.debug(f"Search Attribute: {final_search}")
             raise Failed(f"Plex Error: plex_search attribute: {search_name} not supported")
 
-    @retry(stop=stop_after_attempt(6), wait=wait_fixed(10), retry=retry_if_not_exception_type((BadRequest, NotFound, Unauthorized)))
     def get_tags(self, tag):
         if isinstance(tag, str):
             match = re.match(r'(?:([a-zA-Z]*)\.)?([a-zA-Z]+)', tag)
@@ -936,6 +1165,10 @@ class Plex(Library):
                 available_filters = [f.filter for f in self.Plex.listFilters(libtype)]
                 raise NotFound(f'Unknown filter field "{tag}" for libtype "{libtype}". '
                                f'Available filters: {available_filters}') from None
+        return self._memoized(("tags", tag.key), lambda: self._load_tags(tag))
+
+    @retry(stop=stop_after_attempt(6), wait=wait_fixed(10), retry=retry_if_not_exception_type((BadRequest, NotFound, Unauthorized)))
+    def _load_tags(self, tag):
         items = self.Plex.findItems(self.Plex._server.query(tag.key), FilterChoice)
         if tag.key.endswith("/collection?type=4"):
             keys = [k.key for k in items]
@@ -953,39 +1186,65 @@ class Plex(Library):
     @property
     def users(self):
         if not self._users:
-            users = []
-            for user in self.account.users():
-                if self.PlexServer.machineIdentifier in [s.machineIdentifier for s in user.servers]:
-                    users.append(user.title)
-            self._users = users
+            if self.connection["users"] is None:
+                users = []
+                for user in self.account.users():
+                    if self.PlexServer.machineIdentifier in [s.machineIdentifier for s in user.servers]:
+                        users.append(user.title)
+                        self.connection["user_objects"][user.title] = user
+                self.connection["users"] = users
+            self._users = self.connection["users"]
         return self._users
 
+    def user_server(self, user):
+        if user not in self.connection["user_servers"]:
+            session = self.config.Requests.create_session(verify_ssl=self.session.verify is not False)
+            server = self.PlexServer.switchUser(self.connection["user_objects"].get(user, user), session=session, timeout=self.timeout)
+            self.connection["user_servers"].setdefault(user, server)
+        return self.connection["user_servers"][user]
+
+    def for_each_user(self, function, users=None):
+        if users is None:
+            users = self.users
+        if self.plex["user_workers"] < 2 or len(users) < 2:
+            return [function(u) for u in users]
+        with ThreadPoolExecutor(max_workers=self.plex["user_workers"]) as executor:
+            return list(executor.map(function, users))
+
     def delete_user_playlist(self, title, user):
         try:
-            self.delete(self.PlexServer.switchUser(user).playlist(title))
+            self.delete(self.user_server(user).playlist(title))
         except NotFound as e:
             raise Failed(e)
 
+    def copy_playlist_to_user(self, playlist, user, items=None):
+        if not WriteGuard.can_write():
+            WriteGuard.log_blocked("copy_playlist_to_user", f"user={user}", playlist)
+            return None
+        return Playlist.create(server=self.user_server(user), title=playlist.title, items=items if items else playlist.items())
+
     @property
     def account(self):
         if self._account is None:
-            self._account = self.PlexServer.myPlexAccount()
+            if self.connection["account"] is None:
+                self.connection["account"] = self.PlexServer.myPlexAccount()
+            self._account = self.connection["account"]
         return self._account
 
     def playlist_report(self):
-        playlists = {}
-        def scan_user(server, username):
+        def scan_user(user):
             try:
-                for playlist in server.playlists():
-                    if isinstance(playlist, Playlist):
-                        if playlist.title not in playlists:
-                            playlists[playlist.title] = []
-                        playlists[playlist.title].append(username)
+                server = self.PlexServer if user is None else self.user_server(user)
+                return [p.title for p in server.playlists() if isinstance(p, Playlist)]
             except ConnectionError:
-                pass
-        scan_user(self.PlexServer, self.account.title)
-        for user in self.users:
-            scan_user(self.PlexServer.switchUser(user), user)
+                return []
+        playlists = {}
+        users = [self.account.title] + self.users
+        for username, titles in zip(users, self.for_each_user(scan_user, users=[None] + self.users)):
+            for title in titles:
+                if title not in playlists:
+                    playlists[title] = []
+                playlists[title].append(username)
         return playlists
 
     def manage_recommendations(self):
@@ -1021,6 +1280,7 @@ class Plex(Library):
                 else:
                     self.Plex.removeCollection(collection, locked=locked)
                 self.Plex.saveMultiEdits()
+                self.tags_changed("label" if smart_label_collection else "collection", [collection] if add else None)
 
     def move_item(self, collection, item, after=None):
         if not WriteGuard.can_write():
@@ -1040,8 +1300,7 @@ class Plex(Library):
 
     def test_smart_filter(self, uri_args):
         logger.debug(f"Smart Collection Test: {uri_args}")
-        test_items = self.fetchItems(uri_args)
-        if len(test_items) < 1:
+        if self.count_items(uri_args) < 1:
             raise Failed(f"Plex Error: No items for smart filter: {uri_args}")
 
     def create_smart_collection(self, title, smart_type, uri_args, ignore_blank_results):
@@ -1058,6 +1317,7 @@ class Plex(Library):
             "uri": self.build_smart_filter(uri_args)
         }
         self._query(f"/library/collections{utils.joinArgs(args)}", post=True)
+        self.tags_changed("collection")
 
     def create_blank_collection(self, title):
         if not WriteGuard.can_write():
@@ -1071,6 +1331,7 @@ class Plex(Library):
             "uri": f"{self.PlexServer._uriRoot()}/library/metadata"
         }
         self._query(f"/library/collections{utils.joinArgs(args)}", post=True)
+        self.tags_changed("collection")
 
     def get_smart_filter_from_uri(self, uri):
         smart_filter = parse_qs(urlparse(uri.replace("/#!/", "/")).query)["key"][0] # noqa
@@ -1115,14 +1376,15 @@ class Plex(Library):
             raise Failed(f"Plex Error: Playlist {title} not found")
 
     def get_playlist_from_users(self, playlist_title):
-        for user in self.users:
+        def scan_user(user):
             try:
-                for playlist in self.PlexServer.switchUser(user).playlists():
-                    if isinstance(playlist, Playlist) and playlist.title == playlist_title:
-                        return playlist
+                return next((p for p in self.user_server(user).playlists() if isinstance(p, Playlist) and p.title == playlist_title), None)
             except ConnectionError:
-                pass
-        raise Failed(f"Plex Error: Playlist {playlist_title} not found")
+                return None
+        playlist = next((p for p in self.for_each_user(scan_user) if p is not None), None)
+        if playlist is None:
+            raise Failed(f"Plex Error: Playlist {playlist_title} not found")
+        return playlist
 
     def get_collection(self, data, force_search=False, debug=True):
         if isinstance(data, Collection):
@@ -1227,9 +1489,12 @@ class Plex(Library):
 
     def get_rating_keys(self, method, data, is_playlist=False):
         items = []
+        rating_keys = None
         if method == "plex_all":
             logger.info(f"Processing Plex All {data.capitalize()}s")
-            items = self.get_all(builder_level=data)
+            items = self.cached_level(data)
+            if items is None:
+                rating_keys = self.get_rating_key_list(builder_level=data)
         elif method == "plex_watchlist":
             logger.info(f"Processing Plex Watchlist")
             return self.get_watchlist(sort=data, is_playlist=is_playlist)
@@ -1244,7 +1509,7 @@ class Plex(Library):
         elif method == "plex_search":
             logger.info(f"Processing {data[1]}")
             logger.trace(data[2])
-            items = self.fetchItems(data[2])
+            rating_keys = self.get_rating_key_list(uri_args=data[2])
         elif method == "plex_collectionless":
             good_collections = []
             logger.info(f"Processing Plex Collectionless")
@@ -1269,24 +1534,23 @@ class Plex(Library):
             for col in good_collections:
                 logger.info(col.title)
             logger.info("")
-            collection_indexes = [str(c.title).lower() for c in good_collections]
-            all_items = self.get_all()
-            for i, item in enumerate(all_items, 1):
-                logger.ghost(f"Processing: {i}/{len(all_items)} {item.title}")
-                add_item = True
-                item = self.reload(item, force=True)
-                for collection in item.collections:
-                    if str(collection.tag).lower() in collection_indexes:
-                        add_item = False
-                        break
-                if add_item:
-                    items.append(item)
-            logger.info(f"Processed {len(all_items)} {self.type}s")
+            tag_keys = {t.title.lower(): t.key for t in self.get_tags("collection")}
+            collection_keys = list(dict.fromkeys(str(tag_keys[c.title.lower()]) for c in good_collections if c.title.lower() in tag_keys))
+            collected = set()
+            for i in range(0, len(collection_keys), 50):
+                uri_args = f"?type={utils.searchType(self.Plex.TYPE)}&collection={','.join(collection_keys[i:i + 50])}"
+                collected.update(self.get_rating_key_list(uri_args=uri_args))
+            all_items = self.cached_level()
+            all_keys = [i.ratingKey for i in all_items] if all_items else self.get_rating_key_list()
+            rating_keys = [k for k in all_keys if k not in collected]
+            logger.info(f"Processed {len(all_keys)} {self.type}s")
         else:
             raise Failed(f"Plex Error: Method {method} not supported")
-        if not items:
+        if rating_keys is None:
+            rating_keys = [item.ratingKey for item in items]
+        if not rating_keys:
             raise Failed("Plex Error: No Items found in Plex")
-        return [(item.ratingKey, "ratingKey") for item in items]
+        return [(rating_key, "ratingKey") for rating_key in rating_keys]
 
     def get_collection_items(self, collection, smart_label_collection):
         if smart_label_collection:
@@ -1363,6 +1627,26 @@ class Plex(Library):
                 logger.info(final)
         return final[28:] if final else final
 
+    def reset_image(self, item, image, image_url, poster, messages=None):
+        try:
+            if poster:
+                self.upload_poster(item, image, url=image_url)
+            else:
+                self.upload_background(item, image, url=image_url)
+        except BadRequest as e:
+            if messages is None:
+                logger.stacktrace()
+                logger.error(f"Plex Error: {e}")
+            else:
+                messages.append(("debug", traceback.format_exc()))
+                messages.append(("error", f"Plex Error: {e}"))
+        if poster and "Overlay" in [la.tag for la in self.item_labels(item)]:
+            label_message = self.edit_tags("label", item, remove_tags="Overlay", do_print=False)
+            if messages is None:
+                logger.info(label_message)
+            else:
+                messages.append(("info", label_message))
+
     def image_update(self, item, image, tmdb=None, title=None, poster=True):
         text = f"{f'{title} ' if title else ''}{'Poster' if poster else 'Background'}"
         attr = self.mass_poster_update["source"] if poster else self.mass_background_update["source"]
@@ -1391,20 +1675,10 @@ class Plex(Library):
                         location = "Plex"
             if image:
                 logger.info(f"{text} | Reset from {location}")
-                if poster:
-                    try:
-                        self.upload_poster(item, image, url=image_url)
-                    except BadRequest as e:
-                        logger.stacktrace()
-                        logger.error(f"Plex Error: {e}")
+                if self.Uploads.active:
+                    self.Uploads.submit(item, self.reset_image, item, image, image_url, poster, reload=False)
                 else:
-                    try:
-                        self.upload_background(item, image, url=image_url)
-                    except BadRequest as e:
-                        logger.stacktrace()
-                        logger.error(f"Plex Error: {e}")
-                if poster and "Overlay" in [la.tag for la in self.item_labels(item)]:
-                    logger.info(self.edit_tags("label", item, remove_tags="Overlay", do_print=False))
+                    self.reset_image(item, image, image_url, poster)
             else:
                 logger.warning(f"{text} | No Reset Image Found")
 
@@ -1451,7 +1725,7 @@ class Plex(Library):
             poster, background, logo, item_dir, name = self.find_item_assets(item, asset_directory=asset_directory)
             if "Overlay" not in current_labels:
                 if poster or background or logo:
-                    self.upload_images(item, poster=poster, background=background, logo=logo)
+                    self.upload_images(item, poster=poster, background=background, logo=logo, queue=True)
                 elif self.show_missing_assets:
                     logger.warning(f"Asset Warning: No poster or background found in the assets folder '{item_dir}'")
             else:
@@ -1472,7 +1746,7 @@ class Plex(Library):
                     elif self.show_missing_season_assets and season.seasonNumber > 0:
                         missing_seasons += f"\nMissing Season {season.seasonNumber} Poster"
                     if season_poster or season_background or season_logo and "Overlay" not in [la.tag for la in self.item_labels(season)]:
-                        self.upload_images(season, poster=season_poster, background=season_background, logo=season_logo)
+                        self.upload_images(season, poster=season_poster, background=season_background, logo=season_logo, queue=True)
                 except Failed as e:
                     if self.show_missing_assets:
                         logger.warning(e)
@@ -1483,7 +1757,7 @@ class Plex(Library):
                             if episode_poster or episode_background or episode_logo:
                                 found_episode = True
                                 if "Overlay" not in [la.tag for la in self.item_labels(episode)]:
-                                    self.upload_images(episode, poster=episode_poster, background=episode_background, logo=episode_logo)
+                                    self.upload_images(episode, poster=episode_poster, background=episode_background, logo=episode_logo, queue=True)
                             elif self.show_missing_episode_assets:
                                 missing_episodes += f"\nMissing {episode.seasonEpisode.upper()} Title Card"
                     except Failed as e:
@@ -1502,7 +1776,7 @@ class Plex(Library):
                     elif self.show_missing_season_assets:
                         missing_assets += f"\nMissing Album {album.title} Poster"
                     if album_poster or album_background:
-                        self.upload_images(album, poster=album_poster, background=album_background)
+                        self.upload_images(album, poster=album_poster, background=album_background, queue=True)
                 except Failed as e:
                     if self.show_missing_assets:
                         logger.warning(e)
@@ -1557,21 +1831,9 @@ class Plex(Library):
         if not item_asset_directory:
             for ad in asset_directory:
                 if self.asset_folders:
-                    if os.path.isdir(os.path.join(ad, folder_name)):
-                        item_asset_directory = os.path.join(ad, folder_name)
-                    else:
-                        for n in range(1, self.asset_depth + 1):
-                            new_path = ad
-                            for i in range(1, n + 1):
-                                new_path = os.path.join(new_path, "*")
-                            matches = util.glob_filter(os.path.join(new_path, folder_name))
-                            if len(matches) > 0:
-                                item_asset_directory = os.path.abspath(matches[0])
-                                break
-                else:
-                    matches = util.glob_filter(os.path.join(ad, f"{file_name}.*"))
-                    if len(matches) > 0:
-                        item_asset_directory = ad
+                    item_asset_directory = self.config.AssetIndex.find_folder(ad, folder_name, self.asset_depth)
+                elif self.config.AssetIndex.find_files(ad, file_name):
+                    item_asset_directory = ad
                 if item_asset_directory:
                     break
             if not item_asset_directory:
@@ -1579,45 +1841,60 @@ class Plex(Library):
                     if self.create_asset_folders and asset_directory:
                         item_asset_directory = os.path.join(asset_directory[0], folder_name)
                         os.makedirs(item_asset_directory, exist_ok=True)
+                        self.config.AssetIndex.invalidate(asset_directory[0])
                         logger.warning(f"Asset Warning: Asset Directory Not Found and Created: {item_asset_directory}")
                     else:
                         raise Failed(f"Asset Warning: Unable to find asset folder: '{folder_name}'")
                 return None, None, None, item_asset_directory, folder_name
 
-        poster_filter = os.path.join(item_asset_directory, f"{file_name}.*")
-        background_filter = os.path.join(item_asset_directory, "background.*" if file_name == "poster" else f"{file_name}_background.*")
-        logo_filter = os.path.join(item_asset_directory, "logo.*" if file_name == "poster" else f"{file_name}_logo.*")
-
-        poster_matches = util.glob_filter(poster_filter)
+        poster_matches = self.config.AssetIndex.find_files(item_asset_directory, file_name)
         if len(poster_matches) > 0:
             poster = ImageData("asset_directory", os.path.abspath(poster_matches[0]), prefix=prefix, is_url=False)
 
-        background_matches = util.glob_filter(background_filter)
+        background_matches = self.config.AssetIndex.find_files(item_asset_directory, "background" if file_name == "poster" else f"{file_name}_background")
         if len(background_matches) > 0:
             background = ImageData("asset_directory", os.path.abspath(background_matches[0]), prefix=prefix, image_type="background", is_url=False)
 
-        logo_matches = util.glob_filter(logo_filter)
+        logo_matches = self.config.AssetIndex.find_files(item_asset_directory, "logo" if file_name == "poster" else f"{file_name}_logo")
         if len(logo_matches) > 0:
             logo = ImageData("asset_directory", os.path.abspath(logo_matches[0]), prefix=prefix, image_type="logo", is_url=False)
 
         if is_top_level and self.asset_folders and self.dimensional_asset_rename and (not poster or not background):
-            for file in util.glob_filter(os.path.join(item_asset_directory, "*.*")):
-                if file.lower().endswith((".png", ".jpg", ".jpeg", "webp")) and not re.match(r"s\d+e\d+|season\d+", os.path.basename(file).lower()):
-                    try:
-                        with Image.open(file) as image:
-                            _w, _h = image.size
-                        if not poster and _h >= _w:
-                            new_path = os.path.join(os.path.dirname(file), f"poster{os.path.splitext(file)[1].lower()}")
-                            os.rename(file, new_path)
-                            poster = ImageData("asset_directory", os.path.abspath(new_path), prefix=prefix, is_url=False)
-                        elif not background and _w > _h:
-                            new_path = os.path.join(os.path.dirname(file), f"background{os.path.splitext(file)[1].lower()}")
-                            os.rename(file, new_path)
-                            background = ImageData("asset_directory", os.path.abspath(new_path), prefix=prefix, image_type="background", is_url=False)
-                        if poster and background:
-                            break
-                    except OSError:
-                        logger.error(f"Asset Error: Failed to open image: {file}")
+            renamed = False
+            image_files = [f for f in self.config.AssetIndex.files(item_asset_directory)
+                           if f.lower().endswith((".png", ".jpg", ".jpeg", "webp")) and not re.match(r"s\d+e\d+|season\d+", os.path.basename(f).lower())]
+            known_dimensions = self.config.Cache.query_image_dimensions(image_files) if self.config.Cache and image_files else {}
+            new_dimensions = []
+            for file in image_files:
+                try:
+                    file_stat = os.stat(file)
+                    if file in known_dimensions and known_dimensions[file][:2] == (file_stat.st_size, file_stat.st_mtime_ns):
+                        _w, _h = known_dimensions[file][2:]
+                    else:
+                        dimensions = util.image_dimensions(file)
+                        if dimensions is None:
+                            logger.error(f"Asset Error: Failed to read image dimensions: {file}")
+                            continue
+                        _w, _h = dimensions
+                        new_dimensions.append((file, file_stat.st_size, file_stat.st_mtime_ns, _w, _h))
+                    if not poster and _h >= _w:
+                        new_path = os.path.join(os.path.dirname(file), f"poster{os.path.splitext(file)[1].lower()}")
+                        os.rename(file, new_path)
+                        renamed = True
+                        poster = ImageData("asset_directory", os.path.abspath(new_path), prefix=prefix, is_url=False)
+                    elif not background and _w > _h:
+                        new_path = os.path.join(os.path.dirname(file), f"background{os.path.splitext(file)[1].lower()}")
+                        os.rename(file, new_path)
+                        renamed = True
+                        background = ImageData("asset_directory", os.path.abspath(new_path), prefix=prefix, image_type="background", is_url=False)
+                    if poster and background:
+                        break
+                except (OSError, ValueError, IndexError, struct.error):
+                    logger.error(f"Asset Error: Failed to open image: {file}")
+            if new_dimensions and self.config.Cache:
+                self.config.Cache.update_image_dimensions(new_dimensions)
+            if renamed:
+                self.config.AssetIndex.invalidate(item_asset_directory)
 
         return poster, background, logo, item_asset_directory, folder_name
 
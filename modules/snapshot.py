@@ -0,0 +1,138 @@
+import os
+from datetime import datetime, timedelta
+from modules import builder, util
+from modules.util import Failed
+
+try:
+    import numpy as np
+except ModuleNotFoundError:
+    np = None
+
+logger = util.logger
+
+epoch = datetime(1970, 1, 1)
+date_columns = {"added": "addedAt", "release": "originallyAvailableAt", "last_played": "lastViewedAt"}
+number_columns = {
+    "year": "year", "duration": "duration", "audience_rating": "audienceRating", "critic_rating": "rating",
+    "user_rating": "userRating", "plays": "viewCount"
+}
+number_modifiers = ["", ".not", ".gt", ".gte", ".lt", ".lte"]
+date_modifiers = ["", ".not", ".before", ".after"]
+
+def available():
+    return np is not None
+
+def _seconds(value):
+    return (value - epoch).total_seconds()
+
+def _number(item, attribute):
+    value = item.__dict__.get(attribute)
+    if value is None:
+        return np.nan
+    if attribute == "duration":
+        return value / 60000 if value else 0
+    return value
+
+def _date(item, attribute):
+    value = item.__dict__.get(attribute)
+    return np.nan if value is None else _seconds(value)
+
+
+class LibrarySnapshot:
+    def __init__(self, item_type, items=None):
+        self.item_type = item_type
+        self.rows = {}
+        self.columns = {}
+        self.pending = {attr: [] for attr in list(number_columns) + list(date_columns)}
+        if items is not None:
+            for item in items:
+                self.add(item)
+            self.finish()
+
+    def add(self, item):
+        if item.TYPE != self.item_type or item.ratingKey in self.rows:
+            return
+        self.rows[item.ratingKey] = len(self.rows)
+        for attr, actual in number_columns.items():
+            self.pending[attr].append(_number(item, actual))
+        for attr, actual in date_columns.items():
+            self.pending[attr].append(_date(item, actual))
+
+    def finish(self):
+        for attr, values in self.pending.items():
+            self.columns[attr] = np.array(values, dtype=np.float64)
+        self.pending = {}
+        logger.debug(f"Built {self.item_type.capitalize()} Snapshot of {len(self.rows)} Items")
+        return self
+
+    def update(self, item):
+        if item.TYPE != self.item_type or item.ratingKey not in self.rows:
+            return
+        row = self.rows[item.ratingKey]
+        for attr, actual in number_columns.items():
+            self.columns[attr][row] = _number(item, actual)
+        for attr, actual in date_columns.items():
+            self.columns[attr][row] = _date(item, actual)
+
+    def filter_mask(self, rows, filter_attr, modifier, filter_data, current_time):
+        if filter_attr in date_columns and modifier in date_modifiers:
+            values = self.columns[filter_attr][rows]
+            if modifier in ["", ".not"]:
+                threshold = _seconds(current_time - timedelta(days=filter_data))
+                return values >= threshold if modifier == "" else values < threshold
+            try:
+                filter_date = _seconds(util.validate_date(filter_data))
+            except Failed:
+                return None
+            return values < filter_date if modifier == ".before" else values > filter_date
+        elif filter_attr in number_columns and modifier in number_modifiers:
+            values = self.columns[filter_attr][rows]
+            if filter_attr == "year" and modifier in ["", ".not"]:
+                found = np.isin(values, np.array(filter_data, dtype=np.float64))
+                return found if modifier == "" else ~found
+            if modifier == "":
+                return values == filter_data
+            elif modifier == ".not":
+                return ~np.isnan(values) & (values != filter_data)
+            elif modifier == ".gt":
+                return values > filter_data
+            elif modifier == ".gte":
+                return values >= filter_data
+            elif modifier == ".lt":
+                return values < filter_data
+            else:
+                return values <= filter_data
+        return None
+
+    def check_filters(self, items, filters, current_time):
+        rows = np.array([self.rows.get(getattr(item, "ratingKey", None), -1) for item in items], dtype=np.int64)
+        known = rows >= 0
+        if not known.any():
+            return {}
+        safe_rows = np.where(known, rows, 0)
+        passed = np.zeros(len(items), dtype=bool)
+        undecided = np.zeros(len(items), dtype=bool)
+        applicable = builder.filters[self.item_type] if self.item_type in builder.filters else []
+        for filter_list in filters:
+            list_mask = known.copy()
+            complete = True
+            for filter_method, filter_data in filter_list:
+                filter_attr, modifier = os.path.splitext(str(filter_method))
+                mask = self.filter_mask(safe_rows, filter_attr, modifier, filter_data, current_time) if filter_attr in applicable else None
+                if mask is None:
+                    complete = False
+                else:
+                    list_mask &= mask
+            if complete:
+                passed |= list_mask
+            else:
+                undecided |= list_mask
+        results = {}
+        for i, item in enumerate(items):
+            if not known[i]:
+                continue
+            if passed[i]:
+                results[item.ratingKey] = True
+            elif not undecided[i]:
+                results[item.ratingKey] = False
+        return results
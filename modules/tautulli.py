@@ -43,6 +43,8 @@ class Tautulli:
         if items is None:
             raise Failed("Tautulli Error: No Items found in the response")
 
+        eligible = [item["rating_key"] for item in items if (all_items or item["section_id"] == self.section_id) and int(item[stat_type]) >= data['list_minimum']]
+        self.library.batch_load(eligible[:int(data['list_size'])])
         rating_keys = []
         for item in items:
             if (all_items or item["section_id"] == self.section_id) and len(rating_keys) < int(data['list_size']):
@@ -0,0 +1,67 @@
+import threading, traceback
+from concurrent.futures import ThreadPoolExecutor
+from modules import util
+
+logger = util.logger
+
+server_limits = {}
+server_limits_lock = threading.Lock()
+
+def server_limit(url, limit):
+    with server_limits_lock:
+        if url not in server_limits:
+            server_limits[url] = threading.BoundedSemaphore(limit)
+        return server_limits[url]
+
+
+class UploadQueue:
+    def __init__(self, library, workers, limit):
+        self.library = library
+        self.workers = workers
+        self.limit = server_limit(library.url, limit)
+        self.executor = None
+        self.jobs = []
+        self.deferred = []
+
+    @property
+    def active(self):
+        return self.workers > 1
+
+    def submit(self, item, function, *args, reload=True, **kwargs):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        for pending_item, _, pending in self.jobs:
+            if pending_item.ratingKey == item.ratingKey:
+                pending.result()
+        self.jobs.append((item, reload, self.executor.submit(self._run, function, *args, **kwargs)))
+        while len(self.jobs) > self.workers * 4:
+            self._report(*self.jobs.pop(0))
+
+    def _run(self, function, *args, **kwargs):
+        messages = []
+        result = None
+        with self.limit:
+            try:
+                result = function(*args, messages=messages, **kwargs)
+            except Exception as e:
+                messages.append(("debug", traceback.format_exc()))
+                messages.append(("error", f"Upload Error: {e}"))
+        return messages, result
+
+    def _report(self, item, reload, future):
+        messages, result = future.result()
+        for level, message in messages:
+            getattr(logger, level)(message)
+        if reload and result and any(result):
+            self.deferred.append(item)
+
+    def flush(self):
+        while self.jobs:
+            self._report(*self.jobs.pop(0))
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        if self.deferred:
+            logger.debug(f"Reloading {len(self.deferred)} Items after Uploads")
+            self.library.batch_reload(self.deferred)
+            self.deferred = []
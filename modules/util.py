@@ -1,8 +1,9 @@
-import glob, os, re, signal, sys, time
+import bisect, glob, os, re, signal, sys, time
 from datetime import datetime, timedelta
 from modules.logs import MyLogger
 from num2words import num2words
 from pathvalidate import is_valid_filename, sanitize_filename
+from PIL import Image
 from plexapi.audio import Album, Track
 from plexapi.video import Season, Episode, Movie
 from requests.exceptions import HTTPError
@@ -137,12 +138,35 @@ def get_image_dicts(group, alias):
     return posters, backgrounds, logos
 
 def add_dict_list(keys, value, dict_map):
+    if not isinstance(dict_map, dict):
+        return dict_map.add(keys, value)
     for key in keys:
         if key in dict_map:
             dict_map[key].append(int(value))
         else:
             dict_map[key] = [int(value)]
 
+def longest_increasing_subsequence(values):
+    tails = []
+    tail_indexes = []
+    previous = [-1] * len(values)
+    for i, value in enumerate(values):
+        pos = bisect.bisect_left(tails, value)
+        if pos > 0:
+            previous[i] = tail_indexes[pos - 1]
+        if pos == len(tails):
+            tails.append(value)
+            tail_indexes.append(i)
+        else:
+            tails[pos] = value
+            tail_indexes[pos] = i
+    indexes = []
+    i = tail_indexes[-1] if tail_indexes else -1
+    while i >= 0:
+        indexes.append(i)
+        i = previous[i]
+    return indexes[::-1]
+
 def get_list_bar_then_comma(data, lower=False, upper=False, split=True, int_list=False, trim=True, return_none=True):
     if split is True:               split = "|"
     if data is None:                return None if return_none else []
@@ -314,6 +338,48 @@ def is_locked(filepath):
                 file_object.close()
     return locked
 
+def image_dimensions(filepath):
+    with open(filepath, "rb") as f:
+        header = f.read(30)
+        if header[:8] == b"\x89PNG\r\n\x1a\n":
+            if len(header) < 24 or header[12:16] != b"IHDR":
+                return None
+            return int.from_bytes(header[16:20], "big"), int.from_bytes(header[20:24], "big")
+        elif header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+            if len(header) < 30:
+                return None
+            if header[12:16] == b"VP8 ":
+                return int.from_bytes(header[26:28], "little") & 0x3FFF, int.from_bytes(header[28:30], "little") & 0x3FFF
+            elif header[12:16] == b"VP8L":
+                bits = int.from_bytes(header[21:25], "little")
+                return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+            elif header[12:16] == b"VP8X":
+                return int.from_bytes(header[24:27], "little") + 1, int.from_bytes(header[27:30], "little") + 1
+        elif header[:2] == b"\xff\xd8":
+            f.seek(2)
+            while True:
+                marker = f.read(2)
+                if len(marker) < 2 or marker[0] != 0xFF:
+                    return None
+                while marker[1] == 0xFF:
+                    fill = f.read(1)
+                    if not fill:
+                        return None
+                    marker = marker[1:] + fill
+                if marker[1] in [0x01] or 0xD0 <= marker[1] <= 0xD9:
+                    continue
+                length = int.from_bytes(f.read(2), "big")
+                if length < 2:
+                    return None
+                if 0xC0 <= marker[1] <= 0xCF and marker[1] not in [0xC4, 0xC8, 0xCC]:
+                    segment = f.read(5)
+                    if len(segment) < 5:
+                        return None
+                    return int.from_bytes(segment[3:5], "big"), int.from_bytes(segment[1:3], "big")
+                f.seek(length - 2, 1)
+    with Image.open(filepath) as image:
+        return image.size
+
 def time_window(tw):
     today = datetime.now()
     if tw == "today":
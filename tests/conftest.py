@@ -0,0 +1,19 @@
+import os, sys
+from unittest.mock import MagicMock
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import builder, util # noqa
+
+mock_logger = MagicMock()
+util.logger = mock_logger
+for name, module in list(sys.modules.items()):
+    if name.startswith("modules.") and hasattr(module, "logger"):
+        module.logger = mock_logger
+
+
+@pytest.fixture
+def logger():
+    mock_logger.reset_mock()
+    return mock_logger
@@ -0,0 +1,115 @@
+import os, shutil
+from modules import util
+from modules.assets import AssetIndex
+
+
+class FakeCache:
+    def __init__(self):
+        self.saved = {}
+
+    def query_asset_index(self):
+        return dict(self.saved)
+
+    def update_asset_index(self, changed, removed=None):
+        for directory in removed or []:
+            del self.saved[directory]
+        self.saved.update(changed)
+
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "wb").close()
+
+
+def build_tree(root):
+    for path in [
+        "Movie A (2000)/poster.jpg", "Movie A (2000)/background.png", "Movie A (2000)/poster.backup.jpg",
+        "Movie A (2000)/Season01.jpg", "Movie A (2000)/S01E01.webp", "Movie A (2000)/.poster.jpg",
+        "Movie [B]/poster.png", "Movie [B]/logo.png",
+        "Studio/Movie C/poster.jpg", "Studio/Nested/Movie D/poster.jpg", ".hidden/Movie E/poster.jpg",
+        "Movie F.jpg", "Movie F_background.jpg", "Movie F.old.png"
+    ]:
+        touch(os.path.join(root, path))
+
+
+def naive_folder(asset_directory, folder_name, depth):
+    if os.path.isdir(os.path.join(asset_directory, folder_name)):
+        return os.path.join(asset_directory, folder_name)
+    for n in range(1, depth + 1):
+        matches = util.glob_filter(os.path.join(asset_directory, *(["*"] * n), folder_name))
+        if matches:
+            return os.path.abspath(matches[0])
+    return None
+
+
+def test_find_folder_matches_glob(tmp_path):
+    root = str(tmp_path)
+    build_tree(root)
+    index = AssetIndex()
+    for depth in range(3):
+        for name in ["Movie A (2000)", "Movie [B]", "Movie C", "Movie D", "Movie E", "Missing"]:
+            assert index.find_folder(root, name, depth) == naive_folder(root, name, depth), (name, depth)
+
+
+def test_find_files_matches_glob(tmp_path):
+    root = str(tmp_path)
+    build_tree(root)
+    index = AssetIndex()
+    for directory in [root, os.path.join(root, "Movie A (2000)"), os.path.join(root, "Movie [B]")]:
+        for prefix in ["poster", "background", "logo", "Season01", "S01E01", "Movie F", "Movie F_background", "poster.backup", "missing"]:
+            assert sorted(index.find_files(directory, prefix)) == sorted(util.glob_filter(os.path.join(directory, f"{prefix}.*"))), (directory, prefix)
+
+
+def test_missing_directory(tmp_path):
+    index = AssetIndex()
+    missing = os.path.join(str(tmp_path), "missing")
+    assert index.find_folder(missing, "Movie", 2) is None
+    assert index.find_files(missing, "poster") == []
+    assert index.files(missing) == []
+
+
+def test_invalidate_and_persist(tmp_path):
+    root = str(tmp_path)
+    build_tree(root)
+    movie = os.path.join(root, "Movie [B]")
+    cache = FakeCache()
+    index = AssetIndex(cache)
+    assert len(index.find_files(movie, "poster")) == 1
+    index.save()
+    assert movie in cache.saved
+
+    reloaded = AssetIndex(cache)
+    assert reloaded.find_files(movie, "logo") == [os.path.join(movie, "logo.png")]
+    assert reloaded.changed == {}
+
+    touch(os.path.join(movie, "background.jpg"))
+    reloaded.invalidate(movie)
+    os.utime(movie, ns=(0, 0))
+    assert reloaded.find_files(movie, "background") == [os.path.join(movie, "background.jpg")]
+    assert movie in reloaded.changed
+
+
+def test_prune_unseen_and_missing(tmp_path):
+    root = str(tmp_path)
+    build_tree(root)
+    movie_a = os.path.join(root, "Movie A (2000)")
+    movie_b = os.path.join(root, "Movie [B]")
+    studio = os.path.join(root, "Studio")
+    cache = FakeCache()
+    index = AssetIndex(cache)
+    for directory in [root, movie_a, movie_b, studio]:
+        index.files(directory)
+    index.save(prune=True)
+    assert set(cache.saved) == {root, movie_a, movie_b, studio}
+
+    shutil.rmtree(movie_b)
+    next_run = AssetIndex(cache)
+    next_run.files(root)
+    next_run.files(movie_a)
+    next_run.files(movie_b)
+    next_run.save()
+    assert set(cache.saved) == {root, movie_a, movie_b, studio}
+    next_run.save(prune=True)
+    assert set(cache.saved) == {root, movie_a}
+    next_run.save(prune=True)
+    assert set(cache.saved) == {root, movie_a}
@@ -0,0 +1,79 @@
+import threading, time
+from modules import convert
+from modules.convert import Convert
+from modules.util import Failed
+
+
+class FakeTMDb:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def _call(self, value):
+        with self.lock:
+            self.calls.append((time.monotonic(), value))
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+
+    def convert_imdb_to(self, imdb_id):
+        self._call(imdb_id)
+        number = int(imdb_id[2:])
+        if number % 5 == 0:
+            raise Failed(f"No TMDb ID for {imdb_id}")
+        return number * 10, "movie" if number % 2 else "show"
+
+    def convert_from(self, tmdb_id, convert_to, is_movie):
+        self._call(tmdb_id)
+        if tmdb_id % 7 == 0:
+            raise Failed(f"No TVDb ID for {tmdb_id}")
+        return tmdb_id + 1
+
+
+def test_batches_match_single_lookups(tmp_path, monkeypatch):
+    monkeypatch.setattr(convert, "lookup_rate", 1000)
+    imdb_ids = [f"tt{i:07d}" for i in range(1, 40)] + ["tt0000003"]
+    tmdb_ids = list(range(1, 40))
+    batch_convert = Convert(None, None, FakeTMDb(), str(tmp_path))
+    single_convert = Convert(None, None, FakeTMDb(), str(tmp_path))
+    imdb_batch = batch_convert.imdb_to_tmdb_batch(imdb_ids, workers=4)
+    tvdb_batch = batch_convert.tmdb_to_tvdb_batch(tmdb_ids, workers=4)
+    for imdb_id in imdb_ids:
+        assert batch_convert.imdb_to_tmdb(imdb_id, batch=imdb_batch) == single_convert.imdb_to_tmdb(imdb_id)
+    for tmdb_id in tmdb_ids:
+        assert batch_convert.tmdb_to_tvdb(tmdb_id, batch=tvdb_batch) == single_convert.tmdb_to_tvdb(tmdb_id)
+
+
+def test_batch_lookups_are_limited(tmp_path, monkeypatch):
+    monkeypatch.setattr(convert, "lookup_limit", 3)
+    monkeypatch.setattr(convert, "lookup_rate", 100)
+    tmdb = FakeTMDb(delay=0.02)
+    converter = Convert(None, None, tmdb, str(tmp_path))
+    converter._lookup_slots = threading.BoundedSemaphore(3)
+    converter.imdb_to_tmdb_batch([f"tt{i:07d}" for i in range(1, 41)], workers=16)
+    assert len(tmdb.calls) == 40
+    assert tmdb.peak <= 3
+    starts = sorted(t for t, _ in tmdb.calls)
+    assert starts[-1] - starts[0] >= 39 / 100 * 0.9
+
+
+def test_single_lookups_share_the_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(convert, "lookup_rate", 100)
+    tmdb = FakeTMDb(delay=0.02)
+    converter = Convert(None, None, tmdb, str(tmp_path))
+    converter._lookup_slots = threading.BoundedSemaphore(3)
+    threads = [threading.Thread(target=converter.tmdb_to_tvdb, args=(i,)) for i in range(1, 21)]
+    threads += [threading.Thread(target=converter.imdb_to_tmdb, args=(f"tt{i:07d}",)) for i in range(1, 21)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(tmdb.calls) == 40
+    assert tmdb.peak <= 3
+    starts = sorted(t for t, _ in tmdb.calls)
+    assert starts[-1] - starts[0] >= 39 / 100 * 0.9
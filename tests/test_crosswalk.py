@@ -0,0 +1,167 @@
+import os, random, struct, time
+from types import SimpleNamespace
+import pytest
+from modules import crosswalk
+from modules.convert import Convert
+from modules.crosswalk import Crosswalk
+
+
+class FakeCache:
+    expiration = 60
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def query_crosswalk_rows(self):
+        return self.rows
+
+
+def fake_anime():
+    return SimpleNamespace(_anidb_to_imdb={1: ["tt0900001"], 2: ["tt0900002", "tt0900003"]},
+                           _anidb_to_tmdb_movie={1: [9001], 2: [9002]},
+                           _anidb_to_tvdb={3: 8003, 4: 8004}, _anidb_to_tmdb_show={3: [7003], 4: [7004, 7005]})
+
+
+def random_rows(seed):
+    rng = random.Random(seed)
+    rows = {"imdb_to_tmdb": [], "imdb_to_tvdb": [], "tmdb_to_tvdb": [], "tmdb_movie": [], "tmdb_show": []}
+    for _ in range(400):
+        imdb_id = f"tt{rng.randrange(1, 10 ** rng.randrange(1, 9)):07d}"
+        rows["imdb_to_tmdb"].append((imdb_id, rng.randrange(1, 10 ** 6), rng.choice(["movie", "show", "episode"])))
+        rows["imdb_to_tvdb"].append((imdb_id, rng.choice([rng.randrange(1, 10 ** 6), "bad"])))
+        rows["tmdb_to_tvdb"].append((rng.randrange(1, 10 ** 6), rng.randrange(1, 10 ** 6)))
+    rows["tmdb_movie"].append((5, "tt999999905"))
+    rows["tmdb_show"].append((6, "tt999999906", 66))
+    rows["imdb_to_tmdb"].append(("not an id", 1, "movie"))
+    return rows
+
+
+def naive(rows, anime):
+    expected = {section: {} for section in crosswalk.sections}
+
+    def add(section, key, value):
+        if crosswalk._encode(section, key) is not None and str(value).isdigit() and int(value) and key not in expected[section]:
+            expected[section][key] = int(value)
+
+    for imdb_id, tmdb_id, media_type in rows["imdb_to_tmdb"]:
+        if media_type in ["movie", "show"]:
+            add(f"imdb_tmdb_{media_type}", imdb_id, tmdb_id)
+    for imdb_id, tvdb_id in rows["imdb_to_tvdb"]:
+        add("imdb_tvdb", imdb_id, tvdb_id)
+    for tmdb_id, tvdb_id in rows["tmdb_to_tvdb"]:
+        add("tmdb_tvdb", tmdb_id, tvdb_id)
+        add("tvdb_tmdb", tvdb_id, tmdb_id)
+    for tmdb_id, imdb_id in rows["tmdb_movie"]:
+        add("imdb_tmdb_movie", imdb_id, tmdb_id)
+    for tmdb_id, imdb_id, tvdb_id in rows["tmdb_show"]:
+        add("imdb_tmdb_show", imdb_id, tmdb_id)
+        add("tmdb_tvdb", tmdb_id, tvdb_id)
+        add("tvdb_tmdb", tvdb_id, tmdb_id)
+    for anidb_id, imdb_ids in anime._anidb_to_imdb.items():
+        tmdb_ids = anime._anidb_to_tmdb_movie.get(anidb_id, [])
+        if len(imdb_ids) == 1 and len(tmdb_ids) == 1:
+            add("imdb_tmdb_movie", imdb_ids[0], tmdb_ids[0])
+    for anidb_id, tvdb_id in anime._anidb_to_tvdb.items():
+        tmdb_ids = anime._anidb_to_tmdb_show.get(anidb_id, [])
+        if len(tmdb_ids) == 1:
+            add("tmdb_tvdb", tmdb_ids[0], tvdb_id)
+            add("tvdb_tmdb", tvdb_id, tmdb_ids[0])
+    return expected
+
+
+def build(tmp_path, rows, anime=None, expiration=None):
+    path = os.path.join(str(tmp_path), "id_index.bin")
+    Crosswalk(path).build(FakeCache(rows), anime)
+    return Crosswalk(path, expiration)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_round_trip_matches_dicts(tmp_path, seed):
+    rows = random_rows(seed)
+    anime = fake_anime()
+    index = build(tmp_path, rows, anime)
+    expected = naive(rows, anime)
+    for section, pairs in expected.items():
+        for key, value in pairs.items():
+            assert index.get(section, key) == value
+        assert len(index._open()[section][0]) == len(pairs)
+    assert index.get("imdb_tmdb_movie", "tt0900001") == 9001
+    assert index.get("imdb_tmdb_movie", "tt0900002") is None
+    assert index.get("tvdb_tmdb", 8003) == 7003
+    assert index.get("tvdb_tmdb", 8004) is None
+    assert index.imdb_to_tmdb("tt999999905") == (5, "movie")
+    assert index.imdb_to_tmdb("tt999999906") == (6, "show")
+    index.close()
+
+
+def test_bisect_edges(tmp_path):
+    rows = {"imdb_to_tmdb": [], "imdb_to_tvdb": [], "tmdb_movie": [], "tmdb_show": [],
+            "tmdb_to_tvdb": [(10, 100), (20, 200), (30, 300)]}
+    index = build(tmp_path, rows)
+    assert [index.get("tmdb_tvdb", k) for k in [9, 10, 15, 20, 30, 31, "20", "x", None, 2 ** 62]] == [None, 100, None, 200, 300, None, 200, None, None, None]
+    assert index.get("imdb_tvdb", "tt0000001") is None
+    assert index.get("imdb_tmdb_movie", "tt1") is None
+
+
+def test_empty_and_missing(tmp_path):
+    empty = build(tmp_path, {k: [] for k in ["imdb_to_tmdb", "imdb_to_tvdb", "tmdb_to_tvdb", "tmdb_movie", "tmdb_show"]})
+    assert empty.get("tmdb_tvdb", 1) is None
+    missing = Crosswalk(os.path.join(str(tmp_path), "missing.bin"))
+    assert missing.get("tmdb_tvdb", 1) is None
+    assert missing.imdb_to_tmdb("tt0000001") is None
+
+
+def test_corrupt_and_truncated(tmp_path, logger):
+    rows = random_rows(5)
+    path = build(tmp_path, rows).path
+    data = open(path, "rb").read()
+    for bad in [b"KMTXW01\n" + data[8:], b"garbage" * 3, data[:len(crosswalk.magic) + 4], data[:len(crosswalk.magic) + 20], data[:-8], data[:-3]]:
+        with open(path, "wb") as handle:
+            handle.write(bad)
+        index = Crosswalk(path)
+        assert index.get("tmdb_tvdb", rows["tmdb_to_tvdb"][0][0]) is None
+        assert index.handle is None and index.map is None
+    assert logger.error.called
+
+
+def test_expired_index_is_ignored(tmp_path, logger):
+    rows = random_rows(6)
+    index = build(tmp_path, rows, expiration=30)
+    tmdb_id, tvdb_id = rows["tmdb_to_tvdb"][0]
+    assert index.get("tmdb_tvdb", tmdb_id) == tvdb_id
+    index.close()
+    with open(index.path, "r+b") as handle:
+        handle.seek(len(crosswalk.magic))
+        handle.write(struct.pack("=d", time.time() - 31 * 86400))
+    assert Crosswalk(index.path, 30).get("tmdb_tvdb", tmdb_id) is None
+    assert logger.warning.called
+    assert Crosswalk(index.path, 60).get("tmdb_tvdb", tmdb_id) == tvdb_id
+
+
+class OnlineTMDb:
+    def __init__(self, answers):
+        self.answers = answers
+        self.calls = []
+
+    def convert_imdb_to(self, imdb_id):
+        from modules.util import Failed
+        self.calls.append(imdb_id)
+        if imdb_id not in self.answers:
+            raise Failed("not found")
+        return self.answers[imdb_id]
+
+
+def test_crosswalk_answers_before_tmdb(tmp_path):
+    rows = {"imdb_to_tmdb": [("tt0000001", 111, "movie"), ("tt0000002", 222, "movie")], "imdb_to_tvdb": [], "tmdb_to_tvdb": [], "tmdb_movie": [], "tmdb_show": []}
+    build(tmp_path, rows)
+    tmdb = OnlineTMDb({"tt0000001": (999, "movie"), "tt0000004": (444, "movie")})
+    converter = Convert(None, None, tmdb, str(tmp_path))
+    assert converter.imdb_to_tmdb("tt0000001") == (111, "movie")
+    assert converter.imdb_to_tmdb("tt0000002") == (222, "movie")
+    assert tmdb.calls == []
+    assert converter.imdb_to_tmdb("tt0000003") == (None, None)
+    assert converter.imdb_to_tmdb("tt0000004") == (444, "movie")
+    assert tmdb.calls == ["tt0000003", "tt0000004"]
+    batch = converter.imdb_to_tmdb_batch(["tt0000001", "tt0000002", "tt0000003", "tt0000004"])
+    assert batch == {"tt0000001": (111, "movie"), "tt0000002": (222, "movie"), "tt0000003": (None, None), "tt0000004": (444, "movie")}
+    assert tmdb.calls == ["tt0000003", "tt0000004", "tt0000003", "tt0000004"]
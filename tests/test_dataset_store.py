@@ -0,0 +1,174 @@
+import os, threading, time
+from array import array
+from modules.datasets import DatasetIndex, DatasetStore
+
+url = "https://datasets.example/title.ratings.tsv.gz"
+
+
+class FakeResponse:
+    def __init__(self, modified):
+        self.headers = {"Last-Modified": modified} if modified else {}
+
+
+class FakeRequests:
+    def __init__(self, modified="Wed, 01 May 2024 00:00:00 GMT"):
+        self.modified = modified
+        self.heads = 0
+        self.session = self
+
+    def head(self, url, allow_redirects=True):
+        self.heads += 1
+        return FakeResponse(self.modified)
+
+
+class Builder:
+    def __init__(self, value=1.0, delay=0.0):
+        self.value = value
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return array("q", [3, 1, 2]), [array("f", [self.value] * 3)]
+
+
+def age_index(path, hours):
+    index = DatasetIndex(path, ["f"])
+    assert index.load()
+    index.set(array("q", index.keys), [array("f", index.columns[0])], created=time.time() - hours * 3600, source=index.source)
+    assert index.save(reload=False)
+    if os.path.exists(f"{path}.checked"):
+        os.remove(f"{path}.checked")
+
+
+def test_reuses_current_index(tmp_path):
+    build = Builder()
+    store = DatasetStore(FakeRequests(), str(tmp_path), 24)
+    first = store.get("ratings", ["f"], url, build)
+    assert first.find(2) == 1
+    assert DatasetStore(FakeRequests(), str(tmp_path), 24).get("ratings", ["f"], url, build).find(3) == 2
+    assert build.calls == 1
+
+
+def test_refresh_zero_rebuilds_every_run(tmp_path):
+    build = Builder()
+    requests = FakeRequests()
+    DatasetStore(requests, str(tmp_path), 0).get("ratings", ["f"], url, build)
+    DatasetStore(requests, str(tmp_path), 0).get("ratings", ["f"], url, build)
+    assert build.calls == 2
+    assert requests.heads == 2
+
+
+def test_unchanged_source_is_marked_checked(tmp_path):
+    build = Builder()
+    requests = FakeRequests()
+    store = DatasetStore(requests, str(tmp_path), 24)
+    path = store.get("ratings", ["f"], url, build).path
+    store.indexes["ratings"].close()
+    before = open(path, "rb").read()
+    age_index(path, 48)
+    aged = open(path, "rb").read()
+    assert aged != before
+    index = DatasetStore(requests, str(tmp_path), 24).get("ratings", ["f"], url, build)
+    assert build.calls == 1
+    assert index.age() < 60
+    assert open(path, "rb").read() == aged
+    assert os.path.exists(f"{path}.checked")
+    requests.heads = 0
+    DatasetStore(requests, str(tmp_path), 24).get("ratings", ["f"], url, build)
+    assert requests.heads == 0 and build.calls == 1
+
+
+def test_changed_source_rebuilds(tmp_path):
+    build = Builder()
+    store = DatasetStore(FakeRequests(), str(tmp_path), 24)
+    path = store.get("ratings", ["f"], url, build).path
+    store.indexes["ratings"].close()
+    age_index(path, 48)
+    newer = FakeRequests("Wed, 01 Jan 2031 00:00:00 GMT")
+    DatasetStore(newer, str(tmp_path), 24).get("ratings", ["f"], url, Builder(2.0))
+    loaded = DatasetIndex(path, ["f"])
+    assert loaded.load() and loaded.columns[0][0] == 2.0
+    loaded.close()
+
+
+def test_background_refresh_swaps_index(tmp_path):
+    store = DatasetStore(FakeRequests(), str(tmp_path), 24)
+    path = store.get("ratings", ["f"], url, Builder(1.0)).path
+    store.indexes["ratings"].close()
+    age_index(path, 48)
+    background = DatasetStore(FakeRequests("Wed, 01 Jan 2031 00:00:00 GMT"), str(tmp_path), 24, background=True)
+    stale = background.get("ratings", ["f"], url, Builder(2.0, delay=0.1))
+    assert stale.columns[0][0] == 1.0
+    for _ in range(100):
+        if background.indexes["ratings"] is not stale and background.indexes["ratings"].map is not None:
+            break
+        time.sleep(0.05)
+    fresh = background.indexes["ratings"]
+    assert fresh.columns[0][0] == 2.0 and fresh.map is not None
+    assert stale.map is None
+    assert not os.path.exists(f"{path}.lock")
+
+
+def test_other_datasets_are_not_blocked(tmp_path):
+    store = DatasetStore(FakeRequests(), str(tmp_path), 24)
+    slow = Builder(delay=0.5)
+    thread = threading.Thread(target=store.get, args=("genres", ["f"], url, slow))
+    thread.start()
+    time.sleep(0.1)
+    start = time.time()
+    store.get("ratings", ["f"], url, Builder())
+    assert time.time() - start < 0.4
+    thread.join()
+    assert slow.calls == 1
+
+
+def test_readers_keep_swapped_index_open(tmp_path):
+    store = DatasetStore(FakeRequests(), str(tmp_path), 24)
+    path = store.get("ratings", ["f"], url, Builder(1.0)).path
+    store.indexes["ratings"].close()
+    age_index(path, 48)
+    background = DatasetStore(FakeRequests("Wed, 01 Jan 2031 00:00:00 GMT"), str(tmp_path), 24, background=True)
+    with background.reading("ratings", ["f"], url, Builder(2.0, delay=0.1)) as stale:
+        for _ in range(100):
+            if background.indexes["ratings"] is not stale and background.indexes["ratings"].map is not None:
+                break
+            time.sleep(0.05)
+        assert background.indexes["ratings"] is not stale
+        assert stale.map is not None and stale.retired
+        assert stale.find(2) == 1 and stale.columns[0][stale.find(2)] == 1.0
+    assert stale.map is None
+    with background.reading("ratings", ["f"], url, Builder(3.0)) as fresh:
+        assert fresh.columns[0][fresh.find(2)] == 2.0
+
+
+def test_concurrent_reads_during_swaps(tmp_path):
+    store = DatasetStore(FakeRequests(), str(tmp_path), 24)
+    store.get("ratings", ["f"], url, Builder(1.0))
+    errors = []
+    stop = threading.Event()
+
+    def read():
+        while not stop.is_set():
+            try:
+                with store.reading("ratings", ["f"], url, Builder()) as index:
+                    found = index.find(2)
+                    time.sleep(0.001)
+                    if found is None or index.columns[0][found] not in (1.0, 2.0):
+                        errors.append(found)
+            except Exception as e:
+                errors.append(e)
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for i in range(20):
+        index = DatasetIndex(store.path("ratings"), ["f"])
+        assert index.load()
+        store._swap("ratings", index)
+        time.sleep(0.005)
+    stop.set()
+    for reader in readers:
+        reader.join()
+    assert errors == []
@@ -0,0 +1,102 @@
+import os, random
+from array import array
+import pytest
+from modules import datasets
+from modules.datasets import DatasetIndex, episode_key
+from modules.idmap import encode_imdb
+
+
+def random_index(tmp_path, seed, count=2000):
+    rng = random.Random(seed)
+    rows = {}
+    while len(rows) < count:
+        imdb_id = f"tt{rng.randrange(1, 10 ** rng.randrange(1, 10)):07d}"
+        rows[imdb_id] = (round(rng.uniform(1, 10), 1), rng.getrandbits(64))
+    index = DatasetIndex(os.path.join(str(tmp_path), "data.bin"), ["f", "Q"])
+    keys = array("q", [encode_imdb(k) for k in rows])
+    index.set(keys, [array("f", [v[0] for v in rows.values()]), array("Q", [v[1] for v in rows.values()])], vocab=["Drama", "Comedy", "Sci-Fi"], source=1700000000.0)
+    return index, rows
+
+
+def lookup(index, imdb_id):
+    found = index.find(encode_imdb(imdb_id))
+    return None if found is None else (round(index.columns[0][found], 1), index.columns[1][found])
+
+
+@pytest.mark.parametrize("imdb_ids", [
+    ["tt0000001", "tt0000010", "tt0000100", "tt1", "tt10", "tt0111161", "tt01111610", "tt12345678", "tt999999999999"],
+])
+def test_encode_imdb_is_unique(imdb_ids):
+    keys = [encode_imdb(i) for i in imdb_ids]
+    assert len(set(keys)) == len(keys)
+
+
+@pytest.mark.parametrize("imdb_id", ["", "tt", "0111161", "nm0111161", "tt0111161x", "tt1234567890123456", None, 111161])
+def test_encode_imdb_invalid(imdb_id):
+    assert encode_imdb(imdb_id) is None
+
+
+def test_episode_key():
+    assert episode_key("tt0903747", 1, 2) != episode_key("tt0903747", 2, 1)
+    assert episode_key("tt0903747", "1", "2") == episode_key("tt0903747", 1, 2)
+    assert episode_key("tt0903747", 0, 0) is not None
+    assert episode_key("tt0903747", 4096, 1) is None
+    assert episode_key("tt0903747", 1, 131072) is None
+    assert episode_key("tt0903747", "\\N", 1) is None
+    assert episode_key("bad", 1, 1) is None
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_round_trip_matches_dict(tmp_path, seed):
+    index, rows = random_index(tmp_path, seed)
+    for imdb_id, value in rows.items():
+        assert lookup(index, imdb_id) == value
+    assert index.save()
+    loaded = DatasetIndex(index.path, ["f", "Q"])
+    assert loaded.load()
+    assert len(loaded) == len(rows)
+    assert loaded.vocab == ["Drama", "Comedy", "Sci-Fi"]
+    assert loaded.source == 1700000000.0
+    assert loaded.created == pytest.approx(index.created)
+    for imdb_id, value in rows.items():
+        assert lookup(loaded, imdb_id) == value
+    assert list(loaded.keys) == sorted(loaded.keys)
+    loaded.close()
+    index.close()
+
+
+def test_find_edges(tmp_path):
+    index = DatasetIndex(os.path.join(str(tmp_path), "edges.bin"), ["f"])
+    assert index.find(5) is None
+    index.set(array("q", [30, 10, 20]), [array("f", [3.0, 1.0, 2.0])])
+    assert [index.find(k) for k in [None, 5, 10, 15, 20, 30, 35]] == [None, None, 0, None, 1, 2, None]
+    assert list(index.columns[0]) == [1.0, 2.0, 3.0]
+    assert index.save() and index.load()
+    assert [index.find(k) for k in [None, 5, 10, 15, 20, 30, 35]] == [None, None, 0, None, 1, 2, None]
+    index.close()
+
+
+def test_empty_index(tmp_path):
+    index = DatasetIndex(os.path.join(str(tmp_path), "empty.bin"), ["f"])
+    index.set(array("q"), [array("f")])
+    assert index.save() and index.load()
+    assert len(index) == 0 and index.find(1) is None and index.vocab == []
+    index.close()
+
+
+def test_corrupt_and_truncated(tmp_path):
+    index, rows = random_index(tmp_path, 7, count=50)
+    assert index.save()
+    index.close()
+    data = open(index.path, "rb").read()
+    header_end = len(datasets.magic) + datasets.header.size
+    for bad in [b"", b"KMTDS01\n" + data[8:], data[:len(datasets.magic) + 3], data[:header_end], data[:header_end + 40], data[:-1], data[:-9], b"\0" * len(data)]:
+        with open(index.path, "wb") as handle:
+            handle.write(bad)
+        loaded = DatasetIndex(index.path, ["f", "Q"])
+        assert loaded.load() is False
+        assert len(loaded) == 0 and loaded.handle is None and loaded.map is None
+
+
+def test_missing_file(tmp_path):
+    assert DatasetIndex(os.path.join(str(tmp_path), "missing.bin"), ["f"]).load() is False
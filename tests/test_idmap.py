@@ -0,0 +1,101 @@
+import random, time
+import pytest
+from modules import idmap
+
+
+@pytest.mark.parametrize("imdb_id", ["tt0000001", "tt1", "tt0111161", "tt12345678", "tt000000000000001", "tt999999999999999"])
+def test_imdb_round_trip(imdb_id):
+    assert idmap.decode_imdb(idmap.encode_imdb(imdb_id)) == imdb_id
+
+
+@pytest.mark.parametrize("key", ["0111161", "tt", "ttabc", "tt0111161a", "nm0000001", "tt1234567890123456", None, 111161])
+def test_imdb_invalid(key):
+    assert idmap.encode_imdb(key) is None
+
+
+def test_encode_int():
+    assert idmap.encode_int(5) == 5
+    assert idmap.encode_int(True) is None
+    assert idmap.encode_int("5") is None
+
+
+def test_compact_map_matches_dict():
+    rng = random.Random(1)
+    compact = idmap.CompactMap()
+    naive = {}
+    for step in range(6000):
+        key = rng.choice([rng.randrange(3000), f"key{rng.randrange(50)}", rng.randrange(-5, 5)])
+        value = rng.choice([rng.randrange(10 ** 9), "text", 0, -1, 2 ** 62])
+        compact[key] = value
+        naive[key] = value
+        probe = rng.choice([rng.randrange(-10, 3100), f"key{rng.randrange(60)}", None])
+        assert (probe in compact) == (probe in naive)
+        assert compact.get(probe, "missing") == naive.get(probe, "missing")
+    assert len(compact) == len(naive)
+    assert sorted(compact.items(), key=str) == sorted(naive.items(), key=str)
+    compact.compact()
+    assert compact.pending == {}
+    assert {k: compact[k] for k in naive} == naive
+    with pytest.raises(KeyError):
+        compact[10 ** 6]
+
+
+def test_compact_map_imdb_values():
+    compact = idmap.CompactMap(idmap.encode_imdb, idmap.decode_imdb)
+    compact[1] = "tt0111161"
+    compact[2] = "not an id"
+    compact[1] = "tt0068646"
+    compact[2] = "tt0000002"
+    compact.compact()
+    compact[3] = "also not an id"
+    assert dict(compact.items()) == {1: "tt0068646", 2: "tt0000002", 3: "also not an id"}
+    assert len(compact) == 3
+
+
+def test_compact_multi_map_matches_dict():
+    rng = random.Random(2)
+    compact = idmap.CompactMultiMap(idmap.encode_imdb, idmap.decode_imdb)
+    naive = {}
+    for step in range(6000):
+        keys = [rng.choice([f"tt{rng.randrange(1, 2000):07d}", f"tt{rng.randrange(1, 50)}", "bad", None]) for _ in range(rng.randrange(1, 3))]
+        value = rng.randrange(10 ** 6)
+        compact.add(keys, value)
+        for key in keys:
+            naive.setdefault(key, []).append(value)
+        probe = rng.choice([f"tt{rng.randrange(1, 2100):07d}", "bad", "tt", None])
+        assert (probe in compact) == (probe in naive)
+        assert compact.get(probe) == naive.get(probe)
+    assert len(compact) == len(naive)
+    assert dict(compact.items()) == naive
+
+
+def test_add_dict_list_dispatch():
+    from modules import util
+    compact = idmap.CompactMultiMap()
+    naive = {}
+    for keys, value in [([1, 2], 10), ([2], 11), (["x"], 12), ([1], "13")]:
+        util.add_dict_list(keys, value, compact)
+        util.add_dict_list(keys, value, naive)
+    assert dict(compact.items()) == naive
+
+
+def interleaved(count):
+    rating_keys = idmap.CompactMap()
+    ids = idmap.CompactMultiMap()
+    start = time.perf_counter()
+    for key in range(count, 0, -1):
+        assert key not in rating_keys
+        rating_keys[key] = key * 7
+        assert rating_keys[key] == key * 7
+        ids.add([key * 3], key)
+        assert ids[key * 3] == [key]
+    elapsed = time.perf_counter() - start
+    assert len(rating_keys) == count
+    assert len(ids) == count
+    return elapsed
+
+
+def test_interleaved_inserts_stay_linear():
+    small = min(interleaved(10000) for _ in range(3))
+    large = min(interleaved(80000) for _ in range(3))
+    assert large < small * 8 * 3
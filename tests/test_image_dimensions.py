@@ -0,0 +1,69 @@
+import io
+import pytest
+from PIL import Image
+from modules import util
+
+
+def write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def encode(size, image_format, **kwargs):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (200, 30, 30)).save(buffer, image_format, **kwargs)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("size", [(1, 1), (300, 450), (1920, 1080), (1000, 1500)])
+@pytest.mark.parametrize("image_format, kwargs", [
+    ("PNG", {}), ("JPEG", {}), ("JPEG", {"progressive": True}), ("JPEG", {"exif": b"Exif\x00\x00" + b"\x00" * 64}),
+    ("WEBP", {}), ("WEBP", {"lossless": True}), ("WEBP", {"exif": b"Exif\x00\x00" + b"\x00" * 16}),
+])
+def test_matches_pil(tmp_path, size, image_format, kwargs):
+    path = write(tmp_path, f"image.{image_format.lower()}", encode(size, image_format, **kwargs))
+    with Image.open(path) as image:
+        assert util.image_dimensions(path) == image.size == size
+
+
+def test_jpeg_fill_bytes(tmp_path):
+    data = encode((64, 48), "JPEG")
+    path = write(tmp_path, "fill.jpg", data[:2] + b"\xff\xff\xff" + data[2:])
+    assert util.image_dimensions(path) == (64, 48)
+
+
+@pytest.mark.parametrize("data", [
+    b"\xff\xd8", b"\xff\xd8\xff", b"\xff\xd8\xff\xff", b"\xff\xd8\xff\xff\xff\xff", b"\xff\xd8\xff\xe0",
+    b"\xff\xd8\xff\xe0\x00\x01", b"\xff\xd8\xff\xe0\x00\x10JFIF", b"\xff\xd8\xff\xc0\x00\x11\x08\x01",
+    b"\xff\xd8\x00\x00",
+])
+def test_truncated_jpeg(tmp_path, data):
+    assert util.image_dimensions(write(tmp_path, "truncated.jpg", data)) is None
+
+
+def test_truncated_jpeg_body(tmp_path):
+    data = encode((640, 480), "JPEG")
+    start = data.index(b"\xff\xc0")
+    for end in range(2, start + 8):
+        assert util.image_dimensions(write(tmp_path, "truncated.jpg", data[:end])) is None
+
+
+def test_truncated_png(tmp_path):
+    data = encode((640, 480), "PNG")
+    for end in range(8, 24):
+        assert util.image_dimensions(write(tmp_path, "truncated.png", data[:end])) is None
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"lossless": True}])
+def test_truncated_webp(tmp_path, kwargs):
+    data = encode((640, 480), "WEBP", **kwargs)
+    for end in range(12, 30):
+        assert util.image_dimensions(write(tmp_path, "truncated.webp", data[:end])) is None
+
+
+def test_unknown_format_uses_pil(tmp_path):
+    path = write(tmp_path, "image.gif", encode((33, 44), "GIF"))
+    assert util.image_dimensions(path) == (33, 44)
+    with pytest.raises(OSError):
+        util.image_dimensions(write(tmp_path, "garbage.png", b"not an image"))
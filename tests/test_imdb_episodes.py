@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+from modules.imdb import IMDb
+
+episodes = [
+    ("tt1000001", "tt0000100", "1", "1"), ("tt1000002", "tt0000100", "1", "2"), ("tt1000003", "tt0000200", "1", "1"),
+    ("tt1000004", "tt0000300", "2", "5"), ("tt1000005", "tt0000400", "\\N", "\\N"), ("tt1000006", "tt0000500", "1", "1"),
+]
+ratings = {"tt1000001": "8.1", "tt1000002": "7.5", "tt1000003": "6.0", "tt1000004": "9.2", "tt1000005": "5.0", "tt1000006": "4.4"}
+
+
+def make_imdb(tmp_path):
+    imdb = IMDb(None, None, str(tmp_path), dataset_refresh=24)
+    imdb.streams = 0
+
+    def rows(interface):
+        assert interface == "episode"
+        imdb.streams += 1
+        yield from [list(e) for e in episodes]
+
+    imdb._interface_rows = rows
+    imdb.get_rating = ratings.get
+    imdb.datasets.source_time = lambda url: 1700000000.0
+    return imdb
+
+
+def library(*imdb_ids):
+    return SimpleNamespace(mapping_name="Shows", imdb_map={i: [1] for i in imdb_ids})
+
+
+def test_library_scope_streams_once(tmp_path):
+    imdb = make_imdb(tmp_path)
+    shows = library("tt0000100", "tt0000200", "tt0000999")
+    assert imdb.get_episode_rating("tt0000100", 1, 2, library=shows) == "7.5"
+    assert imdb.get_episode_rating("tt0000200", 1, 1, library=shows) == "6.0"
+    assert imdb.get_episode_rating("tt0000999", 1, 1, library=shows) is None
+    assert imdb.get_episode_rating("tt0000100", 9, 9, library=shows) is None
+    assert imdb.streams == 1
+
+
+def test_misses_only_index_requested_shows(tmp_path):
+    imdb = make_imdb(tmp_path)
+    assert imdb.get_episode_rating("tt0000100", 1, 1) == "8.1"
+    assert imdb.get_episode_rating("tt0000100", 1, 2) == "7.5"
+    assert imdb.get_episode_rating("tt0000100", 3, 3) is None
+    assert imdb.streams == 1
+    assert imdb._episode_parents == {"tt0000100"}
+    assert len(imdb._episode_ratings) == 2
+    assert imdb.get_episode_rating("tt0000300", 2, 5) == "9.2"
+    assert imdb.get_episode_rating("tt0000777", 1, 1) is None
+    assert imdb.get_episode_rating("tt0000777", 1, 2) is None
+    assert imdb.streams == 3
+    assert imdb._episode_parents == {"tt0000100", "tt0000300", "tt0000777"}
+    assert len(imdb._episode_ratings) == 3
+
+
+def test_misses_batch_uncovered_library_shows(tmp_path):
+    imdb = make_imdb(tmp_path)
+    shows = library("tt0000100")
+    assert imdb.get_episode_rating("tt0000100", 1, 1, library=shows) == "8.1"
+    shows.imdb_map.update({"tt0000200": [2], "tt0000300": [3]})
+    assert imdb.get_episode_rating("tt0000500", 1, 1) == "4.4"
+    assert imdb.get_episode_rating("tt0000200", 1, 1, library=shows) == "6.0"
+    assert imdb.get_episode_rating("tt0000300", 2, 5, library=shows) == "9.2"
+    assert imdb.streams == 2
+    assert "tt0000400" not in imdb._episode_parents
+
+
+def test_saved_index_is_reused(tmp_path):
+    imdb = make_imdb(tmp_path)
+    imdb.get_episode_rating("tt0000100", 1, 1, library=library("tt0000100", "tt0000200", "tt0000888"))
+    again = make_imdb(tmp_path)
+    assert again.get_episode_rating("tt0000200", 1, 1) == "6.0"
+    assert again.get_episode_rating("tt0000888", 1, 1) is None
+    assert again.streams == 0
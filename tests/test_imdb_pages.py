@@ -0,0 +1,99 @@
+import threading
+import pytest
+from modules.imdb import IMDb
+
+
+class FakeList:
+    def __init__(self, total, jump="supported", cap=None, broken_page=None, page_size=100):
+        self.ids = [f"tt{i:07d}" for i in range(1, total + 1)]
+        self.jump = jump
+        self.cap = cap
+        self.broken_page = broken_page
+        self.page_size = page_size
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def __call__(self, json_obj):
+        variables = json_obj["variables"]
+        with self.lock:
+            self.requests.append(dict(variables))
+        if "jumpToPosition" in variables:
+            position = variables["jumpToPosition"]
+            if self.broken_page and position == (self.broken_page - 1) * self.page_size + 1:
+                return {"data": {"list": None}}
+            if self.jump == "ignored":
+                start = 0
+            elif self.jump == "error":
+                return {"errors": [{"message": "Unknown variable jumpToPosition"}]}
+            else:
+                start = min(position - 1, self.cap) if self.cap is not None else position - 1
+        elif "after" in variables:
+            start = int(variables["after"][1:])
+        else:
+            start = 0
+        page = self.ids[start:start + self.page_size]
+        return {"data": {"list": {"titleListItemSearch": {
+            "total": len(self.ids), "pageInfo": {"endCursor": f"c{start + len(page)}"}, "edges": [{"listItem": {"id": i}} for i in page]
+        }}}}
+
+
+def paginate(fake, limit=0):
+    imdb = IMDb(None, None, "")
+    imdb._graphql_json = lambda data, list_type: {"variables": {"first": 100}}
+    imdb._graph_request = fake
+    return imdb._pagination({"list_id": "ls0000001", "limit": limit}, "list")
+
+
+def cursor_requests(fake, cursor):
+    return sum(1 for r in fake.requests if r.get("after") == cursor)
+
+
+@pytest.mark.parametrize("total, limit", [(50, 0), (200, 0), (201, 0), (1000, 0), (1050, 0), (1050, 420), (1050, 500)])
+def test_jump_pages_match_cursor_walk(total, limit):
+    fake = FakeList(total)
+    expected = fake.ids[:limit or total]
+    assert paginate(fake, limit) == expected
+    assert paginate(FakeList(total, jump="error"), limit) == expected
+
+
+@pytest.mark.parametrize("fake", [
+    FakeList(1050, jump="ignored"), FakeList(1050, jump="error"), FakeList(1050, cap=500),
+    FakeList(1050, cap=250), FakeList(1050, broken_page=4), FakeList(1050, broken_page=11),
+])
+def test_fallback_returns_complete_list(fake):
+    assert paginate(fake) == fake.ids
+    assert cursor_requests(fake, "c100") == 1
+    assert cursor_requests(fake, "c200") == 1
+
+
+def test_shifted_jump_falls_back():
+    fake = FakeList(1050)
+    original = fake.__call__
+
+    def shifting(json_obj):
+        position = json_obj["variables"].get("jumpToPosition")
+        if position and position > 600:
+            json_obj = {"variables": dict(json_obj["variables"], jumpToPosition=position - 1)}
+        return original(json_obj)
+
+    imdb = IMDb(None, None, "")
+    imdb._graphql_json = lambda data, list_type: {"variables": {"first": 100}}
+    imdb._graph_request = shifting
+    assert imdb._pagination({"list_id": "ls0000001", "limit": 0}, "list") == fake.ids
+    assert cursor_requests(fake, "c100") == 1
+    assert cursor_requests(fake, "c200") == 1
+
+
+def test_raising_page_falls_back():
+    fake = FakeList(1050)
+    original = fake.__call__
+
+    def raising(json_obj):
+        if json_obj["variables"].get("jumpToPosition") == 501:
+            raise ConnectionError("reset")
+        return original(json_obj)
+
+    imdb = IMDb(None, None, "")
+    imdb._graphql_json = lambda data, list_type: {"variables": {"first": 100}}
+    imdb._graph_request = raising
+    assert imdb._pagination({"list_id": "ls0000001", "limit": 0}, "list") == fake.ids
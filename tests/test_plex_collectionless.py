@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+from urllib.parse import parse_qs
+from modules import plex
+
+
+def make_library(collections, tags, members):
+    library = plex.Plex.__new__(plex.Plex)
+    library.Plex = SimpleNamespace(TYPE="movie")
+    library.type = "Movie"
+    library.requests = []
+    library.get_all_collections = lambda label=None: collections
+    library.get_tags = lambda tag: tags
+    library.cached_level = lambda builder_level=None: None
+
+    def get_rating_key_list(builder_level=None, uri_args=None):
+        library.requests.append(uri_args)
+        if uri_args is None:
+            return list(range(1, 11))
+        args = parse_qs(uri_args[1:])
+        return sorted({k for tag in args["collection"][0].split(",") for k in members[int(tag)]})
+
+    library.get_rating_key_list = get_rating_key_list
+    return library
+
+
+def test_collectionless_queries_collection_tag_ids():
+    collections = [
+        SimpleNamespace(title="Marvel", titleSort=None, ratingKey=9001),
+        SimpleNamespace(title="DC", titleSort=None, ratingKey=9002),
+        SimpleNamespace(title="_Collectionless", titleSort=None, ratingKey=9003),
+        SimpleNamespace(title="Skip Me", titleSort=None, ratingKey=9004),
+    ]
+    tags = [
+        SimpleNamespace(title="Marvel", key=11),
+        SimpleNamespace(title="dc", key=12),
+        SimpleNamespace(title="_Collectionless", key=13),
+        SimpleNamespace(title="Skip Me", key=14),
+    ]
+    members = {11: [1, 2], 12: [3], 13: [4, 5, 6], 14: [7]}
+    library = make_library(collections, tags, members)
+    data = {"exclude_prefix": ["_"], "exclude": ["Skip Me"]}
+    rating_keys = library.get_rating_keys("plex_collectionless", data)
+    assert rating_keys == [(k, "ratingKey") for k in [4, 5, 6, 7, 8, 9, 10]]
+    args = parse_qs(library.requests[0][1:])
+    assert args["type"] == ["1"]
+    assert sorted(args["collection"][0].split(",")) == ["11", "12"]
+
+
+def test_collectionless_batches_tag_ids():
+    collections = [SimpleNamespace(title=f"Collection {i}", titleSort=None, ratingKey=5000 + i) for i in range(120)]
+    tags = [SimpleNamespace(title=f"Collection {i}", key=100 + i) for i in range(120)]
+    members = {100 + i: [i % 10 + 1] if i < 5 else [] for i in range(120)}
+    library = make_library(collections, tags, members)
+    rating_keys = library.get_rating_keys("plex_collectionless", {"exclude_prefix": [], "exclude": []})
+    assert rating_keys == [(k, "ratingKey") for k in [6, 7, 8, 9, 10]]
+    sent = [t for uri_args in library.requests[:-1] for t in parse_qs(uri_args[1:])["collection"][0].split(",")]
+    assert sorted(sent, key=int) == [str(100 + i) for i in range(120)]
+    assert all(len(parse_qs(u[1:])["collection"][0].split(",")) <= 50 for u in library.requests[:-1])
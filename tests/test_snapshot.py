@@ -0,0 +1,120 @@
+import os
+from datetime import datetime
+from xml.etree import ElementTree
+import pytest
+from modules import builder, plex, snapshot
+from plexapi.audio import Album, Artist
+from plexapi.base import PlexPartialObject
+from plexapi.video import Episode, Movie, Season, Show
+
+pytestmark = pytest.mark.skipif(not snapshot.available(), reason="numpy is not installed")
+
+current_time = datetime(2024, 6, 1)
+
+
+def make(cls, tag, rating_key, **attrs):
+    attrs = {k: str(v) for k, v in attrs.items() if v is not None}
+    return cls(None, ElementTree.Element(tag, ratingKey=str(rating_key), key=f"/library/metadata/{rating_key}", type=cls.TYPE,
+                                         title=f"{cls.TYPE} {rating_key}", **attrs))
+
+
+def library_items():
+    items = []
+    for i in range(12):
+        year = 1990 + i * 3 if i % 5 else None
+        items.append(make(Movie, "Video", 100 + i, year=year, duration=(60 + i * 10) * 60000 if i % 4 else None,
+                          audienceRating=i / 1.5 if i % 3 else None, rating=10 - i / 2, viewCount=i % 4,
+                          addedAt=int(datetime(2024, 5, 1 + i).timestamp()),
+                          originallyAvailableAt=f"{year}-0{1 + i % 9}-15" if year else None))
+        items.append(make(Show, "Directory", 200 + i, childCount=1, year=year, audienceRating=i / 2, viewCount=i,
+                          originallyAvailableAt=f"{year}-02-01" if year else None))
+        items.append(make(Season, "Directory", 300 + i, index=i, year=2000 + i if i % 2 else None, viewCount=i,
+                          addedAt=int(datetime(2024, 4, 1 + i).timestamp())))
+        items.append(make(Episode, "Video", 400 + i, year=2000 + i, duration=(20 + i) * 60000, viewCount=i % 3,
+                          originallyAvailableAt=f"20{10 + i}-03-03"))
+        items.append(make(Artist, "Directory", 500 + i, viewCount=i, addedAt=int(datetime(2024, 3, 1 + i).timestamp())))
+        items.append(make(Album, "Directory", 600 + i, year=1980 + i, rating=i, viewCount=i % 2))
+    return items
+
+
+filter_sets = [
+    [[("year.gte", 2000)]],
+    [[("year", [1993, 1996, 2011])]],
+    [[("year.not", [1993, 1996])]],
+    [[("duration.gt", 90)]],
+    [[("duration.lte", 25), ("plays.gte", 1)]],
+    [[("critic_rating.gte", 7.0)]],
+    [[("audience_rating.lt", 3.0)], [("plays", 2)]],
+    [[("release.before", "01/01/2005")]],
+    [[("release.after", "01/01/2000")]],
+    [[("release", 9000)]],
+    [[("added", 45)]],
+    [[("added.not", 45)]],
+    [[("plays.not", 0)]],
+    [[("year.gt", 1995), ("release.after", "06/01/1990"), ("critic_rating.gt", 6.0)]],
+]
+
+
+@pytest.fixture(autouse=True)
+def no_reload(monkeypatch):
+    reloads = []
+    monkeypatch.setattr(PlexPartialObject, "_reload", lambda self, *args, **kwargs: reloads.append(self.ratingKey) or self)
+    return reloads
+
+
+def per_item(library, item, filters):
+    item._autoReload = False
+    try:
+        return any(library.check_filters(item, filter_list, current_time) for filter_list in filters)
+    finally:
+        item._autoReload = True
+
+
+@pytest.mark.parametrize("filters", filter_sets)
+def test_snapshot_matches_per_item(filters):
+    library = plex.Plex.__new__(plex.Plex)
+    library.reload = lambda item, force=False: item
+    items = library_items()
+    for item_type in ["movie", "show", "season", "episode", "artist", "album"]:
+        library_snapshot = snapshot.LibrarySnapshot(item_type, items)
+        results = library_snapshot.check_filters(items, filters, current_time)
+        typed = [i for i in items if i.TYPE == item_type]
+        applicable = all(os.path.splitext(f)[0] in builder.filters[item_type] for filter_list in filters for f, _ in filter_list)
+        if applicable:
+            assert set(results) == {i.ratingKey for i in typed}
+        for item in typed:
+            if item.ratingKey in results:
+                assert results[item.ratingKey] == per_item(library, item, filters), (item_type, item.ratingKey, filters)
+
+
+def test_snapshot_does_not_reload_partial_items(no_reload):
+    items = library_items()
+    assert items[0].isPartialObject()
+    for item_type in ["movie", "show", "season", "episode", "artist", "album"]:
+        library_snapshot = snapshot.LibrarySnapshot(item_type, items)
+        for item in items:
+            library_snapshot.update(item)
+    assert no_reload == []
+
+
+def test_inapplicable_filters_fall_back():
+    items = library_items()
+    artists = snapshot.LibrarySnapshot("artist", items)
+    assert artists.check_filters(items, [[("year.gte", 3000)]], current_time) == {}
+    seasons = snapshot.LibrarySnapshot("season", items)
+    assert seasons.check_filters(items, [[("critic_rating.gte", 11), ("release.after", "01/01/2100")]], current_time) == {}
+    assert all(seasons.check_filters(items, [[("critic_rating.gte", 11)], [("plays.gte", 0)]], current_time).values())
+
+
+def test_unknown_filters_fall_back():
+    items = library_items()
+    movies = snapshot.LibrarySnapshot("movie", items)
+    assert movies.check_filters(items, [[("genre", ["Action"])]], current_time) == {}
+    results = movies.check_filters(items, [[("genre", ["Action"])], [("year.gte", 2000)]], current_time)
+    assert all(results.values())
+
+
+def test_filters_are_not_split_again(logger):
+    items = library_items()
+    snapshot.LibrarySnapshot("movie", items).check_filters(items, [[("release.after", "01/01/2000")]], current_time)
+    assert not logger.warning.called
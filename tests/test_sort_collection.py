@@ -0,0 +1,79 @@
+import itertools, random
+from types import SimpleNamespace
+import pytest
+from modules import builder, util
+
+
+def brute_force_lis(values):
+    for size in range(len(values), 0, -1):
+        for combo in itertools.combinations(range(len(values)), size):
+            if all(values[a] < values[b] for a, b in zip(combo, combo[1:])):
+                return size
+    return 0
+
+
+def check(values, indexes):
+    assert indexes == sorted(indexes)
+    assert all(values[a] < values[b] for a, b in zip(indexes, indexes[1:]))
+    assert len(indexes) == brute_force_lis(values)
+
+
+@pytest.mark.parametrize("values", [[], [1], [2, 1], [1, 2, 3], [3, 2, 1], [1, 1, 1], [2, 2, 1, 3], [0, 8, 4, 12, 2, 10, 6, 14, 1, 9]])
+def test_lis_cases(values):
+    check(values, util.longest_increasing_subsequence(values))
+
+
+def test_lis_random():
+    rng = random.Random(42)
+    for _ in range(300):
+        values = [rng.randrange(8) for _ in range(rng.randrange(10))]
+        check(values, util.longest_increasing_subsequence(values))
+
+
+def test_lis_permutations():
+    for values in itertools.permutations(range(6)):
+        check(list(values), util.longest_increasing_subsequence(list(values)))
+
+
+class FakeLibrary:
+    def __init__(self, order):
+        self.order = list(order)
+        self.moves = 0
+
+    def moveItem(self, collection, item, after):
+        self.moves += 1
+        self.order.remove(item)
+        self.order.insert(self.order.index(after) + 1 if after else 0, item)
+
+
+def run_sort(current, target, custom_sort="custom.asc"):
+    library = FakeLibrary(current)
+    collection_builder = builder.CollectionBuilder.__new__(builder.CollectionBuilder)
+    collection_builder.__dict__.update(name="Test", Type="Collection", obj=None, library=library, custom_sort=custom_sort,
+                                       found_items=list(target), items=list(current))
+    collection_builder.sort_collection()
+    return library
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_sort_collection_reaches_target_with_fewest_moves(seed, logger):
+    rng = random.Random(seed)
+    target = [SimpleNamespace(ratingKey=i, title=f"Item {i}") for i in range(rng.randrange(1, 9))]
+    current = rng.sample(target, len(target))
+    library = run_sort(current, target)
+    assert library.order == target
+    positions = [target.index(item) for item in current]
+    assert library.moves == len(target) - brute_force_lis(positions)
+
+
+def test_sort_collection_descending(logger):
+    target = [SimpleNamespace(ratingKey=i, title=f"Item {i}") for i in range(6)]
+    library = run_sort(target, target, custom_sort="custom.desc")
+    assert library.order == target[::-1]
+    assert library.moves == 5
+
+
+def test_sort_collection_no_moves(logger):
+    target = [SimpleNamespace(ratingKey=i, title=f"Item {i}") for i in range(6)]
+    assert run_sort(target, target).moves == 0
+    logger.info.assert_any_call("No Sorting Required")
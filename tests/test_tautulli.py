@@ -0,0 +1,37 @@
+from xml.etree import ElementTree
+from modules.tautulli import Tautulli
+from plexapi.video import Movie
+
+
+class FakeLibrary:
+    is_movie = True
+
+    def __init__(self):
+        self.loaded = []
+        self.fetched = []
+
+    def batch_load(self, rating_keys):
+        self.loaded.extend(rating_keys)
+
+    def fetch_item(self, rating_key):
+        self.fetched.append(rating_key)
+        return Movie(None, ElementTree.Element("Video", ratingKey=str(rating_key), type="movie"))
+
+
+def make_tautulli(rows):
+    tautulli = Tautulli.__new__(Tautulli)
+    tautulli.library = FakeLibrary()
+    tautulli.has_section = True
+    tautulli.section_id = "1"
+    tautulli.requests = None
+    tautulli._request = lambda cmd, params=None: {"response": {"data": [{"stat_id": "top_movies", "rows": rows}]}}
+    return tautulli
+
+
+def test_prefetch_is_limited_to_list_size():
+    rows = [{"rating_key": str(100 + i), "section_id": "1" if i % 4 else "2", "total_plays": str(20 - i), "title": f"Movie {i}", "year": 2000} for i in range(20)]
+    tautulli = make_tautulli(rows)
+    data = {"list_type": "watched", "list_days": 30, "list_size": 5, "list_buffer": 15, "list_minimum": 3}
+    rating_keys = tautulli.get_rating_keys(data, False)
+    assert rating_keys == [(k, "ratingKey") for k in ["101", "102", "103", "105", "106"]]
+    assert tautulli.library.loaded == ["101", "102", "103", "105", "106"]
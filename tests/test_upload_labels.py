@@ -0,0 +1,19 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from modules import plex
+
+
+def test_overlay_label_removal_invalidates_label_tags():
+    library = plex.Plex.__new__(plex.Plex)
+    library.config = SimpleNamespace(Cache=None)
+    library.show_asset_not_needed = False
+    library.reload = lambda item, force=False: item
+    library.item_labels = lambda item: [SimpleNamespace(tag="Overlay")]
+    library._upload_image = lambda item, image, reload=True: True
+    library._memo = {("tags", "/library/sections/1/label"): None, ("tags", "/library/sections/1/genre"): None}
+    library._memo_lock = MagicMock()
+    item = MagicMock(ratingKey=1)
+    poster = SimpleNamespace(attribute="poster", message="", prefix="", compare="a")
+    assert library.upload_images(item, poster=poster, overlay=True) == (True, False, False)
+    item.removeLabel.assert_called_once_with("Overlay")
+    assert list(library._memo) == [("tags", "/library/sections/1/genre")]
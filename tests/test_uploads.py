@@ -0,0 +1,78 @@
+import threading, time
+from types import SimpleNamespace
+from modules import uploads
+from modules.uploads import UploadQueue
+
+
+class FakeLibrary:
+    def __init__(self, url):
+        self.url = url
+        self.reloaded = []
+
+    def batch_reload(self, items):
+        self.reloaded.extend(items)
+
+
+def item(key):
+    return SimpleNamespace(ratingKey=key)
+
+
+def upload(name, delay=0.0, fail=False, changed=True, messages=None, log=None, lock=None, active=None):
+    if active is not None:
+        with lock:
+            active.append(1)
+            log.append(("peak", len(active)))
+    time.sleep(delay)
+    if active is not None:
+        with lock:
+            active.pop()
+    if fail:
+        raise ValueError(f"{name} failed")
+    messages.append(("info", f"uploaded {name}"))
+    return [changed]
+
+
+def test_messages_and_reloads_match_sequential(logger):
+    library = FakeLibrary("http://plex-order")
+    queue = UploadQueue(library, 4, 4)
+    for i in range(20):
+        queue.submit(item(i), upload, f"poster {i}", delay=0.01 * (i % 3), changed=i % 2 == 0, fail=i == 7)
+    queue.flush()
+    expected = [f"uploaded poster {i}" for i in range(20) if i != 7]
+    assert [c.args[0] for c in logger.info.call_args_list] == expected
+    assert [c.args[0] for c in logger.error.call_args_list] == ["Upload Error: poster 7 failed"]
+    assert [i.ratingKey for i in library.reloaded] == list(range(0, 20, 2))
+
+
+def test_same_item_runs_in_order(logger):
+    library = FakeLibrary("http://plex-same")
+    queue = UploadQueue(library, 4, 4)
+    order = []
+
+    def record(name, delay, messages=None):
+        time.sleep(delay)
+        order.append(name)
+        return [False]
+
+    shared = item(1)
+    queue.submit(shared, record, "poster", 0.05)
+    queue.submit(shared, record, "background", 0.0)
+    queue.flush()
+    assert order == ["poster", "background"]
+    assert library.reloaded == []
+
+
+def test_server_limit_is_shared(logger):
+    log, lock, active = [], threading.Lock(), []
+    queues = [UploadQueue(FakeLibrary("http://plex-limit"), 4, 2) for _ in range(2)]
+    for i in range(12):
+        queues[i % 2].submit(item(i), upload, str(i), delay=0.01, log=log, lock=lock, active=active)
+    for queue in queues:
+        queue.flush()
+    assert max(peak for _, peak in log) <= 2
+    assert uploads.server_limit("http://plex-limit", 8) is queues[0].limit
+
+
+def test_single_worker_is_inactive():
+    assert UploadQueue(FakeLibrary("http://plex-single"), 1, 1).active is False
+    assert UploadQueue(FakeLibrary("http://plex-single"), 2, 1).active is True